@@ -0,0 +1,17 @@
+"""Command-line entry point for the command bank, without the desktop app.
+
+    python bank_cli.py search "suspend user"
+    python bank_cli.py render "Suspend a user" -s user=jdoe@example.com
+    python bank_cli.py serve --port 8765
+
+Python recompiles the script it is started with on every run, so this file
+is kept to a few lines: everything else lives in bank_core, whose compiled
+module is cached.  ``python command_bank.py <action> ...`` does the same but
+compiles the whole GUI module first.
+"""
+import sys
+
+import bank_core
+
+if __name__ == "__main__":
+    sys.exit(bank_core.main(sys.argv[1:]))
@@ -0,0 +1,3129 @@
+"""Headless core of the command bank: storage, indexes, templates and execution.
+
+``command_bank.py`` builds the Tk app on top of this module; scripts, cron
+jobs and pipelines can use the same bank without a display:
+
+    python bank_cli.py search "suspend user"
+    python bank_cli.py render "Suspend user" -s user=jdoe@example.com
+    python bank_cli.py run "Get AD user" -s user=jdoe
+    python bank_cli.py batch "Suspend user" --input users.txt
+    python bank_cli.py serve --port 8765
+
+or from Python, through :class:`CommandBank`.  Nothing here imports tkinter.
+"""
+import binascii
+import bisect
+import csv
+import functools
+import heapq
+import itertools
+import json
+import math
+import mmap
+import os
+import queue
+import sys
+import re
+import shlex
+import signal
+import stat
+import struct
+import threading
+import time
+from collections.abc import MutableSequence, Sequence
+from datetime import datetime, timedelta
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Command records
+# ─────────────────────────────────────────────────────────────────────────────
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def now_us():
+    """The local wall-clock time as integer microseconds since 1970-01-01."""
+    return (datetime.now() - _EPOCH) // _MICROSECOND
+
+
+def iso_to_us(text):
+    """Parse ``datetime.isoformat()`` text into microseconds; None if it is not one."""
+    try:
+        stamp = datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return None
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone().replace(tzinfo=None)
+    return (stamp - _EPOCH) // _MICROSECOND
+
+
+def us_to_iso(us):
+    """Inverse of ``iso_to_us`` — the text ``datetime.isoformat()`` would give."""
+    return (_EPOCH + timedelta(microseconds=us)).isoformat()
+
+
+class Command:
+    """One bank entry.
+
+    Replaces the per-entry dict with slots: the category is an interned
+    string shared with its tab, and ``last_used``/``copied_at`` are integer
+    microseconds (see ``now_us``) instead of ISO strings.  ``from_dict`` and
+    ``to_dict`` convert to and from the commands.json schema without loss —
+    the original key order is kept (as a tuple shared by every entry with
+    the same shape), and values that do not fit a typed field, or keys the
+    app does not know about, are carried through untouched.  ``frecency`` is
+    a ranking cache kept only in memory; a ``frecency`` key written by an
+    earlier version is dropped on read.
+    """
+
+    __slots__ = ("command", "description", "category", "favorite", "use_count",
+                 "last_used", "copied_at", "frecency", "_keys", "_raw", "_extra")
+
+    TIMESTAMPS = ("last_used", "copied_at")
+    # key order of a command created from the Add dialog
+    NEW_KEYS = ("command", "description", "category", "favorite", "last_used", "use_count")
+    _DEFAULTS = {"command": "", "description": "", "favorite": False, "use_count": 0,
+                 "last_used": None, "copied_at": None}
+    _KNOWN = frozenset(_DEFAULTS) | {"category"}
+    _DERIVED = "frecency"   # never read from or written to the bank file
+    _shapes = {}   # key order -> (shared key tuple, unknown keys, absent fields)
+
+    def __init__(self, command, description, category):
+        self.command = command
+        self.description = description
+        self.category = sys.intern(category)
+        self.favorite = False
+        self.use_count = 0
+        self.last_used = None
+        self.copied_at = None
+        self.frecency = None
+        self._keys = self._shape(self.NEW_KEYS)[0]
+        self._raw = None      # field -> (JSON value, typed value it was read as)
+        self._extra = None    # unknown key -> JSON value
+
+    def __repr__(self):
+        return f"Command({self.command!r}, {self.description!r}, {self.category!r})"
+
+    @classmethod
+    def _shape(cls, keys):
+        shape = cls._shapes.get(keys)
+        if shape is None:
+            shape = cls._shapes[keys] = (
+                keys, tuple(k for k in keys if k not in cls._KNOWN),
+                tuple(k for k in cls._DEFAULTS if k not in keys))
+        return shape
+
+    # ── JSON schema ──────────────────────────────────────────────────────
+    @classmethod
+    def from_dict(cls, data, category):
+        self = cls.__new__(cls)
+        keys = tuple(data)
+        if cls._DERIVED in data:
+            keys = tuple(k for k in keys if k != cls._DERIVED)
+        self._keys, unknown, _ = cls._shape(keys)
+        self._raw = None
+        self.category = category = sys.intern(category)
+        get = data.get
+        value = get("command", "")
+        self.command = value if type(value) is str else self._keep("command", value)
+        value = get("description", "")
+        self.description = value if type(value) is str else self._keep("description", value)
+        value = get("favorite", False)
+        self.favorite = value if value is True or value is False else \
+            self._keep("favorite", value)
+        value = get("use_count", 0)
+        self.use_count = value if type(value) is int else self._keep("use_count", value)
+        self.last_used = self._stamp("last_used", get("last_used"))
+        self.copied_at = self._stamp("copied_at", get("copied_at"))
+        self.frecency = None      # see frecency_key
+        value = get("category", category)
+        if value != category:
+            self._keep("category", value)
+        self._extra = {k: data[k] for k in unknown} if unknown else None
+        return self
+
+    def _stamp(self, key, value):
+        if value is None:
+            return None
+        us = iso_to_us(value) if type(value) is str else None
+        if us is None or us_to_iso(us) != value:
+            return self._keep(key, value, us)   # e.g. a UTC offset: written back as-is
+        return us
+
+    def _keep(self, key, value, typed=None):
+        """Remember a JSON value that does not fit its field; returns the field value."""
+        if key == "category":
+            typed = self.category
+        elif key in ("command", "description"):
+            typed = "" if value is None else str(value)
+        elif key == "favorite":
+            typed = bool(value)
+        elif key == "use_count":
+            typed = 0
+        if self._raw is None:
+            self._raw = {}
+        self._raw[key] = (value, typed)
+        return typed
+
+    def get_json(self, key):
+        """The value ``key`` has in the commands.json schema."""
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        value = getattr(self, key)
+        if self._raw and key in self._raw and self._raw[key][1] == value:
+            return self._raw[key][0]     # unchanged since it was read
+        if value is not None and key in self.TIMESTAMPS:
+            return us_to_iso(value)
+        return value
+
+    def set_json(self, key, value):
+        """Assign a schema value to a field, appending the key if it is new."""
+        if key in self.TIMESTAMPS:
+            value = iso_to_us(value) if isinstance(value, str) else None
+        setattr(self, key, value)
+        self.add_keys(key)
+
+    def to_dict(self):
+        if self._raw is None and self._extra is None:
+            data = {}
+            for key in self._keys:
+                value = getattr(self, key)
+                if value is not None and key in self.TIMESTAMPS:
+                    value = us_to_iso(value)
+                data[key] = value
+        else:
+            data = {key: self.get_json(key) for key in self._keys}
+        # fields set directly rather than through the helpers below
+        for key in self._shapes[self._keys][2]:
+            if getattr(self, key) != self._DEFAULTS[key]:
+                data[key] = self.get_json(key)
+        return data
+
+    # ── updates (keys appended in the order a dict would gain them) ─────
+    def add_keys(self, *keys):
+        missing = tuple(k for k in keys if k not in self._keys)
+        if missing:
+            self._keys = self._shape(self._keys + missing)[0]
+
+    def mark_used(self, stamp):
+        self.frecency = frecency_bump(frecency_key(self), stamp)
+        self.last_used = stamp
+        self.use_count += 1
+        self.add_keys("last_used", "use_count", "category")
+
+    def mark_copied(self, stamp):
+        self.copied_at = stamp
+        self.add_keys("copied_at", "category")
+
+    def set_favorite(self, flag):
+        self.favorite = flag
+        self.add_keys("favorite")
+
+
+def bank_from_json(data):
+    """``{category: [entry dict, ...]}`` as read from commands.json -> Commands."""
+    bank = {}
+    for category, entries in data.items():
+        category = sys.intern(category)
+        bank[category] = [Command.from_dict(e, category) for e in entries]
+    return bank
+
+
+def bank_to_json(commands):
+    """Inverse of ``bank_from_json``; ``json.dump`` gives the commands.json text."""
+    return {cat: [c.to_dict() for c in entries] for cat, entries in commands.items()}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Write-behind persistence
+# ─────────────────────────────────────────────────────────────────────────────
+class WriteBehindStore:
+    """Debounced, crash-safe writer for the commands dict.
+
+    Callers mark categories dirty; bursts of changes collapse into a single
+    save once the bank has been idle for ``delay_ms``.  Only the dirty
+    categories are converted to plain dicts on the Tk thread — JSON encoding
+    and the file write happen on a background thread, which keeps the
+    encoded text of clean categories cached between saves.  Every write goes to a temp file
+    that is atomically renamed over the target.  ``guard``, if given, is asked
+    before each timed save; returning False holds the save back (the
+    changes stay pending) — its owner reloads and replays them first.
+    """
+
+    def __init__(self, root, path, source, delay_ms=800, on_error=None, guard=None):
+        self.root = root
+        self.path = path
+        self.source = source          # callable returning the commands dict
+        self.delay_ms = delay_ms
+        self.on_error = on_error
+        self.guard = guard
+        self._dirty = set()
+        self._full = True             # next save must encode every category
+        self._pending = False
+        self._job = None
+        self._fragments = {}          # category -> encoded JSON (worker-owned)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._errors = []
+        self.written = None           # _file_state of the file after our last write
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def mark_dirty(self, category=None):
+        """Record a change and (re)start the idle timer."""
+        if category is None:
+            self._full = True
+        else:
+            self._dirty.add(category)
+        self._pending = True
+        if self._job:
+            self.root.after_cancel(self._job)
+        self._job = self.root.after(self.delay_ms, self._submit)
+
+    def reset(self):
+        """Forget cached state after the commands dict was replaced."""
+        self._cancel_timer()
+        self._dirty.clear()
+        self._full = True
+        self._pending = False
+
+    def flush(self):
+        """Write any pending changes now and wait until they are on disk.
+
+        Returns False if a write failed.
+        """
+        self._cancel_timer()
+        if self._pending:
+            self._enqueue()
+        if self._worker:
+            self._queue.join()
+        return not self._report_errors()
+
+    # ── internals ────────────────────────────────────────────────────────
+    def _cancel_timer(self):
+        if self._job:
+            self.root.after_cancel(self._job)
+            self._job = None
+
+    def _submit(self):
+        self._job = None
+        if self.guard is not None and not self.guard():
+            return
+        self._enqueue()
+        self.root.after(self.delay_ms, self._report_errors)
+
+    def _enqueue(self):
+        commands = self.source()
+        cats = self._dirty if not self._full else commands.keys()
+        changed = {cat: [c.to_dict() for c in commands.get(cat, [])] for cat in cats}
+        self._queue.put((list(commands), changed, self._full))
+        self._dirty = set()
+        self._full = False
+        self._pending = False
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="commands-writer",
+                                            daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            # collapse everything that queued up while the last write ran
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            order, changed, full = jobs[-1][0], {}, False
+            for _, job_changed, job_full in jobs:
+                changed.update(job_changed)
+                full = full or job_full
+            try:
+                self._write(self._encode(order, changed, full))
+            except Exception as exc:
+                self._errors.append(str(exc))
+            finally:
+                for _ in jobs:
+                    self._queue.task_done()
+
+    def _encode(self, order, changed, full):
+        # Builds the same text as json.dump(commands, f, indent=4) while only
+        # re-encoding the categories that actually changed.
+        if full:
+            self._fragments = {}
+        for cat, entries in changed.items():
+            body = json.dumps(entries, indent=4, ensure_ascii=False)
+            self._fragments[cat] = body.replace("\n", "\n    ")
+        if not order:
+            return "{}"
+        parts = [f"    {json.dumps(cat, ensure_ascii=False)}: {self._fragments[cat]}"
+                 for cat in order]
+        return "{\n" + ",\n".join(parts) + "\n}"
+
+    def _write(self, text):
+        _replace_file(self.path, text.encode("utf-8"))
+        self.written = _file_state(self.path)
+
+    def _report_errors(self):
+        if not self._errors:
+            return False
+        errors, self._errors = self._errors, []
+        if self.on_error:
+            self.on_error(errors[-1])
+        return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Usage journal
+# ─────────────────────────────────────────────────────────────────────────────
+class UsageJournal:
+    """Append-only JSON Lines log of usage telemetry.
+
+    The usage ``FIELDS`` change on every click, so instead of rewriting
+    commands.json each record is appended here.  Records carry absolute
+    values (not increments), which makes replay idempotent: a crash between
+    compacting into the main store and truncating the journal cannot
+    double-count anything.
+    """
+
+    FIELDS = ("last_used", "use_count", "copied_at")
+
+    def __init__(self, path, compact_after=500):
+        self.path = path
+        self.compact_after = compact_after
+        self.size = None          # bytes this process has read or written
+        self.read_to = 0          # offset the last replay stopped at
+        self._fh = None
+        self._count = 0
+
+    @property
+    def needs_compaction(self):
+        return self._count >= self.compact_after
+
+    def record(self, category, entry):
+        rec = {"cat": category, "cmd": entry.command, "desc": entry.description}
+        for key in self.FIELDS:
+            if getattr(entry, key) is not None:
+                rec[key] = entry.get_json(key)
+        data = (json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        if self._fh is None:
+            self._fh = open(self.path, "ab")
+            if self._fh.tell() and not self._ends_with_newline():
+                data = b"\n" + data  # terminate a torn record
+        self._fh.write(data)
+        self._fh.flush()
+        # counted, not stat'ed: records another process appends show up as a
+        # size this one does not expect
+        self.size = (self.size or 0) + len(data)
+        self._count += 1
+
+    def replay(self, index, start=0):
+        """Apply logged values onto the indexed entries; returns the record count.
+
+        ``start`` is a byte offset (``read_to`` of an earlier replay) to pick
+        up only the records appended since.
+        """
+        self.close()
+        if not start:
+            self._count = 0
+        if not os.path.exists(self.path):
+            self.size, self.read_to = None, 0
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue          # torn final line from a crash
+                self._count += 1
+                # a command removed since is simply not found
+                index.update(rec.get("cat"), rec.get("cmd"), rec.get("desc"),
+                             functools.partial(self._apply, rec))
+            self.size = self.read_to = f.tell()
+        return self._count
+
+    @classmethod
+    def _apply(cls, rec, entry):
+        for key in cls.FIELDS:
+            if key in rec:
+                entry.set_json(key, rec[key])
+        entry.add_keys("category")
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def truncate(self):
+        self.close()
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+        self.size = self.read_to = 0
+        self._count = 0
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Binary snapshot
+# ─────────────────────────────────────────────────────────────────────────────
+class SnapshotEntries(MutableSequence):
+    """One category of a snapshot; records are decoded the first time they are read.
+
+    Behaves like the list it replaces, so the rest of the app (and the
+    pickers, which only touch the visible rows) cannot tell the difference.
+    Until entries are inserted or deleted in front of the snapshot's records,
+    :meth:`lookup` finds an entry through the snapshot's string table, and
+    usage replayed before anything is decoded is kept by :meth:`patch` and
+    applied as each entry is decoded — so opening a bank and resolving one
+    command decodes that command only.
+    """
+
+    def __init__(self, snapshot, category, first, count):
+        self._snap = snapshot
+        self._category = category
+        self._first, self._count = first, count
+        self._items = list(range(first, first + count))  # record number or Command
+        self._patches = {}        # (command, description) -> [fn(entry), ...]
+        self._untouched = True    # nothing decoded or changed yet
+        self._shifted = False     # positions no longer match record numbers
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        items, decode = self._items, self._decode
+        for i, item in enumerate(items):
+            if type(item) is int:
+                item = items[i] = decode(item)
+            yield item
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._items)))]
+        item = self._items[i]
+        if type(item) is int:
+            item = self._items[i] = self._decode(item)
+        return item
+
+    def _decode(self, n):
+        self._untouched = False
+        entry = Command.from_dict(self._snap.entry(n), self._category)
+        if self._patches:
+            for fn in self._patches.pop((entry.command, entry.description), ()):
+                fn(entry)
+        return entry
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            raise TypeError("slice assignment is not supported")
+        self._untouched = False
+        self._shifted = True
+        self._items[i] = value
+
+    def __delitem__(self, i):
+        self._untouched = False
+        self._shifted = True
+        del self._items[i]
+
+    def insert(self, i, value):
+        self._untouched = False
+        if i < len(self._items):
+            self._shifted = True
+        self._items.insert(i, value)
+
+    @property
+    def untouched(self):
+        """True while no entry has been decoded, changed or added."""
+        return self._untouched
+
+    @property
+    def scannable(self):
+        """True while :meth:`lookup` can search the snapshot."""
+        return not self._shifted and self._snap.is_open
+
+    def patch(self, command, description, fn):
+        """Call ``fn(entry)`` on the entry with this pair when it is decoded."""
+        self._patches.setdefault((command, description), []).append(fn)
+
+    def lookup(self, command=None, description=None):
+        """The first entry with this command and/or description, or None.
+
+        The snapshot's records are searched for the string; only candidates
+        are decoded.  Needs :attr:`scannable`.
+        """
+        key, value = ("description", description) if description is not None \
+            else ("command", command)
+        first = self._first
+        tail = range(self._count, len(self._items))    # appended since the load
+        for i in [n - first for n in
+                  self._snap.records_with(key, value, first, first + self._count)] + list(tail):
+            entry = self[i]
+            if (command is None or entry.command == command) and \
+                    (description is None or entry.description == description):
+                return entry
+        return None
+
+
+class CommandSnapshot:
+    """Compact, memory-mapped copy of ``commands.json``.
+
+    Every distinct string is stored once in a string table; each entry is a
+    fixed-width record of string ids plus its key order, so entries decode
+    one at a time straight from the mapping.  Values of an unexpected type
+    (or unknown keys) ride along as a JSON "extra" string, which keeps the
+    round trip lossless.  The header records the size and mtime of the JSON
+    it was built from; :meth:`open_for` refuses a snapshot that no longer
+    matches, and the caller rebuilds it.
+
+    Layout (little-endian): HEADER, string offsets (``<I`` pairs), string
+    bytes, layouts (``<I`` string ids), categories (``CATEGORY``), records
+    (``RECORD``).
+    """
+
+    MAGIC = b"GCBSNAP1"
+    HEADER = struct.Struct("<8sQQIIIIIIIII")
+    CATEGORY = struct.Struct("<III")   # name id, first record, record count
+    # layout, flags, command, description, category, last_used, copied_at,
+    # use_count, extra
+    RECORD = struct.Struct("<HBxIIIIIiI")
+    NONE = 0xFFFFFFFF      # string id of a None value
+    FAVORITE = 1
+    _STRING_KEYS = ("command", "description", "category", "last_used", "copied_at")
+    _FIELDS = {"favorite": 1, "command": 2, "description": 3, "category": 4,
+               "last_used": 5, "copied_at": 6, "use_count": 7}
+    # byte offset of a string id within a RECORD (after "<HBx")
+    _STRING_AT = {"command": 4, "description": 8}
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, self.source_mtime, self.source_size, n_strings, n_layouts,
+             n_cats, n_records, off_strings, off_bytes, off_layouts, off_cats,
+             off_records) = self.HEADER.unpack_from(self._mm, 0)
+            if magic != self.MAGIC:
+                raise ValueError("not a command snapshot")
+        except Exception:
+            self._mm.close()
+            raise
+        self._offsets = struct.unpack_from(f"<{2 * n_strings}I", self._mm, off_strings)
+        self._bytes_at = off_bytes
+        self._bytes_end = off_layouts
+        self._starts = None       # string start offsets, for string_id
+        self._strings = [None] * n_strings
+        self._records_at = off_records
+        self._remaining = n_records
+        ids = struct.unpack_from(f"<{n_layouts}I", self._mm, off_layouts)
+        # per layout: (key, position of its value in an unpacked RECORD)
+        self._layouts = [tuple((key, self._FIELDS.get(key, -1))
+                               for key in self.string(i).split("\x1f") if key)
+                         for i in ids]
+        self._cats = [self.CATEGORY.unpack_from(self._mm, off_cats + i * self.CATEGORY.size)
+                      for i in range(n_cats)]
+        if not n_records:
+            self.close()
+
+    @classmethod
+    def open_for(cls, path, source):
+        """The snapshot at ``path`` if it was built from ``source`` as it is now."""
+        try:
+            st = os.stat(source)
+            snap = cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+        if (snap.source_mtime, snap.source_size) != (st.st_mtime_ns, st.st_size):
+            snap.close()
+            return None
+        return snap
+
+    def commands(self):
+        out = {}
+        for name, first, count in self._cats:
+            category = sys.intern(self.string(name))
+            out[category] = SnapshotEntries(self, category, first, count)
+        return out
+
+    def string(self, i):
+        if i == self.NONE:
+            return None
+        s = self._strings[i]
+        if s is None:
+            start, length = self._offsets[2 * i], self._offsets[2 * i + 1]
+            at = self._bytes_at + start
+            s = self._strings[i] = str(self._mm[at:at + length], "utf-8")
+        return s
+
+    @property
+    def is_open(self):
+        return not self._mm.closed
+
+    def string_id(self, s):
+        """Id of ``s`` in the string table, or None.
+
+        Found with a byte search of the table, which stores every distinct
+        string once; nothing is decoded.
+        """
+        data = s.encode("utf-8")
+        if not data:
+            return next((i for i, n in enumerate(self._offsets[1::2]) if n == 0), None)
+        if self._starts is None:
+            self._starts = self._offsets[0::2]
+        starts = self._starts
+        pos = self._mm.find(data, self._bytes_at, self._bytes_end)
+        while pos != -1:
+            rel = pos - self._bytes_at
+            i = bisect.bisect_left(starts, rel)
+            while i < len(starts) and starts[i] == rel:
+                if self._offsets[2 * i + 1] == len(data):
+                    return i
+                i += 1
+            pos = self._mm.find(data, pos + 1, self._bytes_end)
+        return None
+
+    def records_with(self, key, value, first, stop):
+        """Numbers of the records in ``[first, stop)`` whose ``key`` (command or
+        description) is the string ``value``, in order."""
+        sid = self.string_id(value) if isinstance(value, str) else None
+        if sid is None:
+            return []
+        size, at = self.RECORD.size, self._STRING_AT[key]
+        base, end = self._records_at + at, self._records_at + stop * size
+        pattern = struct.pack("<I", sid)
+        found = []
+        pos = self._mm.find(pattern, base + first * size, end)
+        while pos != -1:
+            n, off = divmod(pos - base, size)
+            if off == 0:
+                found.append(n)
+                pos = self._mm.find(pattern, pos + size, end)
+            else:
+                pos = self._mm.find(pattern, pos + 1, end)
+        return found
+
+    def entry(self, n):
+        rec = self.RECORD.unpack_from(self._mm, self._records_at + n * self.RECORD.size)
+        extras = json.loads(self.string(rec[8])) if rec[8] != self.NONE else ()
+        strings, none = self._strings, self.NONE
+        out = {}
+        for key, pos in self._layouts[rec[0]]:
+            if key in extras:
+                out[key] = extras[key]
+            elif pos == 1:
+                out[key] = bool(rec[1] & self.FAVORITE)
+            elif pos == 7:
+                out[key] = rec[7]
+            elif rec[pos] == none:
+                out[key] = None
+            else:
+                out[key] = strings[rec[pos]] or self.string(rec[pos])
+        self._remaining -= 1
+        if not self._remaining:
+            self.close()   # everything decoded; let go of the file
+        return out
+
+    def close(self):
+        if not self._mm.closed:
+            self._mm.close()
+
+    @classmethod
+    def write(cls, path, commands, source_stat):
+        """Write a snapshot of ``commands``, read from a file with ``source_stat``."""
+        st = source_stat
+        strings, string_ids = [], {}
+        layouts, layout_ids = [], {}
+
+        def sid(s):
+            i = string_ids.get(s)
+            if i is None:
+                i = string_ids[s] = len(strings)
+                strings.append(s.encode("utf-8"))
+            return i
+
+        records, cats, n = bytearray(), [], 0
+        for cat, entries in commands.items():
+            first = n
+            for entry in entries:
+                records += cls._pack(entry.to_dict(), sid, layouts, layout_ids)
+                n += 1
+            cats.append((sid(cat), first, n - first))
+
+        offsets, pos = [], 0
+        for b in strings:
+            offsets += (pos, len(b))
+            pos += len(b)
+        blob = b"".join(strings)
+        off_strings = cls.HEADER.size
+        off_bytes = off_strings + 8 * len(strings)
+        off_layouts = off_bytes + len(blob)
+        off_cats = off_layouts + 4 * len(layouts)
+        off_records = off_cats + cls.CATEGORY.size * len(cats)
+        data = b"".join([
+            cls.HEADER.pack(cls.MAGIC, st.st_mtime_ns, st.st_size, len(strings),
+                            len(layouts), len(cats), n, off_strings, off_bytes,
+                            off_layouts, off_cats, off_records),
+            struct.pack(f"<{len(offsets)}I", *offsets), blob,
+            struct.pack(f"<{len(layouts)}I", *layouts),
+            b"".join(cls.CATEGORY.pack(*c) for c in cats),
+            bytes(records),
+        ])
+        _replace_file(path, data)
+
+    @classmethod
+    def _pack(cls, entry, sid, layouts, layout_ids):
+        keys = "\x1f".join(entry)
+        layout = layout_ids.get(keys)
+        if layout is None:
+            layout = layout_ids[keys] = len(layouts)
+            layouts.append(sid(keys))
+        ids, extras, flags = {}, {}, 0
+        for key in cls._STRING_KEYS:
+            value = entry.get(key)
+            if isinstance(value, str):
+                ids[key] = sid(value)
+            else:
+                ids[key] = cls.NONE
+                if value is not None:
+                    extras[key] = value
+        favorite = entry.get("favorite", False)
+        if type(favorite) is bool:
+            flags |= cls.FAVORITE if favorite else 0
+        else:
+            extras["favorite"] = favorite
+        use_count = entry.get("use_count", 0)
+        if type(use_count) is not int or not -2**31 <= use_count < 2**31:
+            extras["use_count"], use_count = use_count, 0
+        for key in entry:
+            if key not in cls._STRING_KEYS and key not in ("favorite", "use_count"):
+                extras[key] = entry[key]
+        extra = sid(json.dumps(extras, ensure_ascii=False)) if extras else cls.NONE
+        return cls.RECORD.pack(layout, flags, ids["command"], ids["description"],
+                               ids["category"], ids["last_used"], ids["copied_at"],
+                               use_count, extra)
+
+
+def _file_state(path):
+    """``(mtime_ns, size)`` of ``path``, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _file_mode(path):
+    """Permission bits for a new copy of ``path``: its own, or what open() would give."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def _replace_file(path, data):
+    """Atomically replace ``path`` with ``data`` (bytes), keeping its mode."""
+    directory = os.path.dirname(os.path.abspath(path))
+    import tempfile  # deferred: most CLI runs never write
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.",
+                               suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _file_mode(path))    # mkstemp makes it 0600
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Storage backends
+# ─────────────────────────────────────────────────────────────────────────────
+def _empty_bank():
+    return {"GAM": [], "AD": [], "PowerShell": []}
+
+
+def _remove_duplicates(commands):
+    """Drop repeated (command, description) pairs; True if any were found."""
+    changed = False
+    for cat in commands:
+        seen, unique = set(), []
+        for cmd in commands[cat]:
+            key = (cmd.command, cmd.description)
+            if key not in seen:
+                seen.add(key)
+                unique.append(cmd)
+        if len(unique) != len(commands[cat]):
+            commands[cat] = unique
+            changed = True
+    return changed
+
+
+class CommandStore:
+    """Where the bank is persisted.
+
+    The app edits its working copy (``CommandManager.commands``) and tells
+    the store what happened; each backend decides how that reaches disk.
+    ``load`` and ``replay`` run on the loader thread, everything else on the
+    Tk thread.
+    """
+
+    def begin_load(self):
+        """Called on the Tk thread before a (re)load starts."""
+
+    def changed_on_disk(self):
+        """True if another process changed the stored bank since it was loaded."""
+        return False
+
+    @property
+    def pending(self):
+        """True while edits are waiting to be written."""
+        return False
+
+    def discard_pending(self):
+        """Drop edits not written yet; the caller re-applies them to a fresh load."""
+
+    def load(self, progress):
+        """Return ``(commands, status text)``."""
+        raise NotImplementedError
+
+    def replay(self, index):
+        """Apply changes kept outside the main data (e.g. a usage journal)."""
+
+    def loaded(self):
+        """Called on the Tk thread once the loaded commands are live."""
+
+    def added(self, category, entry):
+        raise NotImplementedError
+
+    def removed(self, category, entry):
+        raise NotImplementedError
+
+    def updated(self, category, entry):
+        raise NotImplementedError
+
+    def used(self, category, entry):
+        """Usage telemetry changed (last_used, use_count, copied_at)."""
+        self.updated(category, entry)
+
+    def save(self):
+        """Write the whole bank now."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Make pending writes durable; False if one failed."""
+        return True
+
+    def close(self):
+        pass
+
+    def import_json(self, path):
+        """Replace the stored bank with the contents of a commands.json file."""
+        raise NotImplementedError
+
+    def export_json(self, path):
+        """Write the stored bank as commands.json (same schema, same text)."""
+        raise NotImplementedError
+
+
+class JsonCommandStore(CommandStore):
+    """``commands.json`` written behind the UI, usage in a journal, read via a snapshot."""
+
+    def __init__(self, root, path, source, on_error=None, on_external_change=None,
+                 write_snapshot=True):
+        self.path = path
+        self.source = source
+        self.write_snapshot = write_snapshot   # leave a snapshot after a JSON load
+        self.on_external_change = on_external_change
+        self.writer = WriteBehindStore(root, path, source, on_error=on_error,
+                                       guard=self._may_write)
+        self.journal = UsageJournal(os.path.splitext(path)[0] + ".usage.jsonl")
+        self._deduped = False
+        self._loaded_state = None     # _file_state of commands.json when it was read
+        self._index = None
+
+    def begin_load(self):
+        # never drop edits that are still waiting on the idle timer
+        self.writer.flush()
+        self.writer.reset()
+
+    def changed_on_disk(self):
+        # our own saves and usage records are not changes; anything else is
+        return self._saved_elsewhere() or self._journal_grew()
+
+    def _saved_elsewhere(self):
+        state = _file_state(self.path)
+        return state != self._loaded_state and state != self.writer.written
+
+    def _journal_grew(self):
+        journal = _file_state(self.journal.path)
+        return (journal and journal[1]) != self.journal.size
+
+    def _may_write(self):
+        # a timed save of a bank another process saved since would undo its
+        # edits; let the owner reload (and replay ours) instead
+        if self.on_external_change is None or not self.changed_on_disk():
+            return True
+        self.on_external_change()
+        return False
+
+    @property
+    def pending(self):
+        return self.writer.pending
+
+    def discard_pending(self):
+        self.writer.reset()
+
+    def load(self, progress):
+        self._deduped = False
+        # before reading, so a save racing the load shows up as a change
+        self._loaded_state = _file_state(self.path)
+        journal = _file_state(self.journal.path)
+        self.journal.size = journal and journal[1]    # replay updates it
+        if self._loaded_state is None:
+            return _empty_bank(), "No data file — starting fresh."
+        snap = self.snapshot_path()
+        snapshot = snap and CommandSnapshot.open_for(snap, self.path)
+        if snapshot:
+            progress(0.05, "Reading snapshot…")
+            return snapshot.commands(), "✔ Commands loaded."   # written after dedupe
+        progress(0.05, "Reading commands…")
+        st = os.stat(self.path)   # before reading, so a racing save marks it stale
+        with open(self.path, "r", encoding="utf-8") as f:
+            commands = bank_from_json(json.load(f))
+        progress(0.35, "Removing duplicates…")
+        self._deduped = _remove_duplicates(commands)
+        if snap and self.write_snapshot and not self._deduped:
+            self._write_snapshot(snap, commands, st)
+        return commands, "✔ Commands loaded."
+
+    def snapshot_path(self):
+        if os.environ.get("GAM_BANK_SNAPSHOT", "1") == "0":
+            return None
+        return os.path.splitext(self.path)[0] + ".snap"
+
+    @staticmethod
+    def _write_snapshot(path, commands, source_stat):
+        # only an accelerator: a failed write just means JSON next time
+        try:
+            CommandSnapshot.write(path, commands, source_stat)
+        except (OSError, struct.error, ValueError):
+            pass
+
+    def replay(self, index):
+        self._index = index       # compaction replays usage logged by others into it
+        self.journal.replay(index)
+
+    def loaded(self):
+        if self._deduped:
+            self.writer.mark_dirty()
+        if self.journal.needs_compaction:
+            self._compact_journal()
+
+    def added(self, category, entry):
+        self.writer.mark_dirty(category)
+
+    def removed(self, category, entry):
+        self.writer.mark_dirty(category)
+
+    def updated(self, category, entry):
+        self.writer.mark_dirty(category)
+
+    def used(self, category, entry):
+        try:
+            self.journal.record(category, entry)
+        except OSError:
+            # journal not writable — fall back to a regular debounced save
+            self.writer.mark_dirty(category)
+            return
+        if self.journal.needs_compaction:
+            self._compact_journal()
+
+    def _compact_journal(self):
+        # fold the telemetry into commands.json, then start a fresh journal
+        if self._saved_elsewhere():
+            return                # writing our bank would undo that save; compact after a reload
+        if self._journal_grew() and self._index is not None:
+            # usage another process logged is only in the journal: take it in first
+            self.journal.replay(self._index, self.journal.read_to)
+        self.writer.mark_dirty()
+        if self.writer.flush():
+            self.journal.truncate()
+
+    def save(self):
+        self.writer.mark_dirty()
+        self.writer.flush()
+
+    def flush(self):
+        return self.writer.flush()
+
+    def close(self):
+        self.writer.flush()
+        self.journal.close()
+
+    def import_json(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        json.loads(text)          # refuse anything that is not JSON
+        self.writer.flush()
+        self.writer.reset()
+        _replace_file(self.path, text.encode("utf-8"))
+        self.journal.truncate()   # usage of the old bank does not apply
+
+    def export_json(self, path):
+        text = json.dumps(bank_to_json(self.source()), indent=4, ensure_ascii=False)
+        _replace_file(path, text.encode("utf-8"))
+
+
+class SqliteCommandStore(CommandStore):
+    """``commands.db``: one row per command, WAL mode, row-level writes.
+
+    Several processes can read while one writes, and a click or an edit
+    touches a single row instead of rewriting the bank.  Each row keeps the
+    entry's key order and any value without a column of its own (``keys``
+    and ``extra``), so importing and exporting commands.json is lossless.
+    ``category`` is the tab a command is filed under; an entry's own
+    "category" field is only stored separately when it differs.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (
+            name        TEXT PRIMARY KEY,
+            position    INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS commands (
+            id          INTEGER PRIMARY KEY,
+            category    TEXT NOT NULL,
+            position    INTEGER NOT NULL,
+            command     TEXT,
+            description TEXT,
+            favorite    INTEGER,
+            use_count   INTEGER,
+            last_used   TEXT,
+            copied_at   TEXT,
+            keys        TEXT NOT NULL,
+            extra       TEXT
+        );
+        CREATE INDEX IF NOT EXISTS commands_category    ON commands(category, position);
+        CREATE INDEX IF NOT EXISTS commands_description ON commands(description);
+        CREATE INDEX IF NOT EXISTS commands_favorite    ON commands(favorite);
+        CREATE INDEX IF NOT EXISTS commands_use_count   ON commands(use_count);
+        CREATE INDEX IF NOT EXISTS commands_copied_at   ON commands(copied_at);
+    """
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS commands_fts USING fts5(
+            command, description, content='commands', content_rowid='id');
+        CREATE TRIGGER IF NOT EXISTS commands_fts_ai AFTER INSERT ON commands BEGIN
+            INSERT INTO commands_fts(rowid, command, description)
+            VALUES (new.id, new.command, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS commands_fts_ad AFTER DELETE ON commands BEGIN
+            INSERT INTO commands_fts(commands_fts, rowid, command, description)
+            VALUES ('delete', old.id, old.command, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS commands_fts_au AFTER UPDATE OF command, description
+        ON commands BEGIN
+            INSERT INTO commands_fts(commands_fts, rowid, command, description)
+            VALUES ('delete', old.id, old.command, old.description);
+            INSERT INTO commands_fts(rowid, command, description)
+            VALUES (new.id, new.command, new.description);
+        END;
+    """
+    COLUMNS = ("command", "description", "favorite", "use_count", "last_used", "copied_at")
+    _TEXT = ("command", "description", "last_used", "copied_at")
+
+    def __init__(self, path, json_path=None):
+        self.path = path
+        self.json_path = json_path    # imported once while the database is empty
+        self.fts = False
+        self._db = None               # Tk-thread connection
+        self._rows = {}               # id(entry) -> (entry, rowid)
+        self._loaded_rows = {}
+        self._data_version = None     # of self.db when the load went live
+
+    # ── connections ──────────────────────────────────────────────────────
+    def connect(self):
+        import sqlite3  # deferred: only needed with this backend
+        db = sqlite3.connect(self.path, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(self.SCHEMA)
+        try:
+            db.executescript(self.FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False          # SQLite built without FTS5
+        return db
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = self.connect()
+        return self._db
+
+    # ── row encoding ─────────────────────────────────────────────────────
+    @classmethod
+    def encode(cls, category, entry):
+        """Column values, key order and leftovers (JSON) for one entry."""
+        values, extra = dict.fromkeys(cls.COLUMNS), {}
+        for key in cls._TEXT:
+            value = entry.get(key)
+            if value is None or isinstance(value, str):
+                values[key] = value
+            else:
+                extra[key] = value
+        favorite = entry.get("favorite")
+        if favorite is None or type(favorite) is bool:
+            values["favorite"] = None if favorite is None else int(favorite)
+        else:
+            extra["favorite"] = favorite
+        use_count = entry.get("use_count")
+        if use_count is None or (type(use_count) is int and -2**63 <= use_count < 2**63):
+            values["use_count"] = use_count
+        else:
+            extra["use_count"] = use_count
+        for key, value in entry.items():
+            if key == "category":
+                if value != category:
+                    extra[key] = value
+            elif key not in values:
+                extra[key] = value
+        return (values, json.dumps(list(entry), ensure_ascii=False),
+                json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    @staticmethod
+    def decode(category, keys, extra, command, description, favorite, use_count,
+               last_used, copied_at):
+        extras = json.loads(extra) if extra else {}
+        columns = {"command": command, "description": description,
+                   "favorite": None if favorite is None else bool(favorite),
+                   "use_count": use_count, "last_used": last_used,
+                   "copied_at": copied_at, "category": category}
+        return {key: extras[key] if key in extras else columns.get(key)
+                for key in json.loads(keys)}
+
+    _SELECT = ("SELECT c.id, c.category, c.keys, c.extra, c.command, c.description, "
+               "c.favorite, c.use_count, c.last_used, c.copied_at FROM commands c ")
+
+    # ── load ─────────────────────────────────────────────────────────────
+    def load(self, progress):
+        db = self.connect()       # the loader thread gets its own connection
+        try:
+            empty = db.execute("SELECT COUNT(*) FROM categories").fetchone()[0] == 0
+            if empty and self.json_path and os.path.exists(self.json_path):
+                progress(0.05, "Importing commands.json…")
+                with open(self.json_path, "r", encoding="utf-8") as f:
+                    self._replace_all(db, json.load(f))
+            progress(0.2, "Reading commands…")
+            with db:
+                # same rule as the JSON backend: first (command, description) wins
+                db.execute("""
+                    DELETE FROM commands WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (
+                                PARTITION BY category, IFNULL(command, ''), IFNULL(description, '')
+                                ORDER BY position) AS n
+                            FROM commands)
+                        WHERE n > 1)""")
+            commands = {sys.intern(name): [] for (name,) in
+                        db.execute("SELECT name FROM categories ORDER BY position")}
+            rows = {}
+            for rowid, category, *fields in db.execute(
+                    self._SELECT + "ORDER BY c.category, c.position"):
+                entry = Command.from_dict(self.decode(category, *fields), category)
+                commands.setdefault(entry.category, []).append(entry)
+                rows[id(entry)] = (entry, rowid)
+            self._loaded_rows = rows
+        finally:
+            db.close()
+        if not commands:
+            return _empty_bank(), "No data yet — starting fresh."
+        return commands, "✔ Commands loaded."
+
+    def loaded(self):
+        self._rows, self._loaded_rows = self._loaded_rows, {}
+        self._data_version = self._read_data_version()
+
+    def changed_on_disk(self):
+        # data_version moves when any other connection commits, never for our own
+        return self._data_version is not None and \
+            self._read_data_version() != self._data_version
+
+    def _read_data_version(self):
+        return self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    # ── row-level writes ─────────────────────────────────────────────────
+    def _ensure_category(self, db, category):
+        db.execute("INSERT OR IGNORE INTO categories(name, position) "
+                   "SELECT ?, IFNULL(MAX(position) + 1, 0) FROM categories", (category,))
+
+    def added(self, category, entry):
+        values, keys, extra = self.encode(category, entry.to_dict())
+        with self.db as db:
+            self._ensure_category(db, category)
+            cur = db.execute(
+                "INSERT INTO commands(category, position, command, description, favorite, "
+                "use_count, last_used, copied_at, keys, extra) "
+                "SELECT ?, IFNULL(MAX(position) + 1, 0), ?, ?, ?, ?, ?, ?, ?, ? "
+                "FROM commands WHERE category = ?",
+                (category, *values.values(), keys, extra, category))
+        self._rows[id(entry)] = (entry, cur.lastrowid)
+
+    def removed(self, category, entry):
+        _, rowid = self._rows.pop(id(entry), (None, None))
+        if rowid is not None:
+            with self.db as db:
+                db.execute("DELETE FROM commands WHERE id = ?", (rowid,))
+
+    def updated(self, category, entry):
+        row = self._rows.get(id(entry))
+        if row is None:
+            return
+        values, keys, extra = self.encode(category, entry.to_dict())
+        with self.db as db:
+            db.execute(
+                "UPDATE commands SET command = ?, description = ?, favorite = ?, "
+                "use_count = ?, last_used = ?, copied_at = ?, keys = ?, extra = ? "
+                "WHERE id = ?", (*values.values(), keys, extra, row[1]))
+
+    def save(self):
+        pass                      # every change is committed as it happens
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ── import / export / query ──────────────────────────────────────────
+    def _replace_all(self, db, commands):
+        with db:
+            db.execute("DELETE FROM commands")
+            db.execute("DELETE FROM categories")
+            for pos, (category, entries) in enumerate(commands.items()):
+                db.execute("INSERT INTO categories(name, position) VALUES (?, ?)",
+                           (category, pos))
+                rows = []
+                for i, entry in enumerate(entries):
+                    values, keys, extra = self.encode(category, entry)
+                    rows.append((category, i, *values.values(), keys, extra))
+                db.executemany(
+                    "INSERT INTO commands(category, position, command, description, "
+                    "favorite, use_count, last_used, copied_at, keys, extra) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def import_json(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            commands = json.load(f)
+        self._replace_all(self.db, commands)
+        self._rows = {}           # the caller reloads
+
+    def export_json(self, path):
+        db = self.db
+        commands = {name: [] for (name,) in
+                    db.execute("SELECT name FROM categories ORDER BY position")}
+        for _, category, *fields in db.execute(self._SELECT + "ORDER BY c.category, c.position"):
+            commands.setdefault(category, []).append(self.decode(category, *fields))
+        text = json.dumps(commands, indent=4, ensure_ascii=False)
+        _replace_file(path, text.encode("utf-8"))
+
+    def search(self, query, limit=50, category=None):
+        """Full-text ``[(category, entry), ...]`` straight from the database.
+
+        Every word must match as a prefix of a word in the command or its
+        description.  Falls back to LIKE when SQLite lacks FTS5.
+        """
+        words = _TOKEN_RE.findall(query.lower())
+        if not words:
+            return []
+        db, where, args = self.db, [], []
+        if self.fts:
+            sql = self._SELECT + "JOIN commands_fts f ON f.rowid = c.id WHERE commands_fts MATCH ? "
+            args.append(" ".join(f'"{w}"*' for w in words))
+            order = "ORDER BY f.rank"
+        else:
+            sql = self._SELECT + "WHERE 1 "
+            for w in words:
+                where.append("AND (c.command LIKE ? OR c.description LIKE ?) ")
+                args += [f"%{w}%", f"%{w}%"]
+            order = "ORDER BY c.use_count DESC"
+        if category is not None:
+            where.append("AND c.category = ? ")
+            args.append(category)
+        rows = db.execute(sql + "".join(where) + order + " LIMIT ?", (*args, limit))
+        return [(cat, Command.from_dict(self.decode(cat, *fields), cat))
+                for _, cat, *fields in rows]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Command index
+# ─────────────────────────────────────────────────────────────────────────────
+class CommandIndex:
+    """Hash lookups over the entries of the commands dict.
+
+    Entries are keyed by (category, description), (category, command) and
+    (category, command, description).  Lookups return the first entry with
+    that key in list order, i.e. the entry the old linear scans found.
+
+    A category's tables are built on its first lookup, from the live
+    ``commands`` dict (so :meth:`add`/:meth:`remove` only touch built
+    tables).  A category still held by a snapshot is searched in the
+    snapshot instead, which decodes just the entry found; its tables are
+    built once it has been searched ``BUILD_AFTER`` times.
+    """
+
+    BUILD_AFTER = 16
+
+    def __init__(self, commands=None):
+        self.rebuild({} if commands is None else commands)
+
+    def rebuild(self, commands):
+        self._commands = commands
+        self._tables = {}         # category -> (by description, by command, by pair)
+        self._scans = {}          # category -> snapshot searches so far
+
+    def add(self, category, entry):
+        table = self._tables.get(category)
+        if table is not None:
+            self._file(table, category, entry)
+
+    def remove(self, category, entry):
+        table = self._tables.get(category)
+        if table is None:
+            return
+        command, desc = entry.command, entry.description
+        for tab, key in ((table[0], (category, desc)),
+                         (table[1], (category, command)),
+                         (table[2], (category, command, desc))):
+            bucket = [e for e in tab.get(key, ()) if e is not entry]
+            if bucket:
+                tab[key] = bucket
+            else:
+                tab.pop(key, None)
+
+    def by_description(self, category, description):
+        return self._get(category, 0, (category, description), description=description)
+
+    def by_command(self, category, command):
+        return self._get(category, 1, (category, command), command=command)
+
+    def find(self, category, command, description):
+        return self._get(category, 2, (category, command, description),
+                         command=command, description=description)
+
+    def update(self, category, command, description, fn):
+        """Call ``fn(entry)`` on the entry :meth:`find` gives, if there is one.
+
+        For a snapshot category nothing has been read from yet, the call is
+        deferred until that entry is decoded.
+        """
+        entries = self._commands.get(category)
+        if category not in self._tables and isinstance(entries, SnapshotEntries) \
+                and entries.untouched:
+            entries.patch(command, description, fn)
+            return
+        entry = self.find(category, command, description)
+        if entry is not None:
+            fn(entry)
+
+    def _get(self, category, which, key, **fields):
+        table = self._tables.get(category)
+        if table is None:
+            entries = self._commands.get(category)
+            scans = self._scans.get(category, 0)
+            if scans < self.BUILD_AFTER and isinstance(entries, SnapshotEntries) \
+                    and entries.scannable:
+                self._scans[category] = scans + 1
+                return entries.lookup(**fields)
+            table = self._tables[category] = ({}, {}, {})
+            for entry in self._commands.get(category, ()):
+                self._file(table, category, entry)
+        bucket = table[which].get(key)
+        return bucket[0] if bucket else None
+
+    @staticmethod
+    def _file(table, category, entry):
+        command, desc = entry.command, entry.description
+        table[0].setdefault((category, desc), []).append(entry)
+        table[1].setdefault((category, command), []).append(entry)
+        table[2].setdefault((category, command, desc), []).append(entry)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Favorites / recents views
+# ─────────────────────────────────────────────────────────────────────────────
+class UsageViews:
+    """The favorites and recently-copied lists, kept current as usage happens.
+
+    The ★ and ⌚ windows used to scan (and sort) the whole bank every time
+    they opened.  Now ``_toggle_favorite``, ``copy_command`` and
+    ``remove_command`` report each change here, and a window only reads the
+    page it shows.  Favorites are an insertion-ordered dict; recents are a
+    list of ``(copied_at, seq)`` keys kept sorted with ``bisect`` and capped
+    at ``RECENT_LIMIT``, so every update is a binary search plus a short
+    list shift.
+    """
+
+    RECENT_LIMIT = 200
+
+    def __init__(self):
+        self.rebuild({})
+
+    def rebuild(self, commands):
+        self._favorites = {}     # id(entry) -> (category, entry)
+        self._recent = []        # (copied_at, seq), oldest first
+        self._recent_items = {}  # (copied_at, seq) -> (category, entry)
+        self._recent_keys = {}   # id(entry) -> (copied_at, seq)
+        self._seq = 0
+        copied = []
+        for cat, entries in commands.items():
+            for entry in entries:
+                if entry.favorite:
+                    self._favorites[id(entry)] = (cat, entry)
+                if entry.copied_at is not None:
+                    copied.append((cat, entry))
+        newest = heapq.nlargest(self.RECENT_LIMIT, copied, key=lambda ce: ce[1].copied_at)
+        for cat, entry in reversed(newest):
+            self._push(cat, entry)
+
+    # ── updates ──────────────────────────────────────────────────────────
+    def favorite_changed(self, category, entry):
+        if entry.favorite:
+            self._favorites[id(entry)] = (category, entry)
+        else:
+            self._favorites.pop(id(entry), None)
+
+    def copied(self, category, entry):
+        self._drop_recent(entry)
+        if entry.copied_at is not None:
+            self._push(category, entry)
+
+    def remove(self, category, entry):
+        self._favorites.pop(id(entry), None)
+        self._drop_recent(entry)
+
+    # ── pages ────────────────────────────────────────────────────────────
+    @property
+    def favorite_count(self):
+        return len(self._favorites)
+
+    @property
+    def recent_count(self):
+        return len(self._recent)
+
+    def favorites(self, start, count):
+        """``[(category, entry), ...]`` in the order they were starred."""
+        return list(itertools.islice(self._favorites.values(), start, start + count))
+
+    def recent(self, start, count):
+        """``[(category, entry), ...]``, most recently copied first."""
+        end = len(self._recent) - start
+        keys = self._recent[max(end - count, 0):max(end, 0)]
+        return [self._recent_items[key] for key in reversed(keys)]
+
+    # ── internals ────────────────────────────────────────────────────────
+    def _push(self, category, entry):
+        key = (entry.copied_at, self._seq)
+        self._seq += 1
+        bisect.insort(self._recent, key)
+        self._recent_items[key] = (category, entry)
+        self._recent_keys[id(entry)] = key
+        if len(self._recent) > self.RECENT_LIMIT:
+            _, oldest = self._recent_items.pop(self._recent.pop(0))
+            del self._recent_keys[id(oldest)]
+
+    def _drop_recent(self, entry):
+        key = self._recent_keys.pop(id(entry), None)
+        if key is not None:
+            del self._recent[bisect.bisect_left(self._recent, key)]
+            del self._recent_items[key]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Frecency ranking
+# ─────────────────────────────────────────────────────────────────────────────
+# Every use adds 1 to a command's score and scores halve every half-life, so a
+# command used five times this week outranks one used fifty times last year.
+# Scores are kept as log(Σ e^(λ·t_use)) rather than Σ e^(-λ·(now - t_use)):
+# both decay by the same factor for every command, so a key never has to be
+# re-decayed, keys compare the same way at any moment, and a use is a single
+# log-add (λ·t is ~1000 for today's dates, far beyond what exp() can hold —
+# hence the log space).
+#
+# The key is a cache and lives only in memory.  A loaded command starts from
+# the estimate in frecency_key (its uses all counted at last_used) and is
+# bumped exactly from there on.
+FRECENCY_HALF_LIFE_DAYS = 14
+_DECAY = math.log(2) / (FRECENCY_HALF_LIFE_DAYS * 86_400_000_000)   # per microsecond
+
+
+def frecency_key(entry):
+    """The entry's ranking key; -inf if it has never been used."""
+    if entry.frecency is not None:
+        return entry.frecency
+    if entry.use_count > 0:
+        # not used since the bank was loaded: count its uses at last_used
+        return _DECAY * (entry.last_used or 0) + math.log(entry.use_count)
+    return -math.inf
+
+
+def frecency_bump(key, stamp):
+    """``key`` after one more use at ``stamp`` (µs)."""
+    fresh = _DECAY * stamp
+    hi, lo = (key, fresh) if key > fresh else (fresh, key)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def frecency_value(key, now):
+    """Decayed use count at ``now`` (µs): 1.0 for a single use just now."""
+    return math.exp(key - _DECAY * now) if key > -math.inf else 0.0
+
+
+class RankedRows(Sequence):
+    """A tab's commands, most frecent first, then the never-used ones in bank order.
+
+    This is what the tab's picker lists.  ``used`` moves one entry with a
+    binary search over ``(-key, seq)`` instead of re-sorting the tab; an
+    entry leaves the unused tail only on its first use.
+    """
+
+    def __init__(self, entries):
+        self._seq = 0
+        scored, self._tail = [], []
+        for entry in entries:
+            key = frecency_key(entry)
+            if key > -math.inf:
+                scored.append(((-key, self._next()), entry))
+            else:
+                self._tail.append(entry)
+        scored.sort(key=lambda ke: ke[0])
+        self._keys = [k for k, _ in scored]      # ascending (-key, seq)
+        self._ranked = [e for _, e in scored]
+        self._where = {id(e): k for k, e in scored}
+
+    def __len__(self):
+        return len(self._ranked) + len(self._tail)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        n = len(self._ranked)
+        return self._ranked[i] if i < n else self._tail[i - n]
+
+    def used(self, entry):
+        self._drop(entry)
+        key = (-frecency_key(entry), self._next())
+        i = bisect.bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self._ranked.insert(i, entry)
+        self._where[id(entry)] = key
+
+    def add(self, entry):
+        self._tail.append(entry)
+
+    def remove(self, entry):
+        self._drop(entry)
+
+    @property
+    def ranked_count(self):
+        return len(self._ranked)
+
+    def ranked(self):
+        """``((-key, seq), entry)`` pairs, best first."""
+        return zip(self._keys, self._ranked)
+
+    def _drop(self, entry):
+        key = self._where.pop(id(entry), None)
+        if key is not None:
+            i = bisect.bisect_left(self._keys, key)
+            del self._keys[i], self._ranked[i]
+        else:
+            i = next((i for i, e in enumerate(self._tail) if e is entry), None)
+            if i is not None:
+                del self._tail[i]
+
+    def _next(self):
+        self._seq += 1
+        return self._seq
+
+
+class FrecencyRanker:
+    """``RankedRows`` for every category, plus the best commands across them."""
+
+    def __init__(self):
+        self.rebuild({})
+
+    def rebuild(self, commands):
+        self._rows = {cat: RankedRows(entries) for cat, entries in commands.items()}
+
+    def rows(self, category):
+        rows = self._rows.get(category)
+        if rows is None:
+            rows = self._rows[category] = RankedRows(())
+        return rows
+
+    def used(self, category, entry):
+        self.rows(category).used(entry)
+
+    def add(self, category, entry):
+        self.rows(category).add(entry)
+
+    def remove(self, category, entry):
+        self.rows(category).remove(entry)
+
+    def top(self, start, count):
+        """``[(category, entry), ...]`` ranked across every category."""
+        merged = heapq.merge(*(self._tagged(cat, rows) for cat, rows in self._rows.items()))
+        return [(cat, entry) for _, cat, entry in
+                itertools.islice(merged, start, start + count)]
+
+    @property
+    def ranked_count(self):
+        return sum(rows.ranked_count for rows in self._rows.values())
+
+    @staticmethod
+    def _tagged(category, rows):
+        for key, entry in rows.ranked():
+            yield key, category, entry
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Search index
+# ─────────────────────────────────────────────────────────────────────────────
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class SearchIndex:
+    """Inverted index behind the header search bar.
+
+    Every entry is tokenised (command text — which includes the placeholder
+    names — plus the description) into a token → doc-id postings map.  The
+    distinct tokens are also filed under their trigrams and their first
+    character, so a query term only has to be compared against a small part
+    of the vocabulary.  All query terms must match; hits are scored by match
+    quality plus usage and only the best ``limit`` are returned.
+
+    Matching is typo tolerant, tuned for GAM/PowerShell syntax: a term can hit
+    a token exactly, as a prefix or substring, as an abbreviation (``usr`` →
+    ``user``, ``suspnd`` → ``suspended``) or within a small edit distance
+    (``supsend`` → ``suspend``).  Per-term matches and the result set of each
+    query prefix are kept from the previous keystroke, so typing one more
+    character only refines the last term.
+    """
+
+    QUALITY_WEIGHT = 10.0
+    SCAN_LIMIT = 2000        # below this many candidates, check docs directly
+
+    def __init__(self):
+        self.rebuild({})
+
+    def rebuild(self, commands):
+        self._docs = []          # doc id -> (category, entry) | None once removed
+        self._doc_ids = {}       # id(entry) -> doc id
+        self._doc_tokens = []    # doc id -> tuple of distinct tokens
+        self._rank = []          # doc id -> usage score
+        self._postings = {}      # token -> {doc id}
+        self._grams = {}         # trigram -> {token}
+        self._initials = {}      # first character -> {token}
+        self._forget()
+        now = now_us()
+        for cat, entries in commands.items():
+            for entry in entries:
+                self._add(cat, entry, now)
+
+    def add(self, category, entry):
+        self._add(category, entry, now_us())
+        self._forget()
+
+    def remove(self, category, entry):
+        doc = self._doc_ids.pop(id(entry), None)
+        if doc is None:
+            return
+        tokens, self._docs[doc], self._doc_tokens[doc] = self._doc_tokens[doc], None, ()
+        for tok in tokens:
+            posting = self._postings[tok]
+            posting.discard(doc)
+            if not posting:
+                del self._postings[tok]
+                self._initials[tok[0]].discard(tok)
+                for gram in self._trigrams(tok):
+                    self._grams[gram].discard(tok)
+        self._forget()
+
+    def touch(self, entry):
+        """Refresh the ranking of an entry after its usage stats changed."""
+        doc = self._doc_ids.get(id(entry))
+        if doc is not None:
+            self._rank[doc] = self._score(entry, now_us())
+
+    def search(self, query, limit=50, category=None):
+        """Return the best ``[(category, entry), ...]``, or None for an empty query."""
+        scored = self._scored(query)
+        if scored is None:
+            return None
+        scores, key = scored
+        if category is not None:
+            scores = [d for d in scores if self._docs[d][0] == category]
+        return [self._docs[d] for d in heapq.nlargest(limit, scores, key=key)]
+
+    def count(self, query, category=None):
+        """The number of hits :meth:`search` ranks for ``query``, before ``limit``."""
+        scored = self._scored(query)
+        if scored is None:
+            return 0
+        if category is None:
+            return len(scored[0])
+        return sum(1 for d in scored[0] if self._docs[d][0] == category)
+
+    def search_grouped(self, query, limit=50):
+        """Like :meth:`search` but keeps the best ``limit`` hits per category."""
+        scored = self._scored(query)
+        if scored is None:
+            return None
+        scores, key = scored
+        groups = {}
+        for doc in scores:
+            groups.setdefault(self._docs[doc][0], []).append(doc)
+        return {cat: [self._docs[d][1] for d in heapq.nlargest(limit, docs, key=key)]
+                for cat, docs in groups.items()}
+
+    # ── internals ────────────────────────────────────────────────────────
+    def _forget(self):
+        self._last_terms = {}    # term -> ({token: quality}, {doc: quality} | None)
+        self._last_prefixes = {} # tuple(terms[:i]) -> {doc: summed quality}
+
+    def _add(self, category, entry, now):
+        doc = len(self._docs)
+        text = f"{entry.command}\n{entry.description}".lower()
+        tokens = tuple(set(_TOKEN_RE.findall(text)))
+        self._docs.append((category, entry))
+        self._doc_ids[id(entry)] = doc
+        self._doc_tokens.append(tokens)
+        self._rank.append(self._score(entry, now))
+        for tok in tokens:
+            posting = self._postings.get(tok)
+            if posting is None:
+                posting = self._postings[tok] = set()
+                self._initials.setdefault(tok[0], set()).add(tok)
+                for gram in self._trigrams(tok):
+                    self._grams.setdefault(gram, set()).add(tok)
+            posting.add(doc)
+
+    def _scored(self, query):
+        terms = tuple(_TOKEN_RE.findall(query.lower()))
+        if not terms:
+            return None
+        old_terms, old_prefixes = self._last_terms, self._last_prefixes
+        self._last_terms, self._last_prefixes = {}, {}
+        # resume from the longest query prefix the previous keystroke solved
+        start, scores = 0, None
+        for i in range(len(terms), 0, -1):
+            if terms[:i] in old_prefixes:
+                start, scores = i, old_prefixes[terms[:i]]
+                break
+        for i, term in enumerate(terms):
+            matches, term_docs = self._last_terms.get(term) or old_terms.get(term) or \
+                (self._match(term, old_terms), None)
+            if i >= start:
+                if scores is not None and len(scores) <= self.SCAN_LIMIT:
+                    scores = {d: acc + q for d, acc in scores.items()
+                              if (q := max((matches.get(t, 0.0) for t in self._doc_tokens[d]),
+                                           default=0.0))}
+                else:
+                    if term_docs is None:
+                        term_docs = self._term_docs(matches)
+                    if scores is None:
+                        scores = term_docs
+                    else:
+                        scores = {d: acc + term_docs[d] for d, acc in scores.items()
+                                  if d in term_docs}
+            self._last_terms[term] = (matches, term_docs)
+            if i >= start:
+                self._last_prefixes[terms[:i + 1]] = scores
+            elif terms[:i + 1] in old_prefixes:
+                # keep the prefixes resumed from, or the next keystroke misses them
+                self._last_prefixes[terms[:i + 1]] = old_prefixes[terms[:i + 1]]
+            if not scores:
+                scores = {}
+                break
+        weight, rank = self.QUALITY_WEIGHT / len(terms), self._rank
+        return scores, lambda d: scores[d] * weight + rank[d]
+
+    def _match(self, term, previous):
+        """Map every vocabulary token that ``term`` matches to its match quality."""
+        # Tokens matched exactly, by prefix, substring or abbreviation only get
+        # fewer as a term grows, so the previous keystroke's matches are a
+        # complete candidate set for those tiers.
+        base = next((m for old, (m, _) in previous.items() if term.startswith(old)), None)
+        if base is not None:
+            candidates = set(base)
+        elif len(term) >= 3:
+            grams = sorted((self._grams.get(g, ()) for g in self._trigrams(term)), key=len)
+            candidates = grams[0].intersection(*grams[1:]) if grams[0] else set()
+            candidates |= self._initials.get(term[0], set())
+        else:
+            candidates = self._postings.keys()
+        if len(term) >= 4:
+            # typo candidates are not monotonic, so always draw them afresh
+            candidates = set(candidates) | self._initials.get(term[0], set())
+        matches = {}
+        for tok in candidates:
+            q = self._quality(term, tok)
+            if q:
+                matches[tok] = q
+        return matches
+
+    def _term_docs(self, matches):
+        docs = {}
+        for tok, q in sorted(matches.items(), key=lambda kv: kv[1], reverse=True):
+            for doc in self._postings[tok]:
+                if doc not in docs:
+                    docs[doc] = q
+        return docs
+
+    @staticmethod
+    def _quality(term, tok):
+        if tok == term:
+            return 1.0
+        if tok.startswith(term):
+            return 0.9
+        if term in tok:
+            return 0.75
+        if tok[0] != term[0] or len(term) < 2:
+            return 0.0
+        if len(tok) > len(term) and _is_subsequence(term, tok):
+            return 0.4 + 0.3 * len(term) / len(tok)
+        max_dist = 1 if len(term) < 7 else 2
+        if len(term) >= 4 and abs(len(tok) - len(term)) <= max_dist and \
+                _edit_distance(term, tok, max_dist) <= max_dist:
+            return 0.35
+        return 0.0
+
+    @staticmethod
+    def _trigrams(token):
+        return {token[i:i + 3] for i in range(len(token) - 2)}
+
+    @staticmethod
+    def _score(entry, now):
+        score = math.log1p(frecency_value(frecency_key(entry), now))
+        if entry.favorite:
+            score += 3.0
+        return score
+
+
+def _is_subsequence(needle, haystack):
+    it = iter(haystack)
+    return all(ch in it for ch in needle)
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance, giving up early once it exceeds ``limit``."""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Background command execution
+# ─────────────────────────────────────────────────────────────────────────────
+def _popen_options():
+    # no console window flashing up from the windowed exe; on POSIX the child
+    # leads its own session so _kill_process can take its children down too
+    if os.name == "posix":
+        return {"start_new_session": True}
+    import subprocess
+    return {"creationflags": getattr(subprocess, "CREATE_NO_WINDOW", 0)}
+
+
+def _kill_process(proc):
+    if proc is None or proc.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass
+
+
+class CommandRun:
+    """State of one command started through :class:`CommandRunner`."""
+
+    def __init__(self, run_id, argv, timeout, on_output, on_done, pool=None):
+        self.id = run_id
+        self.argv = argv              # argv list, or the script text for pooled runs
+        self.timeout = timeout
+        self.on_output = on_output    # called on the Tk thread with (run, [(stream, line)])
+        self.on_done = on_done        # called on the Tk thread with this run
+        self.pool = pool
+        self.proc = None
+        self.host = None
+        self.returncode = None
+        self.error = None
+        self.cancelled = False
+        self.timed_out = False
+
+    def kill(self):
+        # a pooled run is stopped by killing its host; the pool recycles it
+        host = self.host
+        _kill_process(host.proc if host is not None else self.proc)
+
+
+class CommandRunner:
+    """Runs external commands on a thread pool and streams output back to Tk.
+
+    Worker threads read stdout/stderr line by line into a queue; the Tk thread
+    drains it every ``poll_ms`` and hands each run its lines in one batch, so
+    a chatty command costs one widget update per poll rather than per line.
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        from concurrent.futures import ThreadPoolExecutor  # deferred: CLI startup
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="command-run")
+        self._events = queue.Queue()
+        self._runs = {}
+        self._next_id = 1
+        self._poll_job = None
+
+    def start(self, argv, on_output, on_done, timeout=60, pool=None):
+        """Run ``argv`` in a new process, or the script ``argv`` on a ``pool`` host."""
+        run = CommandRun(self._next_id, argv, timeout, on_output, on_done, pool)
+        self._next_id += 1
+        self._runs[run.id] = run
+        self._pool.submit(self._execute, run)
+        if self._poll_job is None:
+            self._poll_job = self.root.after(self.poll_ms, self._drain)
+        return run
+
+    def cancel(self, run):
+        run.cancelled = True
+        run.kill()
+
+    def shutdown(self):
+        for run in list(self._runs.values()):
+            self.cancel(run)
+        self._pool.shutdown(wait=False)
+
+    # ── worker side ──────────────────────────────────────────────────────
+    def _execute(self, run):
+        try:
+            if not run.cancelled:
+                if run.pool is not None:
+                    self._execute_pooled(run)
+                else:
+                    self._execute_process(run)
+        finally:
+            self._events.put((run.id, "done", None))
+
+    def _execute_process(self, run):
+        import subprocess  # deferred until something actually runs
+        try:
+            run.proc = proc = subprocess.Popen(
+                run.argv, stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_popen_options())
+        except OSError as exc:
+            run.error = str(exc)
+            return
+        if run.cancelled:
+            run.kill()
+        timer = self._start_timer(run)
+        err_reader = threading.Thread(target=self._pump, args=(run, proc.stderr, "stderr"),
+                                      daemon=True)
+        err_reader.start()
+        self._pump(run, proc.stdout, "stdout")
+        err_reader.join()
+        run.returncode = proc.wait()
+        timer.cancel()
+
+    def _execute_pooled(self, run):
+        try:
+            host = run.pool.acquire()
+        except PowerShellHostError as exc:
+            run.error = str(exc)
+            return
+        if run.cancelled:
+            # cancelled while waiting for a host: it was never used, so it
+            # goes back to the pool (release() drops it if it died meanwhile)
+            run.pool.release(host, used=False)
+            return
+        run.host = host
+        broken = True
+        timer = self._start_timer(run)
+        try:
+            if not run.cancelled:
+                run.returncode = host.execute(
+                    run.argv, lambda stream, line: self._events.put((run.id, stream, line)))
+            broken = False        # a host killed by a late cancel fails alive in release()
+        except PowerShellHostError as exc:
+            if not (run.cancelled or run.timed_out):
+                run.error = str(exc)
+        finally:
+            timer.cancel()
+            run.host = None
+            run.pool.release(host, broken=broken, used=run.returncode is not None)
+
+    def _start_timer(self, run):
+        timer = threading.Timer(run.timeout, self._expire, args=(run,))
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def _pump(self, run, stream, name):
+        with stream:
+            for raw in iter(stream.readline, b""):
+                line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                self._events.put((run.id, name, line))
+
+    def _expire(self, run):
+        run.timed_out = True
+        run.kill()
+
+    # ── Tk side ──────────────────────────────────────────────────────────
+    def _drain(self):
+        batches, finished = {}, []
+        while True:
+            try:
+                run_id, kind, line = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "done":
+                finished.append(run_id)
+            else:
+                batches.setdefault(run_id, []).append((kind, line))
+        for run_id, lines in batches.items():
+            run = self._runs.get(run_id)
+            if run is not None:
+                run.on_output(run, lines)
+        for run_id in finished:
+            run = self._runs.pop(run_id, None)
+            if run is not None:
+                run.on_done(run)
+        self._poll_job = (self.root.after(self.poll_ms, self._drain)
+                          if self._runs else None)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# PowerShell host pool
+# ─────────────────────────────────────────────────────────────────────────────
+class PowerShellHostError(Exception):
+    pass
+
+
+class PowerShellHost:
+    """A long-lived PowerShell process that runs scripts sent over stdin.
+
+    Each request is one line, ``<seq> <base64 utf-8 script>``.  The host runs
+    the script in a child scope, streams the formatted output back line by
+    line and finishes with ``<marker>:<seq>:<exit code>``.  Lines of the
+    script's error stream come back as ``<marker>:err:<line>`` and are
+    reported as stderr, as a one-shot run reports them.  The marker carries a
+    random nonce so command output cannot fake it, and is recognised
+    wherever it starts in a line, since output written without a newline
+    runs straight into it.  The host's own stderr (PowerShell failing
+    outside any script) is merged into stdout.
+    """
+
+    BOOTSTRAP = r"""
+$ErrorActionPreference = 'Continue'
+$ProgressPreference = 'SilentlyContinue'
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+@@IMPORTS@@
+$marker = '@@MARKER@@'
+[Console]::Out.WriteLine("${marker}:ready")
+[Console]::Out.Flush()
+while ($true) {
+    $line = [Console]::In.ReadLine()
+    if ($null -eq $line) { break }
+    $seq, $payload = $line.Split(' ', 2)
+    $code = 0
+    $Error.Clear()
+    $global:LASTEXITCODE = 0
+    try {
+        $script = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($payload))
+        & { Invoke-Expression $script } 2>&1 | ForEach-Object {
+            if ($_ -is [System.Management.Automation.ErrorRecord]) {
+                # a native command's stderr line is its own message
+                $text = if ($_.FullyQualifiedErrorId -like 'NativeCommandError*') { $_.ToString() }
+                        else { ($_ | Out-String -Width 4096).TrimEnd() }
+                foreach ($l in $text -split "`r?`n") { [Console]::Out.WriteLine("${marker}:err:$l") }
+            } else { $_ }
+        } | Out-String -Stream -Width 4096 | ForEach-Object { [Console]::Out.WriteLine($_) }
+        if ($global:LASTEXITCODE) { $code = $global:LASTEXITCODE }
+        elseif ($Error.Count) { $code = 1 }
+    } catch {
+        foreach ($l in ($_ | Out-String).TrimEnd() -split "`r?`n") {
+            [Console]::Out.WriteLine("${marker}:err:$l")
+        }
+        $code = 1
+    }
+    [Console]::Out.WriteLine("${marker}:${seq}:${code}")
+    [Console]::Out.Flush()
+}
+"""
+
+    def __init__(self, exe, modules=()):
+        self.marker = f"__GCB_{os.urandom(16).hex()}__"
+        imports = "\n".join(f"Import-Module {m} -ErrorAction SilentlyContinue"
+                            for m in modules)
+        script = (self.BOOTSTRAP.replace("@@IMPORTS@@", imports)
+                                .replace("@@MARKER@@", self.marker))
+        encoded = binascii.b2a_base64(script.encode("utf-16-le"), newline=False).decode("ascii")
+        import subprocess
+        try:
+            self.proc = subprocess.Popen(
+                [exe, "-NoProfile", "-NonInteractive", "-EncodedCommand", encoded],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                **_popen_options())
+        except OSError as exc:
+            raise PowerShellHostError(f"Cannot start {exe}: {exc}") from exc
+        self.uses = 0
+        self.last_used = time.monotonic()
+        self._seq = 0
+
+    @property
+    def alive(self):
+        return self.proc.poll() is None
+
+    def wait_ready(self, timeout):
+        watchdog = threading.Timer(timeout, self.kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            self._read_until(f"{self.marker}:ready", lambda stream, line: None)
+        finally:
+            watchdog.cancel()
+
+    def execute(self, script, emit):
+        """Run ``script``, passing output lines to ``emit``; returns the exit code."""
+        self._seq += 1
+        payload = binascii.b2a_base64(script.encode("utf-8"), newline=False).decode("ascii")
+        try:
+            self.proc.stdin.write(f"{self._seq} {payload}\n".encode("ascii"))
+            self.proc.stdin.flush()
+        except (OSError, ValueError) as exc:
+            raise PowerShellHostError("PowerShell host is gone") from exc
+        code = self._read_until(f"{self.marker}:{self._seq}:", emit)
+        self.last_used = time.monotonic()
+        return int(code) if code.lstrip("-").isdigit() else 1
+
+    def ping(self, timeout=5):
+        watchdog = threading.Timer(timeout, self.kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            return self.execute("$null", lambda stream, line: None) == 0
+        except PowerShellHostError:
+            return False
+        finally:
+            watchdog.cancel()
+
+    def kill(self):
+        _kill_process(self.proc)
+
+    def _read_until(self, prefix, emit):
+        err = f"{self.marker}:err:"
+        for raw in iter(self.proc.stdout.readline, b""):
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            at = line.find(self.marker)
+            if at > 0:
+                # output that did not end its line ([Console]::Write,
+                # Write-Host -NoNewline) has the next marker glued to it
+                emit("stdout", line[:at])
+                line = line[at:]
+            if line.startswith(prefix):
+                return line[len(prefix):]
+            if line.startswith(err):
+                emit("stderr", line[len(err):])
+            else:
+                emit("stdout", line)
+        raise PowerShellHostError("PowerShell host exited unexpectedly")
+
+
+class PowerShellPool:
+    """Bounded pool of warm :class:`PowerShellHost` processes.
+
+    Hosts are started lazily (or ahead of time by :meth:`prewarm`) and reused,
+    which skips interpreter startup and the ``Import-Module`` on every run.
+    A host is recycled after ``max_uses`` commands or as soon as it fails,
+    times out or is cancelled; one that sat idle longer than ``ping_after_s``
+    is pinged before it is handed out again.
+    """
+
+    def __init__(self, exe, size=2, max_uses=50, modules=("ActiveDirectory",),
+                 start_timeout=60, ping_after_s=120):
+        self.exe = exe
+        self.size = size
+        self.max_uses = max_uses
+        self.modules = modules
+        self.start_timeout = start_timeout
+        self.ping_after_s = ping_after_s
+        self._idle = []
+        self._count = 0           # idle + checked-out + starting
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        while True:
+            with self._cond:
+                while not self._idle and self._count >= self.size and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    raise PowerShellHostError("PowerShell pool is shut down")
+                host = self._idle.pop() if self._idle else None
+                if host is None:
+                    self._count += 1
+            if host is None:
+                return self._spawn()
+            if self._healthy(host):
+                return host
+            self._discard(host)
+
+    def release(self, host, broken=False, used=True):
+        host.uses += used
+        if broken or self._closed or host.uses >= self.max_uses or not host.alive:
+            self._discard(host)
+            return
+        with self._cond:
+            self._idle.append(host)
+            self._cond.notify()
+
+    def prewarm(self):
+        """Start a host in the background if none is running yet."""
+        with self._cond:
+            if self._count or self._closed:
+                return
+        threading.Thread(target=self._warm, name="powershell-prewarm", daemon=True).start()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for host in idle:
+            host.kill()
+
+    def _warm(self):
+        try:
+            self.release(self.acquire())
+        except PowerShellHostError:
+            pass
+
+    def _spawn(self):
+        try:
+            host = PowerShellHost(self.exe, self.modules)
+            host.wait_ready(self.start_timeout)
+            return host
+        except PowerShellHostError:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def _healthy(self, host):
+        if not host.alive:
+            return False
+        if time.monotonic() - host.last_used > self.ping_after_s:
+            return host.ping()
+        return True
+
+    def _discard(self, host):
+        host.kill()
+        with self._cond:
+            self._count -= 1
+            self._cond.notify()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Templates & batch execution
+# ─────────────────────────────────────────────────────────────────────────────
+_PLACEHOLDER_RE = re.compile(r"<([^>]+)>")
+
+
+class CommandTemplate:
+    """A command string split once into literal text and ``<placeholder>`` slots.
+
+    ``literals`` always has one more item than ``slots``, so rendering is a
+    single join that interleaves them.  ``names`` lists each placeholder once,
+    in first-appearance order.
+    """
+
+    __slots__ = ("source", "literals", "slots", "names")
+
+    def __init__(self, source):
+        parts = _PLACEHOLDER_RE.split(source)
+        self.source = source
+        self.literals = tuple(parts[0::2])
+        self.slots = tuple(parts[1::2])
+        self.names = tuple(dict.fromkeys(self.slots))
+
+    @property
+    def duplicates(self):
+        """Placeholders that occur more than once (all filled from one value)."""
+        return tuple(n for n in self.names if self.slots.count(n) > 1)
+
+    def render(self, values):
+        """Fill the slots from ``values``; blank or missing values keep ``<ph>``."""
+        out = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            out.append(values.get(name) or f"<{name}>")
+            out.append(literal)
+        return "".join(out)
+
+    def render_with(self, fn):
+        """Like :meth:`render`, taking each slot's text from ``fn(name)``."""
+        out = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            out.append(fn(name))
+            out.append(literal)
+        return "".join(out)
+
+
+@functools.lru_cache(maxsize=65536)
+def compile_template(source):
+    """Shared, cached :class:`CommandTemplate` for a command string."""
+    return CommandTemplate(source)
+
+
+class BatchRow:
+    def __init__(self, number, values, command, error=None):
+        self.number = number          # 1-based position among the non-blank input lines
+        self.values = values
+        self.command = command
+        self.error = error
+        self.status = "failed" if error else "pending"
+        self.attempts = 0
+        self.output = []
+
+
+def parse_batch_rows(template, text, defaults=None):
+    """Expand ``template`` once per row of ``text``.
+
+    ``text`` is either CSV whose header row names the placeholders, or rows
+    of bare values.  Bare values fill the placeholders that ``defaults`` does
+    not cover, in template order; a newline list therefore works whenever a
+    single placeholder is left open.
+    """
+    compiled = compile_template(template)
+    names = compiled.names
+    defaults = {k: v for k, v in (defaults or {}).items() if v}
+    open_names = [n for n in names if n not in defaults]
+    lines = [ln for ln in text.splitlines() if ln.strip()]
+    if not lines:
+        return []
+    records = list(csv.reader(lines, skipinitialspace=True))
+    header = [cell.strip() for cell in records[0]]
+    keyed = set(header) & set(names)
+    if keyed and set(open_names) <= set(header):
+        columns, records, first = header, records[1:], 2
+    elif len(open_names) == 1:
+        # newline list: the whole line is the value, commas and all
+        columns, records, first = open_names, [[ln.strip()] for ln in lines], 1
+    else:
+        columns, first = open_names, 1
+
+    rows = []
+    for number, record in enumerate(records, first):
+        cells = [cell.strip() for cell in record]
+        values = dict(defaults)
+        values.update((col, val) for col, val in zip(columns, cells) if col in names)
+        missing = [n for n in names if not values.get(n)]
+        command = compiled.render(values)
+        error = f"missing value for <{missing[0]}>" if missing else None
+        rows.append(BatchRow(number, values, command, error))
+    return rows
+
+
+def gam_csv_command(template, csv_path):
+    """The ``gam csv`` invocation that replays ``template`` over an exported CSV."""
+    body = compile_template(template).render_with(lambda name: "~" + _csv_column(name))
+    if body.startswith("gam "):
+        body = body[4:]
+    return f'gam csv "{csv_path}" gam {body}'
+
+
+def write_batch_csv(path, template, rows):
+    """Write one line per row: a column per placeholder plus the expanded command."""
+    names = compile_template(template).names
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([_csv_column(n) for n in names] + ["command"])
+        for row in rows:
+            writer.writerow([row.values.get(n, "") for n in names] + [row.command])
+
+
+def _csv_column(name):
+    # GAM's ~column references can't contain spaces or punctuation
+    return re.sub(r"\W+", "_", name).strip("_") or "value"
+
+
+class BatchRun:
+    """Runs every row of a batch through a :class:`CommandRunner`.
+
+    The runner's thread pool bounds how many rows execute at once.  A row
+    that fails is retried up to ``retries`` times; ``on_row`` fires on every
+    status change and ``on_finish`` once with a summary dict.
+    """
+
+    def __init__(self, runner, rows, target_for, on_row, on_finish,
+                 retries=1, timeout=60, pool=None):
+        self.runner = runner
+        self.rows = rows
+        self.target_for = target_for  # command text -> argv list or pooled script
+        self.on_row = on_row
+        self.on_finish = on_finish
+        self.retries = retries
+        self.timeout = timeout
+        self.pool = pool
+        self.cancelled = False
+        self._active = {}
+        self._left = 0
+
+    def start(self):
+        for row in self.rows:
+            if row.error:
+                self.on_row(row)
+            else:
+                self._left += 1
+                self._launch(row)
+        if not self._left:
+            self._finish()
+
+    def cancel(self):
+        self.cancelled = True
+        for run in list(self._active.values()):
+            self.runner.cancel(run)
+
+    def summary(self):
+        counts = {"ok": 0, "failed": 0, "cancelled": 0}
+        for row in self.rows:
+            counts[row.status] = counts.get(row.status, 0) + 1
+        counts["total"] = len(self.rows)
+        counts["retried"] = sum(1 for row in self.rows if row.attempts > 1)
+        return counts
+
+    def _launch(self, row):
+        row.attempts += 1
+        row.status = "running" if row.attempts == 1 else "retrying"
+        row.output = []
+        self.on_row(row)
+        run = self.runner.start(
+            self.target_for(row.command), timeout=self.timeout, pool=self.pool,
+            on_output=lambda r, lines: row.output.extend(line for _, line in lines),
+            on_done=lambda r: self._done(row, r))
+        self._active[row.number] = run
+
+    def _done(self, row, run):
+        self._active.pop(row.number, None)
+        if run.error:
+            row.error = run.error
+        if run.cancelled or self.cancelled:
+            row.status = "cancelled"
+        elif not run.error and not run.timed_out and run.returncode == 0:
+            row.status = "ok"
+        elif row.attempts <= self.retries:
+            self._launch(row)
+            return
+        else:
+            row.status = "failed"
+            if run.timed_out:
+                row.error = f"timed out after {run.timeout:g} s"
+            elif not row.error:
+                row.error = f"exit {run.returncode}"
+        self.on_row(row)
+        self._left -= 1
+        if not self._left:
+            self._finish()
+
+    def _finish(self):
+        self.on_finish(self.summary())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Execution settings
+# ─────────────────────────────────────────────────────────────────────────────
+POWERSHELL_TIMEOUT_S = 60  # override with GAM_BANK_PS_TIMEOUT
+POWERSHELL_POOL_SIZE = 2   # warm hosts; override with GAM_BANK_PS_POOL (0 = off)
+POWERSHELL_HOST_MAX_USES = 50
+
+
+def powershell_exe():
+    # GAM_BANK_POWERSHELL lets pwsh or a stub stand in for powershell.exe
+    exe = os.environ.get("GAM_BANK_POWERSHELL")
+    if exe:
+        return exe
+    if sys.platform == "win32":
+        return "powershell.exe"
+    import shutil  # deferred: CLI startup
+    return shutil.which("pwsh") or "pwsh"
+
+
+def powershell_timeout():
+    try:
+        return float(os.environ.get("GAM_BANK_PS_TIMEOUT", POWERSHELL_TIMEOUT_S))
+    except ValueError:
+        return POWERSHELL_TIMEOUT_S
+
+
+def powershell_pool():
+    """A new pool of warm PowerShell hosts, or None when GAM_BANK_PS_POOL is 0."""
+    try:
+        size = int(os.environ.get("GAM_BANK_PS_POOL", POWERSHELL_POOL_SIZE))
+    except ValueError:
+        size = POWERSHELL_POOL_SIZE
+    if size <= 0:
+        return None
+    return PowerShellPool(powershell_exe(), size=size, max_uses=POWERSHELL_HOST_MAX_USES)
+
+
+def command_target(category, command, pool=None):
+    """What ``CommandRunner.start`` runs for ``command`` filed under ``category``.
+
+    GAM commands run the local ``gam`` directly; everything else is a script
+    for a pooled PowerShell host, or a fresh PowerShell process without one.
+    """
+    if category == "GAM":
+        return shlex.split(command, posix=(os.name == "posix"))
+    if pool is not None:
+        return command
+    return [powershell_exe(), "-NoProfile", "-NonInteractive", "-Command", command]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Headless event loop
+# ─────────────────────────────────────────────────────────────────────────────
+class EventLoop:
+    """The part of Tk's ``after`` API that the runner and stores rely on.
+
+    Stands in for the Tk root outside the GUI: callbacks are queued by due
+    time and fire on the thread that calls :meth:`run_until`.
+    """
+
+    def __init__(self):
+        self._timers = []        # heap of (due, job id, fn, args)
+        self._ids = itertools.count(1)
+        self._cancelled = set()
+
+    def after(self, ms, fn, *args):
+        job = next(self._ids)
+        heapq.heappush(self._timers, (time.monotonic() + ms / 1000, job, fn, args))
+        return job
+
+    def after_idle(self, fn, *args):
+        return self.after(0, fn, *args)
+
+    def after_cancel(self, job):
+        self._cancelled.add(job)
+
+    def run_until(self, done, timeout=None):
+        """Fire callbacks as they come due until ``done()``; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not done():
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return False
+            if self._timers and self._timers[0][0] <= now:
+                _, job, fn, args = heapq.heappop(self._timers)
+                if job in self._cancelled:
+                    self._cancelled.discard(job)
+                else:
+                    fn(*args)
+            else:
+                wait = self._timers[0][0] - now if self._timers else 0.05
+                time.sleep(min(wait, 0.05))
+        return True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Opening and loading a bank
+# ─────────────────────────────────────────────────────────────────────────────
+def data_file_path(filename):
+    """Where ``filename`` lives: next to the exe when frozen, else next to the code."""
+    if getattr(sys, "frozen", False):
+        # EXE directory — writable, persists between runs
+        exe_dir = os.path.dirname(sys.executable)
+        dest = os.path.join(exe_dir, filename)
+        # First run: extract bundled file from the PyInstaller temp dir
+        if not os.path.exists(dest):
+            src = os.path.join(sys._MEIPASS, filename)
+            if os.path.exists(src):
+                import shutil  # deferred: CLI startup
+                shutil.copy2(src, dest)
+        return dest
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+
+
+def open_store(root, data_file, source, on_error=None, on_external_change=None,
+               write_snapshot=True):
+    """The configured :class:`CommandStore` for ``data_file`` (commands.json).
+
+    GAM_BANK_STORE=sqlite keeps the bank in commands.db next to commands.json
+    (which is imported the first time).  ``root`` schedules the debounced
+    saves — the Tk root, or an :class:`EventLoop`.  ``on_external_change()``
+    is called instead of a debounced save when another process saved the
+    bank since it was loaded; without it the save goes ahead.  With
+    ``write_snapshot`` false an existing snapshot is read but none is written.
+    """
+    if os.environ.get("GAM_BANK_STORE", "json").lower() == "sqlite":
+        return SqliteCommandStore(os.path.splitext(data_file)[0] + ".db",
+                                  json_path=data_file)
+    return JsonCommandStore(root, data_file, source, on_error=on_error,
+                            on_external_change=on_external_change,
+                            write_snapshot=write_snapshot)
+
+
+class LoadedBank:
+    """The result of :func:`load_bank`: the commands and the indexes over them.
+
+    The search index, favorites/recents views and frecency ranking are built
+    on first access unless the load asked for them eagerly.
+    """
+
+    def __init__(self, commands, status, error=None):
+        self.commands = commands
+        self.status = status
+        self.error = error
+        self.index = CommandIndex(commands)
+        self._search = self._views = self._ranker = None
+
+    @property
+    def search(self):
+        if self._search is None:
+            self._search = SearchIndex()
+            self._search.rebuild(self.commands)
+        return self._search
+
+    @property
+    def views(self):
+        if self._views is None:
+            self._views = UsageViews()
+            self._views.rebuild(self.commands)
+        return self._views
+
+    @property
+    def ranker(self):
+        if self._ranker is None:
+            self._ranker = FrecencyRanker()
+            self._ranker.rebuild(self.commands)
+        return self._ranker
+
+    def added(self, category, entry):
+        """Index ``entry``, already appended to ``commands[category]``.
+
+        Indexes that are not built yet are left alone: they will pick the
+        entry up when they are built from ``commands``.
+        """
+        self.index.add(category, entry)
+        for built in (self._search, self._ranker):
+            if built is not None:
+                built.add(category, entry)
+
+    def removed(self, category, entry):
+        self.index.remove(category, entry)
+        for built in (self._search, self._views, self._ranker):
+            if built is not None:
+                built.remove(category, entry)
+
+    def used(self, category, entry):
+        """Re-rank ``entry`` after ``mark_used``, in the indexes already built."""
+        if self._ranker is not None:
+            self._ranker.used(category, entry)
+        if self._search is not None:
+            self._search.touch(entry)
+
+    def copied(self, category, entry):
+        if self._views is not None:
+            self._views.copied(category, entry)
+        if self._search is not None:
+            self._search.touch(entry)
+
+    def favorite_changed(self, category, entry):
+        if self._views is not None:
+            self._views.favorite_changed(category, entry)
+        if self._search is not None:
+            self._search.touch(entry)
+
+
+def load_bank(store, progress=None, eager=True):
+    """Read, dedupe and index the bank behind ``store``.
+
+    Never raises for a bad data file: the error is kept on the result, which
+    then holds an empty bank.  ``progress(fraction, text)`` is called as the
+    load advances; the GUI runs this on its loader thread.
+    """
+    progress = progress or (lambda fraction, text: None)
+    try:
+        commands, status = store.load(progress)
+        progress(0.45, "Indexing commands…")
+        bank = LoadedBank(commands, status)
+        store.replay(bank.index)
+    except Exception as exc:
+        bank = LoadedBank(_empty_bank(), f"✖ Load error: {exc}", error=exc)
+    if eager:
+        progress(0.7, "Building search index…")
+        bank.search, bank.views, bank.ranker    # built here rather than on first use
+    return bank
+
+
+class CommandBank:
+    """The bank for scripts — the same store, indexes and renderer as the GUI.
+
+        with CommandBank() as bank:
+            category, entry = bank.find("Suspend user")
+            print(bank.render(entry, {"user": "jdoe@example.com"}))
+
+    ``path`` defaults to the commands.json the desktop app uses.  Raises
+    ``OSError``/``ValueError`` if the data file cannot be read.  A snapshot
+    is read if there is one, but only written with ``write_snapshot`` — for
+    long-running users such as the server; a one-shot lookup leaves the
+    bank's directory alone.
+    """
+
+    def __init__(self, path=None, loop=None, write_snapshot=False):
+        self.loop = loop or EventLoop()
+        self.path = path or data_file_path("commands.json")
+        self.store = open_store(self.loop, self.path, lambda: self.commands,
+                                write_snapshot=write_snapshot)
+        try:
+            self._load()
+        except Exception:
+            self.store.close()
+            raise
+
+    def _load(self):
+        bank = load_bank(self.store, eager=False)
+        if bank.error is not None:
+            raise bank.error
+        self._bank, self.commands = bank, bank.commands
+        self.store.loaded()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.store.close()
+
+    def flush(self):
+        """Write pending edits now; False if a write failed."""
+        return self.store.flush()
+
+    def refresh(self):
+        """Reload the bank if another process saved it since; True if it did.
+
+        Edits of this one still waiting to be written are written first, so
+        call :meth:`flush` after editing to keep that window short.
+        """
+        if not self.store.changed_on_disk():
+            return False
+        self.store.begin_load()
+        self._load()
+        return True
+
+    def find(self, name, category=None):
+        """``(category, entry)`` whose description (or else command) is ``name``."""
+        cats = [category] if category is not None else list(self.commands)
+        index = self._bank.index
+        for lookup in (index.by_description, index.by_command):
+            for cat in cats:
+                entry = lookup(cat, name)
+                if entry is not None:
+                    return cat, entry
+        return None
+
+    def search(self, query, limit=20, category=None):
+        """Best ``[(category, entry), ...]`` for ``query``, as the header search ranks them."""
+        return self._bank.search.search(query.lower(), limit, category) or []
+
+    def count_matches(self, query, category=None):
+        """How many commands :meth:`search` could return for ``query``, uncapped."""
+        return self._bank.search.count(query.lower(), category)
+
+    def top(self, count=20):
+        """The most frecent ``[(category, entry), ...]`` across every category."""
+        return self._bank.ranker.top(0, count)
+
+    @staticmethod
+    def render(entry, values):
+        """The command with its placeholders filled; missing values keep ``<name>``."""
+        return compile_template(entry.command).render(values)
+
+    @staticmethod
+    def missing(entry, values):
+        return [n for n in compile_template(entry.command).names if not values.get(n)]
+
+    def record_use(self, category, entry):
+        """Count a use, exactly as picking the command in the GUI does."""
+        entry.mark_used(now_us())
+        self._bank.used(category, entry)
+        self.store.used(category, entry)
+
+    def record_copy(self, category, entry):
+        entry.mark_copied(now_us())
+        self._bank.copied(category, entry)
+        self.store.used(category, entry)
+
+    def set_favorite(self, category, entry, flag):
+        entry.set_favorite(flag)
+        self._bank.favorite_changed(category, entry)
+        self.store.updated(category, entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.commands.values())
+
+    def add(self, category, command, description):
+        """Append a new command; None if ``category`` already has that pair."""
+        if self._bank.index.find(category, command, description) is not None:
+            return None
+        entry = Command(command, description, category)
+        self.commands.setdefault(category, []).append(entry)
+        self._bank.added(category, entry)
+        self.store.added(category, entry)
+        return entry
+
+    def remove(self, category, entry):
+        entries = self.commands[category]
+        del entries[next(i for i, c in enumerate(entries) if c is entry)]
+        self._bank.removed(category, entry)
+        self.store.removed(category, entry)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Command-line interface
+# ─────────────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    import argparse  # deferred: only the CLI needs it
+
+    ap = argparse.ArgumentParser(
+        prog="command_bank", description="Search, fill in and run commands from the bank.")
+    ap.add_argument("--bank", help="commands.json to use (default: the desktop app's)")
+    sub = ap.add_subparsers(dest="action", required=True)
+
+    p = sub.add_parser("search", help="list the best matches for a query")
+    p.add_argument("query")
+    p.add_argument("-c", "--category")
+    p.add_argument("-n", "--limit", type=int, default=20)
+    p.add_argument("--json", action="store_true", help="print a JSON array")
+
+    p = sub.add_parser("serve", help="serve the bank over HTTP/JSON on 127.0.0.1")
+    p.add_argument("-p", "--port", type=int, default=8765)
+    p.add_argument("-q", "--quiet", action="store_true", help="do not log each request")
+
+    for name, text in (("render", "print a command with its placeholders filled"),
+                       ("run", "fill in a command and run it"),
+                       ("batch", "run a command once per input row")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("name", help="description (or exact command text) of the command")
+        p.add_argument("-c", "--category")
+        p.add_argument("-s", "--set", action="append", default=[], metavar="NAME=VALUE",
+                       help="placeholder value (repeatable)")
+        if name == "render":
+            p.add_argument("--strict", action="store_true",
+                           help="exit 2 if a placeholder is left unfilled")
+        else:
+            p.add_argument("--timeout", type=float, help="seconds per command")
+        if name == "run":
+            p.add_argument("--record", action="store_true",
+                           help="count this as a use of the command")
+        if name == "batch":
+            p.add_argument("-i", "--input", default="-",
+                           help="CSV with a header row, or one value per line (default: stdin)")
+            p.add_argument("-j", "--workers", type=int, default=4)
+            p.add_argument("--retries", type=int, default=1)
+            p.add_argument("--dry-run", action="store_true",
+                           help="print the expanded commands instead of running them")
+
+    args = ap.parse_args(argv)
+    try:
+        bank = CommandBank(args.bank, write_snapshot=args.action == "serve")
+    except (OSError, ValueError) as exc:
+        return _fail(f"cannot read the bank: {exc}")
+    try:
+        return _CLI_ACTIONS[args.action](bank, args)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        bank.close()
+
+
+def _fail(message, code=1):
+    print(f"command_bank: {message}", file=sys.stderr)
+    return code
+
+
+HINT_SEARCH_LIMIT = 5000   # commands; beyond this a failed lookup suggests no names
+
+
+def _cli_search(bank, args):
+    hits = bank.search(args.query, args.limit, args.category)
+    if args.json:
+        print(json.dumps([{"category": cat, "description": e.description, "command": e.command}
+                          for cat, e in hits], indent=2, ensure_ascii=False))
+    else:
+        for cat, entry in hits:
+            print(f"{cat}\t{entry.description}\t{entry.command}")
+    return 0 if hits else 1
+
+
+def _cli_lookup(bank, args):
+    """``(category, entry, values)`` for the render/run/batch arguments, or an exit code."""
+    values = {}
+    for item in args.set:
+        name, sep, value = item.partition("=")
+        if not sep:
+            return _fail(f"expected NAME=VALUE, got {item!r}", 2)
+        values[name.strip().strip("<>")] = value
+    found = bank.find(args.name, args.category)
+    if found is None:
+        if len(bank) > HINT_SEARCH_LIMIT:
+            # indexing a big bank for a hint would cost more than the lookup
+            hint = f"; try: search {shlex.quote(args.name)}"
+        else:
+            hint = ", ".join(repr(e.description)
+                             for _, e in bank.search(args.name, 3, args.category))
+            hint = f" (closest: {hint})" if hint else ""
+        return _fail(f"no command named {args.name!r}{hint}")
+    return (*found, values)
+
+
+def _cli_render(bank, args):
+    found = _cli_lookup(bank, args)
+    if isinstance(found, int):
+        return found
+    _, entry, values = found
+    print(bank.render(entry, values))
+    missing = bank.missing(entry, values)
+    if missing and args.strict:
+        return _fail(f"missing value for <{missing[0]}>", 2)
+    return 0
+
+
+def _cli_run(bank, args):
+    found = _cli_lookup(bank, args)
+    if isinstance(found, int):
+        return found
+    category, entry, values = found
+    missing = bank.missing(entry, values)
+    if missing:
+        return _fail(f"missing value for <{missing[0]}>", 2)
+    command = bank.render(entry, values)
+    if args.record:
+        bank.record_use(category, entry)
+    runner = CommandRunner(bank.loop, max_workers=1)
+    done = []
+    runner.start(command_target(category, command), timeout=args.timeout or powershell_timeout(),
+                 on_output=_print_lines, on_done=done.append)
+    try:
+        bank.loop.run_until(lambda: done)
+    finally:
+        runner.shutdown()
+    run = done[0] if done else None
+    if run is None or run.cancelled:
+        return 130
+    if run.error:
+        return _fail(run.error, 127)
+    if run.timed_out:
+        return _fail(f"timed out after {run.timeout:g} s", 124)
+    return run.returncode
+
+
+def _cli_batch(bank, args):
+    found = _cli_lookup(bank, args)
+    if isinstance(found, int):
+        return found
+    category, entry, values = found
+    if args.input == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.input, "r", encoding="utf-8-sig") as f:
+            text = f.read()
+    rows = parse_batch_rows(entry.command, text, values)
+    if not rows:
+        return _fail("no input rows", 2)
+    if args.dry_run:
+        for row in rows:
+            print(f"# row {row.number}: {row.error}" if row.error else row.command)
+        return 1 if any(row.error for row in rows) else 0
+
+    pool = powershell_pool() if category != "GAM" else None
+    runner = CommandRunner(bank.loop, max_workers=max(1, args.workers))
+    summary = []
+
+    def on_row(row):
+        if row.status in ("ok", "failed", "cancelled"):
+            for line in row.output:
+                print(f"[{row.number}] {line}")
+            detail = f"  ({row.error})" if row.error else ""
+            print(f"{row.status:<9} {row.number:>4}  {row.command}{detail}", file=sys.stderr)
+
+    batch = BatchRun(runner, rows, lambda command: command_target(category, command, pool),
+                     on_row, summary.append, retries=args.retries,
+                     timeout=args.timeout or powershell_timeout(), pool=pool)
+    try:
+        batch.start()
+        bank.loop.run_until(lambda: summary)
+    except KeyboardInterrupt:
+        batch.cancel()
+        raise
+    finally:
+        runner.shutdown()
+        if pool is not None:
+            pool.shutdown()
+    counts = summary[0]
+    print(f"{counts['ok']}/{counts['total']} ok, {counts['failed']} failed, "
+          f"{counts['retried']} retried", file=sys.stderr)
+    return 0 if counts["ok"] == counts["total"] else 1
+
+
+def _cli_serve(bank, args):
+    import bank_server  # deferred: http.server is only needed here
+
+    try:
+        server = bank_server.BankServer(bank, args.port, quiet=args.quiet)
+    except OSError as exc:
+        return _fail(f"cannot listen on port {args.port}: {exc}")
+    print(f"Serving {bank.path} at {server.url} — Ctrl+C to stop", file=sys.stderr)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def _print_lines(run, lines):
+    for stream, line in lines:
+        print(line, file=sys.stderr if stream == "stderr" else sys.stdout, flush=True)
+
+
+_CLI_ACTIONS = {"search": _cli_search, "render": _cli_render, "run": _cli_run,
+                "batch": _cli_batch, "serve": _cli_serve}
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,485 @@
+"""Local HTTP/JSON service over the command bank.
+
+    python bank_cli.py serve                # http://127.0.0.1:8765/api/
+    python bank_cli.py serve --port 9000 --quiet
+
+Serves the same commands.json (or commands.db) and the same indexes as the
+desktop app, so the web version and other tools read one bank instead of
+keeping copies of their own.  Listens on the loopback interface only.
+
+    GET    /api/bank                         bank id, version and counts
+    GET    /api/commands?category=&offset=&limit=
+    GET    /api/search?q=&category=&offset=&limit=
+    GET    /api/changes?since=<bank>.<version>
+    POST   /api/commands                     {"category", "command", "description"}
+    PATCH  /api/commands/<id>                {"favorite": true}
+    POST   /api/commands/<id>/use            count a use
+    POST   /api/commands/<id>/copy           mark it copied
+    DELETE /api/commands/<id>
+
+Every edit bumps the bank version and is saved before the response goes
+out.  ``/api/changes`` answers with only the commands changed or removed
+since the version a client last saw (or with the whole bank, ``"reset":
+true``, when it cannot), and GET responses carry an ETag so an unchanged
+page costs a 304.  Bodies over 1 KB are gzipped for clients that accept it.
+
+The desktop app can have the same bank open.  Before each request the
+service checks whether the bank changed on disk and, if it did, reloads it
+and logs whatever differs, so clients receive the app's edits as an
+ordinary delta.
+"""
+import gzip
+import hashlib
+import json
+import os
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+DEFAULT_PORT = 8765
+PAGE_LIMIT = 500            # most commands one page or search answers with
+GZIP_MIN_BYTES = 1024
+MAX_BODY_BYTES = 64 * 1024
+_LOOPBACK = ("127.0.0.1", "localhost", "::1")
+
+
+def command_id(category, entry):
+    """A stable id for an entry: the same category, command and description hash alike."""
+    key = "\0".join((category, entry.command, entry.description))
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Change log
+# ─────────────────────────────────────────────────────────────────────────────
+class ChangeLog:
+    """Which commands changed after a given version of the bank.
+
+    Each id keeps only the version it last changed at, in a dict that is
+    re-inserted on every change and therefore ordered by version: the
+    changes since N are read newest first and the scan stops at the first
+    id at or below N.  Removals leave a tombstone; only the newest
+    ``TOMBSTONES`` are kept, and a client older than the oldest forgotten
+    one has to start over.
+    """
+
+    TOMBSTONES = 10_000
+
+    def __init__(self):
+        self.version = 0
+        self.floor = 0           # removals at or below this may be forgotten
+        self._changed = {}       # id -> version, oldest first
+        self._removed = {}       # id -> version, oldest first
+
+    def changed(self, key):
+        self.version += 1
+        self._removed.pop(key, None)
+        self._changed.pop(key, None)
+        self._changed[key] = self.version
+
+    def removed(self, key):
+        self.version += 1
+        self._changed.pop(key, None)
+        self._removed[key] = self.version
+        if len(self._removed) > self.TOMBSTONES:
+            oldest = next(iter(self._removed))
+            self.floor = self._removed.pop(oldest)
+
+    def since(self, version):
+        """``(changed ids, removed ids)`` after ``version``; None if it cannot tell."""
+        if not self.floor <= version <= self.version:
+            return None
+        return self._after(self._changed, version), self._after(self._removed, version)
+
+    @staticmethod
+    def _after(log, version):
+        keys = []
+        for key in reversed(log):
+            if log[key] <= version:
+                break
+            keys.append(key)
+        keys.reverse()
+        return keys
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Service
+# ─────────────────────────────────────────────────────────────────────────────
+class BankService:
+    """A :class:`bank_core.CommandBank` addressed by command id, with a change log.
+
+    ``epoch`` is new every time the service starts, so a client holding a
+    version from an earlier run gets the whole bank once and deltas after.
+    """
+
+    def __init__(self, bank):
+        self.bank = bank
+        self.epoch = os.urandom(4).hex()
+        self.log = ChangeLog()
+        self._entries = self._index()    # id -> (category, entry)
+
+    def _index(self):
+        return {command_id(cat, entry): (cat, entry)
+                for cat, entries in self.bank.commands.items() for entry in entries}
+
+    def sync(self):
+        """Reload the bank if another process saved it, logging what changed."""
+        if not self.bank.refresh():
+            return
+        old, self._entries = self._entries, self._index()
+        for key in old.keys() - self._entries.keys():
+            self.log.removed(key)
+        for key, (_, entry) in self._entries.items():
+            before = old.get(key)
+            if before is None or before[1].to_dict() != entry.to_dict():
+                self.log.changed(key)
+
+    @property
+    def tag(self):
+        return f"{self.epoch}.{self.log.version}"
+
+    def info(self):
+        return {"bank": self.epoch, "version": self.log.version,
+                "counts": {cat: len(entries) for cat, entries in self.bank.commands.items()}}
+
+    def item(self, category, entry):
+        return {**entry.to_dict(), "id": command_id(category, entry), "category": category}
+
+    def page(self, category, offset, limit):
+        if category is not None:
+            rows = [(category, e) for e in self.bank.commands.get(category, ())]
+        else:
+            rows = [(cat, e) for cat, entries in self.bank.commands.items() for e in entries]
+        return self._paged(rows, offset, limit)
+
+    def search(self, query, category, offset, limit):
+        if not query.strip():
+            return self._paged([], offset, limit)
+        hits = self.bank.search(query, offset + limit, category)
+        # hits stop at offset + limit; the total counts every match
+        return self._paged(hits, offset, limit, self.bank.count_matches(query, category))
+
+    def changes(self, since):
+        """Everything changed since the ``"<bank>.<version>"`` tag ``since``."""
+        epoch, _, version = (since or "").partition(".")
+        delta = None
+        if epoch == self.epoch and version.isdigit():
+            delta = self.log.since(int(version))
+        reply = {"bank": self.epoch, "version": self.log.version, "since": self.tag}
+        if delta is None:
+            reply.update(reset=True, removed=[],
+                         changed=[self.item(cat, e) for cat, entries in self.bank.commands.items()
+                                  for e in entries])
+        else:
+            changed, removed = delta
+            reply.update(reset=False, removed=removed,
+                         changed=[self.item(*self._entries[key]) for key in changed])
+        return reply
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    # ── edits ────────────────────────────────────────────────────────────
+    def add(self, category, command, description):
+        entry = self.bank.add(category, command, description)
+        if entry is None:
+            return None
+        key = command_id(category, entry)
+        self._entries[key] = (category, entry)
+        self.log.changed(key)
+        self._save()
+        return self.item(category, entry)
+
+    def remove(self, key):
+        category, entry = self._entries.pop(key)
+        self.bank.remove(category, entry)
+        self.log.removed(key)
+        self._save()
+
+    def set_favorite(self, key, flag):
+        category, entry = self._entries[key]
+        if entry.favorite != flag:
+            self.bank.set_favorite(category, entry, flag)
+            self.log.changed(key)
+            self._save()
+        return self.item(category, entry)
+
+    def used(self, key):
+        category, entry = self._entries[key]
+        self.bank.record_use(category, entry)
+        self.log.changed(key)
+        self._save()
+        return self.item(category, entry)
+
+    def copied(self, key):
+        category, entry = self._entries[key]
+        self.bank.record_copy(category, entry)
+        self.log.changed(key)
+        self._save()
+        return self.item(category, entry)
+
+    def _save(self):
+        # at once rather than on the idle timer: until it is on disk, a save
+        # by the desktop app would be overwritten by ours
+        if not self.bank.flush():
+            raise OSError(f"could not save {self.bank.path}")
+
+    def _paged(self, rows, offset, limit, total=None):
+        return {"version": self.log.version,
+                "total": len(rows) if total is None else total, "offset": offset,
+                "items": [self.item(cat, e) for cat, e in rows[offset:offset + limit]]}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# HTTP
+# ─────────────────────────────────────────────────────────────────────────────
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BankRequestHandler(BaseHTTPRequestHandler):
+    """Routes ``/api/...`` requests to the server's :class:`BankService`.
+
+    Requests are answered one at a time on the bank's event loop, so the
+    service never sees two at once.  Only loopback Host headers are served
+    (no DNS rebinding), and cross-origin callers are limited to pages on
+    this machine — ``file://`` pages send ``Origin: null``.  Edits must be
+    sent as JSON, which browsers will not do cross-origin without a
+    preflight that the origin check then refuses.
+    """
+
+    server_version = "CommandBank/1"
+    timeout = 10                 # a stalled client must not hold up the loop
+
+    def do_OPTIONS(self):
+        self._handle(self._preflight)
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def do_PATCH(self):
+        self._handle(self._patch)
+
+    def do_DELETE(self):
+        self._handle(self._delete)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    # ── routes ───────────────────────────────────────────────────────────
+    def _preflight(self, parts, query):
+        self._send(204, None, extra={
+            "Access-Control-Allow-Methods": "GET, POST, PATCH, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+            "Access-Control-Allow-Private-Network": "true",
+            "Access-Control-Max-Age": "600",
+        })
+
+    def _get(self, parts, query):
+        service = self.server.service
+        if parts == ["bank"]:
+            return self._cached(service.tag, service.info)
+        if parts == ["changes"]:
+            since = query.get("since")
+            return self._cached(f"{service.tag}:{since}", lambda: service.changes(since))
+        offset, limit = self._window(query)
+        category = query.get("category")
+        if parts == ["commands"]:
+            return self._cached(service.tag, lambda: service.page(category, offset, limit))
+        if parts == ["search"]:
+            # frecency decays with time, so a search is tagged by what it returns
+            return self._cached(None, lambda: service.search(query.get("q", ""), category,
+                                                             offset, limit))
+        if len(parts) == 2 and parts[0] == "commands":
+            category, entry = self._entry(parts[1])
+            return self._cached(service.tag, lambda: service.item(category, entry))
+        raise HttpError(404, "no such endpoint")
+
+    def _post(self, parts, query):
+        service, body = self.server.service, self._json_body()
+        if parts == ["commands"]:
+            fields = [body.get(k) for k in ("category", "command", "description")]
+            if not all(isinstance(v, str) and v.strip() for v in fields):
+                raise HttpError(400, "category, command and description are required")
+            item = service.add(*(v.strip() for v in fields))
+            if item is None:
+                raise HttpError(409, "duplicate command")
+            return self._send(201, item)
+        if len(parts) == 3 and parts[0] == "commands" and parts[2] in ("use", "copy"):
+            self._entry(parts[1])
+            act = service.used if parts[2] == "use" else service.copied
+            return self._send(200, act(parts[1]))
+        raise HttpError(404, "no such endpoint")
+
+    def _patch(self, parts, query):
+        body = self._json_body()
+        if len(parts) != 2 or parts[0] != "commands":
+            raise HttpError(404, "no such endpoint")
+        self._entry(parts[1])
+        if not isinstance(body.get("favorite"), bool):
+            raise HttpError(400, "expected {\"favorite\": true|false}")
+        return self._send(200, self.server.service.set_favorite(parts[1], body["favorite"]))
+
+    def _delete(self, parts, query):
+        if len(parts) != 2 or parts[0] != "commands":
+            raise HttpError(404, "no such endpoint")
+        self._entry(parts[1])
+        self.server.service.remove(parts[1])
+        return self._send(204, None)
+
+    # ── plumbing ─────────────────────────────────────────────────────────
+    def _handle(self, route):
+        try:
+            self._guard()
+            url = urlsplit(self.path)
+            parts = [unquote(p) for p in url.path.strip("/").split("/")]
+            if parts[0] != "api":
+                raise HttpError(404, "no such endpoint")
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            self.server.service.sync()
+            route(parts[1:], query)
+        except HttpError as exc:
+            self._send(exc.status, {"error": str(exc)})
+        except Exception as exc:
+            self.log_error("%s %s failed: %r", self.command, self.path, exc)
+            self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def _guard(self):
+        host = (self.headers.get("Host") or "").rpartition(":")[0] or self.headers.get("Host")
+        if host and host.strip("[]") not in _LOOPBACK:
+            raise HttpError(403, "only loopback hosts are served")
+        if self._origin() is False:
+            raise HttpError(403, "origin not allowed")
+
+    def _origin(self):
+        """The Origin header if it is allowed, None if there is none, else False."""
+        origin = self.headers.get("Origin")
+        if origin is None:
+            return None
+        if origin == "null" or urlsplit(origin).hostname in _LOOPBACK:
+            return origin
+        return False
+
+    def _entry(self, key):
+        found = self.server.service.get(key)
+        if found is None:
+            raise HttpError(404, f"no command with id {key!r}")
+        return found
+
+    @staticmethod
+    def _window(query):
+        try:
+            offset = max(int(query.get("offset", 0)), 0)
+            limit = min(max(int(query.get("limit", 100)), 1), PAGE_LIMIT)
+        except ValueError:
+            raise HttpError(400, "offset and limit must be integers") from None
+        return offset, limit
+
+    def _json_body(self):
+        if self.headers.get_content_type() != "application/json":
+            raise HttpError(415, "send the body as application/json")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise HttpError(400, "body is not valid JSON") from None
+        if not isinstance(body, dict):
+            raise HttpError(400, "expected a JSON object")
+        return body
+
+    def _cached(self, version, build):
+        """Answer a GET, or 304 if the client's ETag is still current.
+
+        With a ``version`` the ETag is known before ``build`` runs, so a
+        revalidation costs nothing; otherwise it is a hash of the body.
+        """
+        etag = None if version is None else f'W/"{version}"'
+        if etag is not None and self._not_modified(etag):
+            return self._send(304, None, etag=etag)
+        body = self._encode(build())
+        if etag is None:
+            etag = f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            if self._not_modified(etag):
+                return self._send(304, None, etag=etag)
+        return self._send(200, body, etag=etag)
+
+    def _not_modified(self, etag):
+        sent = self.headers.get("If-None-Match")
+        if not sent:
+            return False
+        tags = {_opaque(t.strip()) for t in sent.split(",")}
+        return "*" in tags or _opaque(etag) in tags
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def _send(self, status, payload, etag=None, extra=None):
+        body = payload if isinstance(payload, bytes) or payload is None else self._encode(payload)
+        self.send_response(status)
+        origin = self._origin()
+        if origin:
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Access-Control-Expose-Headers", "ETag")
+        self.send_header("Vary", "Origin, Accept-Encoding")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        for name, value in (extra or {}).items():
+            self.send_header(name, value)
+        if body is not None and status not in (204, 304):
+            if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=5)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.end_headers()
+
+
+def _opaque(etag):
+    """``etag`` without its weak marker: If-None-Match compares weakly."""
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+class BankServer(HTTPServer):
+    """Serves a :class:`bank_core.CommandBank` from its own event loop.
+
+    One request at a time, between the loop's timers (the debounced saves),
+    so no locking is needed anywhere.  ``port=0`` picks a free port.
+    """
+
+    def __init__(self, bank, port=DEFAULT_PORT, quiet=False):
+        super().__init__(("127.0.0.1", port), BankRequestHandler)
+        self.service = BankService(bank)
+        self.loop = bank.loop
+        self.quiet = quiet
+        self.timeout = 0.05      # longest a due timer waits on an idle socket
+        self._stopped = False
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/"
+
+    def run(self):
+        """Answer requests until :meth:`stop` (or Ctrl+C)."""
+        self._stopped = False
+        self.loop.after_idle(self._poll)
+        self.loop.run_until(lambda: self._stopped)
+
+    def stop(self):
+        self._stopped = True
+
+    def _poll(self):
+        self.handle_request()
+        if not self._stopped:
+            self.loop.after_idle(self._poll)
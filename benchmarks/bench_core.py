@@ -0,0 +1,222 @@
+"""Latency and memory benchmark for the headless command-bank operations.
+
+Runs bank_core (no display needed) against synthetic commands.json banks and
+times what the app does with them:
+
+  load     read commands.json, dedupe and build the command index
+           (load_all_commands, without the snapshot accelerator)
+  lookup   open the bank from its snapshot and find one command, as the
+           render/run CLI does; fails if that decodes more than a handful
+           of entries
+  dedupe   _remove_duplicates over the freshly parsed bank
+  index    build the header-search index
+  search   one header search per query, as _on_search runs it while typing
+  render   fill a command's placeholders, as display_constructed_command does
+  save     write the whole bank (save_commands)
+  edit     write the bank after one tab changed (the usual debounced save)
+
+Each operation reports p50/p99 over its samples and the peak memory it
+allocates (tracemalloc, measured in a separate untimed pass).
+
+    python benchmarks/bench_core.py                      # 1k, 10k and 100k commands
+    python benchmarks/bench_core.py --sizes 10000 --runs 20 --json core.json
+
+Compare two versions by running both with --json and diffing the files.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bank_core                                   # noqa: E402
+from bench_startup import synthetic_bank           # noqa: E402
+
+# what a user types into the header search, keystroke by keystroke, plus a
+# typo and a placeholder name
+QUERIES = ["s", "su", "sus", "susp", "suspend", "suspend u", "suspend user",
+           "grp membr", "orgunit", "<query>"]
+RENDERS_PER_RUN = 1000
+DUPLICATE_SHARE = 0.05     # of the bank, appended again to give dedupe work
+SEARCH_TOP_K = 100         # CommandManager.SEARCH_TOP_K
+LOOKUP_MAX_DECODED = 32    # entries an open + one lookup may decode
+
+
+@contextlib.contextmanager
+def snapshot_enabled():
+    previous = os.environ.get("GAM_BANK_SNAPSHOT")
+    os.environ["GAM_BANK_SNAPSHOT"] = "1"
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["GAM_BANK_SNAPSHOT"]
+        else:
+            os.environ["GAM_BANK_SNAPSHOT"] = previous
+
+
+def decoded_entries(commands):
+    """How many entries of a snapshot-backed bank have been turned into Commands."""
+    return sum(1 for entries in commands.values()
+               for item in getattr(entries, "_items", entries) if not isinstance(item, int))
+
+
+def write_bank(path, n, seed=1):
+    bank = synthetic_bank(n, seed)
+    rng = random.Random(seed)
+    for cat in bank:
+        entries = bank[cat]
+        entries.extend(rng.sample(entries, int(len(entries) * DUPLICATE_SHARE)))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(bank, f, indent=4, ensure_ascii=False)
+
+
+class Case:
+    """The operations over one bank file.  Every ``op_*`` is ``setup -> timed``:
+    it does its untimed preparation and returns the calls to time."""
+
+    def __init__(self, path):
+        self.path = path
+        self.loop = bank_core.EventLoop()
+        with open(path, "r", encoding="utf-8") as f:
+            self.raw = json.load(f)
+        self.commands = bank_core.bank_from_json(self.raw)
+        bank_core._remove_duplicates(self.commands)
+        self.search = bank_core.SearchIndex()
+        self.search.rebuild(self.commands)
+        entries = [c for cat in self.commands for c in self.commands[cat]]
+        rng = random.Random(2)
+        self.samples = rng.sample(entries, min(RENDERS_PER_RUN, len(entries)))
+        self.values = {"user": "jdoe@example.com", "group": "staff@example.com",
+                       "query": "isSuspended=False", "ou": "/Staff"}
+
+    def store(self):
+        return bank_core.JsonCommandStore(self.loop, self.path, lambda: self.commands)
+
+    def op_load(self):
+        store = self.store()
+        return [lambda: bank_core.load_bank(store, eager=False)]
+
+    def op_lookup(self):
+        # a copy, since the first open saves the deduped bank over the file
+        path = os.path.join(os.path.dirname(self.path), "lookup_" + os.path.basename(self.path))
+        shutil.copyfile(self.path, path)
+        with snapshot_enabled():
+            bank_core.CommandBank(path).close()         # dedupes and saves
+            bank_core.CommandBank(path, write_snapshot=True).close()
+        name = self.samples[0].description
+
+        def lookup():
+            with snapshot_enabled():
+                bank = bank_core.CommandBank(path)
+            try:
+                assert bank.find(name) is not None, name
+                decoded = decoded_entries(bank.commands)
+                assert decoded <= LOOKUP_MAX_DECODED, f"open + lookup decoded {decoded} entries"
+            finally:
+                bank.close()
+        return [lookup]
+
+    def op_dedupe(self):
+        commands = bank_core.bank_from_json(self.raw)
+        return [lambda: bank_core._remove_duplicates(commands)]
+
+    def op_index(self):
+        return [lambda: bank_core.SearchIndex().rebuild(self.commands)]
+
+    def op_search(self):
+        return [lambda q=q: self.search.search_grouped(q, SEARCH_TOP_K) for q in QUERIES]
+
+    def op_render(self):
+        bank_core.compile_template.cache_clear()    # first render of each command compiles it
+        return [lambda c=c: bank_core.compile_template(c.command).render(self.values)
+                for c in self.samples]
+
+    def op_save(self):
+        store = self.store()
+        return [store.save]
+
+    def op_edit(self):
+        store = self.store()
+        store.save()                                # warm the encoded-tab cache
+
+        def edit():
+            store.writer.mark_dirty("AD")
+            store.flush()
+        return [edit]
+
+
+OPERATIONS = ["load", "lookup", "dedupe", "index", "search", "render", "save", "edit"]
+
+
+def measure(case, name, runs):
+    """Latency samples in ms, and the peak traced allocation in KiB."""
+    samples = []
+    for _ in range(runs):
+        for call in getattr(case, f"op_{name}")():
+            start = time.perf_counter()
+            call()
+            samples.append((time.perf_counter() - start) * 1000)
+    calls = getattr(case, f"op_{name}")()
+    tracemalloc.start()
+    for call in calls:
+        call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return samples, peak / 1024
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--ops", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    ap.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args()
+
+    os.environ["GAM_BANK_SNAPSHOT"] = "0"           # time the JSON path, not the cache
+    os.environ["GAM_BANK_STORE"] = "json"
+    results = []
+    print(f"{'commands':>9}  {'operation':<9} {'samples':>7}  {'p50':>10}  {'p99':>10}  "
+          f"{'peak mem':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"commands_{size}.json")
+            write_bank(path, size)
+            case = Case(path)
+            for name in args.ops:
+                samples, peak_kib = measure(case, name, args.runs)
+                row = {
+                    "commands": size,
+                    "operation": name,
+                    "samples": len(samples),
+                    "p50_ms": round(statistics.median(samples), 3),
+                    "p99_ms": round(percentile(samples, 99), 3),
+                    "peak_kib": round(peak_kib, 1),
+                }
+                results.append(row)
+                print(f"{size:>9}  {name:<9} {row['samples']:>7}  {row['p50_ms']:>7.3f} ms  "
+                      f"{row['p99_ms']:>7.3f} ms  {row['peak_kib']:>6.0f} KiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Time-to-first-interactive benchmark for the desktop app.
+
+Each run starts a fresh interpreter that opens CommandManager on a synthetic
+bank and reports three moments, measured from the moment the process was
+spawned:
+
+  interactive  window painted with the first tab built and the event loop
+               taking input (the number the target applies to)
+  loaded       background load + indexing finished, pickers populated
+  all tabs     the idle-time tab builds are done
+
+    python benchmarks/bench_startup.py                # 1k and 10k commands
+    python benchmarks/bench_startup.py --sizes 30000 --runs 3
+
+Needs a display (tkinter cannot open a window otherwise).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# time from spawn until the window is painted and responding, whatever the
+# size of commands.json; loading continues in the background after that
+TTI_TARGET_MS = 400
+
+_VERBS = ["create", "delete", "update", "info", "print", "suspend", "add", "remove"]
+_NOUNS = ["user", "group", "member", "alias", "drive", "calendar", "license",
+          "orgunit", "device", "mailbox", "token", "role"]
+_FLAGS = ["suspended on", "fields name,email", "todrive", "query <query>",
+          "role <role>", "ou <ou>", "password <password>", "members"]
+
+
+def synthetic_bank(n, seed=1):
+    """A commands.json-shaped dict with ``n`` commands spread over the tabs."""
+    rng = random.Random(seed)
+    bank = {"GAM": [], "AD": [], "PowerShell": []}
+    cats = ["GAM"] * 6 + ["AD"] * 2 + ["PowerShell"] * 2
+    for i in range(n):
+        cat = rng.choice(cats)
+        verb, noun = rng.choice(_VERBS), rng.choice(_NOUNS)
+        if cat == "GAM":
+            command = f"gam {verb} {noun} <{noun}> {rng.choice(_FLAGS)}"
+        else:
+            command = f"{verb.title()}-AD{noun.title()} -Identity <{noun}>"
+        bank[cat].append({
+            "command": command,
+            "description": f"{verb.title()} {noun} #{i}",
+            "category": cat,
+            "favorite": rng.random() < 0.02,
+            "use_count": rng.randint(0, 40),
+            "last_used": None,
+        })
+    return bank
+
+
+def child(data_file):
+    sys.path.insert(0, ROOT)
+    import tkinter as tk
+    import command_bank
+
+    class Manager(command_bank.CommandManager):
+        def _get_data_file_path(self, filename):
+            return data_file
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as exc:
+        print(json.dumps({"error": f"no display: {exc}"}), flush=True)
+        return
+    app = Manager(root)
+    root.update()
+    print("interactive", flush=True)
+    while app._loading:
+        root.update()
+        time.sleep(0.002)
+    print("loaded", flush=True)
+    while len(app._built) < len(app._tabs):
+        root.update()
+        time.sleep(0.002)
+    print("tabs", flush=True)
+    app._on_close()
+
+
+def run_once(data_file):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", data_file],
+                            stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    marks = {}
+    for line in proc.stdout:
+        line = line.strip()
+        if line.startswith("{"):
+            raise SystemExit(json.loads(line)["error"])
+        marks[line] = (time.perf_counter() - start) * 1000
+    proc.wait()
+    return marks
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    results, ok = [], True
+    print(f"{'commands':>9}  {'interactive':>12}  {'loaded':>9}  {'all tabs':>9}   "
+          f"target {TTI_TARGET_MS} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            data_file = os.path.join(tmp, f"commands_{size}.json")
+            with open(data_file, "w", encoding="utf-8") as f:
+                json.dump(synthetic_bank(size), f, indent=4, ensure_ascii=False)
+            runs = [run_once(data_file) for _ in range(args.runs)]
+            row = {"commands": size}
+            for mark in ("interactive", "loaded", "tabs"):
+                row[f"{mark}_ms"] = round(statistics.median(r[mark] for r in runs), 1)
+            row["meets_target"] = row["interactive_ms"] <= TTI_TARGET_MS
+            ok &= row["meets_target"]
+            results.append(row)
+            print(f"{size:>9}  {row['interactive_ms']:>9.1f} ms  {row['loaded_ms']:>6.1f} ms  "
+                  f"{row['tabs_ms']:>6.1f} ms   {'ok' if row['meets_target'] else 'SLOW'}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"target_ms": TTI_TARGET_MS, "results": results}, f, indent=2)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,27 @@
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # search / render / run / batch from scripts: answer without loading tkinter
+    import bank_core
+    sys.exit(bank_core.main(sys.argv[1:]))
+
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
 import os
-import sys
-import re
-import subprocess
-import webbrowser
-from datetime import datetime
+import shutil
+import threading
+
+from bank_core import (
+    BatchRun, Command, CommandIndex, CommandRunner, FrecencyRanker, SearchIndex,
+    UsageViews, compile_template, command_target, data_file_path, gam_csv_command,
+    load_bank, now_us, open_store, parse_batch_rows, powershell_pool, powershell_timeout,
+    us_to_iso, write_batch_csv,
+)
+
+
+def _open_url(url):
+    import webbrowser  # deferred: slow to import and only needed on click
+    webbrowser.open(url)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -43,6 +58,301 @@ class Tooltip:
             self.tip_window.destroy()
             self.tip_window = None
 
+    def set_colors(self, bg, fg, border):
+        self._bg, self._fg, self._border = bg, fg, border
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Theme registry
+# ─────────────────────────────────────────────────────────────────────────────
+class ThemeRegistry:
+    """Remembers which palette keys each widget was painted with.
+
+    ``paint`` colors a widget from the current palette and records the option →
+    palette-key mapping; ``apply`` repaints every live widget from a new
+    palette in place, so switching themes never destroys the widget tree.
+    Anything that is not a plain widget option (text tags, tooltips, icons)
+    registers a callback with ``track``.
+    """
+
+    def __init__(self, palette):
+        self.C = palette
+        self._painters = []     # (owning widget, fn(palette))
+        self._live = 0
+
+    def paint(self, widget, **options):
+        self.track(widget, lambda C: widget.configure(
+            **{opt: C[key] for opt, key in options.items()}))
+        return widget
+
+    def track(self, widget, fn):
+        fn(self.C)
+        self._painters.append((widget, fn))
+        # windows closed since the last theme switch leave stale painters
+        if len(self._painters) > 2 * self._live + 256:
+            self._prune()
+        return widget
+
+    def apply(self, palette):
+        self.C = palette
+        self._prune()
+        for _, fn in self._painters:
+            fn(palette)
+
+    def _prune(self):
+        self._painters = [(w, fn) for w, fn in self._painters if w.winfo_exists()]
+        self._live = len(self._painters)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Placeholder input rows
+# ─────────────────────────────────────────────────────────────────────────────
+class PlaceholderRows:
+    """Reusable ``‹placeholder›`` label + entry rows for one tab.
+
+    Rows are created only when a command needs more than the pool already
+    holds; switching commands relabels the existing rows and hides the spare
+    ones.  Values are remembered by placeholder name, so ``<user>`` keeps what
+    was typed when moving between commands that share it.
+    """
+
+    def __init__(self, parent, paint, on_change):
+        self.parent = parent
+        self.paint = paint
+        self.on_change = on_change
+        self.widgets = {}       # placeholder name -> Entry, for the rows shown
+        self._rows = []         # (row frame, label, entry)
+        self._shown = 0
+        self._values = {}
+
+    def show(self, names):
+        self._remember()
+        while len(self._rows) < len(names):
+            self._rows.append(self._new_row())
+        for i, name in enumerate(names):
+            row, label, entry = self._rows[i]
+            label.config(text=f"‹{name}›")
+            value = self._values.get(name, "")
+            if entry.get() != value:
+                entry.delete(0, tk.END)
+                entry.insert(0, value)
+            if i >= self._shown:
+                row.pack(fill=tk.X, pady=2)
+        for row, _, _ in self._rows[len(names):self._shown]:
+            row.pack_forget()
+        self._shown = len(names)
+        self.widgets = {name: self._rows[i][2] for i, name in enumerate(names)}
+
+    def values(self):
+        return {name: entry.get() for name, entry in self.widgets.items()}
+
+    def _remember(self):
+        self._values.update(self.values())
+
+    def _new_row(self):
+        paint = self.paint
+        row = paint(tk.Frame(self.parent), bg="surface")
+        label = paint(tk.Label(row, font=("Segoe UI", 9), width=18, anchor=tk.W),
+                      fg="muted", bg="surface")
+        label.pack(side=tk.LEFT)
+        entry = paint(tk.Entry(row, relief="flat", font=("Consolas", 10),
+                               highlightthickness=1),
+                      bg="surface2", fg="text", insertbackground="primary",
+                      highlightbackground="border", highlightcolor="primary")
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        entry.bind("<KeyRelease>", lambda e: self.on_change())
+        return row, label, entry
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Virtualized command picker
+# ─────────────────────────────────────────────────────────────────────────────
+class CommandPicker:
+    """Readonly command selector whose dropdown renders only the visible rows.
+
+    ``set_rows`` takes any sequence of entries (usually the category's
+    ``RankedRows``, or a list of search hits) without copying it; the dropdown Listbox
+    holds at most ``ROWS`` lines and is refilled from the sequence as it
+    scrolls, so opening and scrolling cost the same for 300 or 30,000 entries.
+    Typing in the dropdown narrows the list through ``filter_fn(text)``.
+    """
+
+    ROWS = 14
+
+    def __init__(self, parent, paint, on_select, filter_fn=None):
+        self.paint = paint
+        self.on_select = on_select
+        self.filter_fn = filter_fn
+        self.selected = None
+        self._rows = ()          # entries set by the owner
+        self._view = ()          # entries listed in the dropdown (rows or filtered)
+        self._offset = 0         # index of the first rendered entry in _view
+        self._cursor = 0         # highlighted entry in _view
+        self._filter_text = ""
+        self._popup = None
+
+        self.frame = paint(tk.Frame(parent, highlightthickness=1),
+                           bg="surface2", highlightbackground="border")
+        self._var = tk.StringVar()
+        field = paint(tk.Label(self.frame, textvariable=self._var, anchor=tk.W,
+                               font=("Segoe UI", 10), padx=8, pady=4, cursor="hand2"),
+                      bg="surface2", fg="text")
+        field.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        arrow = paint(tk.Label(self.frame, text="▾", font=("Segoe UI", 10),
+                               padx=6, cursor="hand2"),
+                      bg="surface2", fg="muted")
+        arrow.pack(side=tk.RIGHT)
+        for w in (self.frame, field, arrow):
+            w.bind("<Button-1>", lambda e: self.open())
+
+    @staticmethod
+    def label(entry):
+        return entry.description or entry.command
+
+    def set_rows(self, rows, empty_text=""):
+        self._rows = self._view = rows
+        self._offset = self._cursor = 0
+        self.selected = None
+        self._var.set("" if rows else empty_text)
+        if self._popup is not None and self._popup.winfo_viewable():
+            self._render()
+
+    def select(self, entry):
+        """Show ``entry`` as the current choice without firing ``on_select``."""
+        self.selected = entry
+        self._var.set(self.label(entry) if entry is not None else "")
+
+    # ── dropdown ─────────────────────────────────────────────────────────────
+    def open(self):
+        if not self._rows:
+            return
+        if self._popup is None:
+            self._build_popup()
+        self._filter.delete(0, tk.END)
+        self._filter_text = ""
+        self._view = self._rows
+        self._cursor = 0
+        self._offset = 0
+        self._render()
+        popup = self._popup
+        popup.update_idletasks()
+        x = self.frame.winfo_rootx()
+        y = self.frame.winfo_rooty() + self.frame.winfo_height()
+        popup.geometry(f"{self.frame.winfo_width()}x{popup.winfo_reqheight()}+{x}+{y}")
+        popup.deiconify()
+        popup.lift()
+        try:
+            popup.grab_set()
+        except tk.TclError:     # not mapped yet on some window managers
+            pass
+        self._filter.focus_set()
+
+    def close(self):
+        if self._popup is not None:
+            self._popup.grab_release()
+            self._popup.withdraw()
+
+    def _build_popup(self):
+        paint = self.paint
+        popup = self._popup = paint(tk.Toplevel(self.frame, highlightthickness=1),
+                                    bg="surface2", highlightbackground="border")
+        popup.withdraw()
+        popup.wm_overrideredirect(True)
+        self._filter = paint(tk.Entry(popup, relief="flat", font=("Segoe UI", 10),
+                                      highlightthickness=1),
+                             bg="surface", fg="text", insertbackground="primary",
+                             highlightbackground="border", highlightcolor="primary")
+        self._filter.pack(fill=tk.X, padx=4, pady=4)
+        body = paint(tk.Frame(popup), bg="surface2")
+        body.pack(fill=tk.BOTH, expand=True)
+        self._list = paint(tk.Listbox(body, height=self.ROWS, font=("Segoe UI", 10),
+                                      selectforeground="#FFFFFF", relief="flat",
+                                      borderwidth=0, activestyle="none",
+                                      exportselection=False),
+                           bg="surface2", fg="text", selectbackground="primary")
+        # the Listbox never scrolls itself; the scrollbar drives _offset
+        self._scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self._list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self._filter.bind("<KeyRelease>", self._on_filter)
+        for key, step in (("<Down>", 1), ("<Up>", -1),
+                          ("<Next>", self.ROWS), ("<Prior>", -self.ROWS)):
+            self._filter.bind(key, lambda e, s=step: self._move(s))
+        self._filter.bind("<Return>", lambda e: self._choose(self._cursor))
+        self._filter.bind("<Escape>", lambda e: self.close())
+        self._list.bind("<ButtonRelease-1>",
+                        lambda e: self._choose(self._offset + self._list.nearest(e.y)))
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self._list.bind(seq, self._on_wheel)
+        popup.bind("<ButtonPress-1>", self._on_press)
+
+    def _render(self):
+        n = len(self._view)
+        end = min(n, self._offset + self.ROWS)
+        lb = self._list
+        lb.configure(height=max(1, min(self.ROWS, n)))
+        lb.delete(0, tk.END)
+        for i in range(self._offset, end):
+            lb.insert(tk.END, "  " + self.label(self._view[i]))
+        if self._offset <= self._cursor < end:
+            lb.selection_set(self._cursor - self._offset)
+        if n:
+            self._scrollbar.set(self._offset / n, end / n)
+        else:
+            self._scrollbar.set(0, 1)
+
+    def _scroll_to(self, offset):
+        self._offset = max(0, min(offset, len(self._view) - self.ROWS))
+        self._render()
+
+    def _move(self, step):
+        if not self._view:
+            return "break"
+        self._cursor = max(0, min(self._cursor + step, len(self._view) - 1))
+        if self._cursor < self._offset:
+            self._scroll_to(self._cursor)
+        elif self._cursor >= self._offset + self.ROWS:
+            self._scroll_to(self._cursor - self.ROWS + 1)
+        else:
+            self._render()
+        return "break"
+
+    def _choose(self, i):
+        if 0 <= i < len(self._view):
+            self.select(self._view[i])
+            self.close()
+            self.on_select(self.selected)
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self._view)))
+        else:
+            self._scroll_to(self._offset + int(amount) * (self.ROWS if unit == "pages" else 1))
+
+    def _on_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._scroll_to(self._offset - 3)
+        else:
+            self._scroll_to(self._offset + 3)
+        return "break"
+
+    def _on_filter(self, event=None):
+        text = self._filter.get().strip()
+        if text == self._filter_text:
+            return
+        self._filter_text = text
+        self._view = (self.filter_fn(text) if text and self.filter_fn else self._rows)
+        self._offset = self._cursor = 0
+        self._render()
+
+    def _on_press(self, event):
+        # the grab routes every click here; clicks outside the dropdown close it
+        w = self._popup.winfo_containing(event.x_root, event.y_root)
+        if w is None or w.winfo_toplevel() is not self._popup:
+            self.close()
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Main Application
@@ -95,15 +405,26 @@ class CommandManager:
         "header_bar": "#FFFFFF",
     }
 
+    LOAD_POLL_MS = 30          # how often the UI checks on a background load
+    DISK_POLL_MS = 2000        # how often the UI checks for saves by another process
+    SEARCH_DEBOUNCE_MS = 120   # idle time after a keystroke before searching
+    SEARCH_TOP_K = 100         # best matches listed per tab
+    PICKER_FILTER_LIMIT = 500  # matches listed while typing in a picker
+    VIEW_PAGE_SIZE = 20        # rows per page in the ★ / ⌚ / ▲ windows
+    TOP_COMMANDS_LIMIT = 100   # most frecent commands listed under ▲ Top Commands
+    MAX_CONCURRENT_RUNS = 4
+    BATCH_WORKERS = 4          # rows of a batch executed at once
+
     def __init__(self, root):
         self.root = root
         self._is_dark = True
         self.C = dict(self.DARK)
+        self._theme = ThemeRegistry(self.C)
         self.root.title("GAM Command Bank")
         self.root.geometry("1020x660")
         self.root.resizable(True, True)
         self.root.minsize(820, 540)
-        self.root.configure(bg=self.C["bg"])
+        self._theme.paint(self.root, bg="bg")
 
         try:
             if getattr(sys, "frozen", False):
@@ -117,20 +438,38 @@ class CommandManager:
 
         self.data_file = self._get_data_file_path("commands.json")
         self.commands: dict = {}
+        self._index = CommandIndex(self.commands)
+        self._search = SearchIndex()
+        self._views = UsageViews()
+        self._ranker = FrecencyRanker()
+        self._search_job = None
+        self._runner = CommandRunner(self.root, max_workers=self.MAX_CONCURRENT_RUNS)
+        self._ps_pool = None
         self._status_job = None
+        self._loading = False
+        self._edits_while_loading = []  # replayed onto the bank a load returns
+        self._unsaved_edits = []        # edits the store has not written yet
         self._add_visible: dict = {}  # per-category toggle state
+        self._built: set = set()      # tabs whose widgets exist
+        self._store = self._open_store()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self.style = ttk.Style()
         self._configure_style()
         self._create_menu()
         self._create_widgets()
+        # paint first; the file is read and indexed on a worker thread and the
+        # other tabs are built once the window is idle
         self.load_all_commands()
+        self.root.after_idle(self._build_idle_tabs)
+        self.root.after(self.DISK_POLL_MS, self._watch_disk)
 
     # =========================================================================
     # STYLE
     # =========================================================================
     def _configure_style(self):
-        self.style.theme_use("clam")
+        if self.style.theme_use() != "clam":
+            self.style.theme_use("clam")
         C = self.C
 
         F  = ("Segoe UI", 10)
@@ -199,42 +538,44 @@ class CommandManager:
         _btn("W",  C["warning"],  C["warning_dk"])
         _btn("Gh", C["surface2"], C["border"],    fg=C["text"],  pad=(10, 5))
 
-        # combobox dropdown popup
-        self.root.option_add("*TCombobox*Listbox*Background",       C["surface2"])
-        self.root.option_add("*TCombobox*Listbox*Foreground",       C["text"])
-        self.root.option_add("*TCombobox*Listbox*selectBackground", C["primary"])
-        self.root.option_add("*TCombobox*Listbox*selectForeground", "#FFFFFF")
+        # load progress (status bar)
+        self.style.configure("Load.Horizontal.TProgressbar",
+                             background=C["primary"], troughcolor=C["surface2"],
+                             bordercolor=C["surface2"], lightcolor=C["primary"],
+                             darkcolor=C["primary"])
 
     # =========================================================================
     # MENU
     # =========================================================================
     def _create_menu(self):
-        C = self.C
-        kw = dict(bg=C["surface"], fg=C["text"],
-                  activebackground=C["primary"], activeforeground="#fff",
-                  borderwidth=0, relief="flat")
-        menubar = tk.Menu(self.root, **kw)
+        paint = self._theme.paint
+        colors = dict(bg="surface", fg="text", activebackground="primary")
+        kw = dict(activeforeground="#fff", borderwidth=0, relief="flat")
+        menubar = paint(tk.Menu(self.root, **kw), **colors)
 
-        file_m = tk.Menu(menubar, tearoff=0, **kw)
+        file_m = paint(tk.Menu(menubar, tearoff=0, **kw), **colors)
         file_m.add_command(label="⟳  Reload",        command=self.load_all_commands)
+        file_m.add_command(label="⇧  Import JSON…",  command=self._import_json)
+        file_m.add_command(label="⇩  Export JSON…",  command=self._export_json)
         file_m.add_separator()
-        file_m.add_command(label="✕  Exit",           command=self.root.quit)
+        file_m.add_command(label="✕  Exit",           command=self._on_close)
         menubar.add_cascade(label="File", menu=file_m)
 
-        view_m = tk.Menu(menubar, tearoff=0, **kw)
+        view_m = paint(tk.Menu(menubar, tearoff=0, **kw), **colors)
         view_m.add_command(label="★  Favorites",        command=self._show_favorites_window)
         view_m.add_command(label="⌚  Recently Copied",  command=self._show_recent_window)
+        view_m.add_command(label="▲  Top Commands",     command=self._show_top_window)
         view_m.add_separator()
         view_m.add_command(label="☀  Toggle Theme",     command=self._toggle_theme)
         menubar.add_cascade(label="View", menu=view_m)
 
-        ref_m = tk.Menu(menubar, tearoff=0, **kw)
-        ref_m.add_command(label="◈ GAM People",       command=lambda: webbrowser.open("https://sites.google.com/view/gam--commands/people"))
-        ref_m.add_command(label="◈ GAM Services",     command=lambda: webbrowser.open("https://sites.google.com/view/gam--commands/services"))
-        ref_m.add_command(label="◈ Full Reference",   command=lambda: webbrowser.open("https://sites.google.com/view/gam--commands/home"))
+        ref_m = paint(tk.Menu(menubar, tearoff=0, **kw), **colors)
+        ref_m.add_command(label="◈ GAM People",       command=lambda: _open_url("https://sites.google.com/view/gam--commands/people"))
+        ref_m.add_command(label="◈ GAM Services",     command=lambda: _open_url("https://sites.google.com/view/gam--commands/services"))
+        ref_m.add_command(label="◈ Full Reference",   command=lambda: _open_url("https://sites.google.com/view/gam--commands/home"))
         menubar.add_cascade(label="Reference", menu=ref_m)
 
-        about_m = tk.Menu(menubar, tearoff=0, **kw)
+        about_m = paint(tk.Menu(menubar, tearoff=0, **kw), **colors)
         about_m.add_command(label="ℹ  About",         command=self._show_about)
         menubar.add_cascade(label="About", menu=about_m)
 
@@ -244,72 +585,65 @@ class CommandManager:
     # ROOT LAYOUT
     # =========================================================================
     def _create_widgets(self):
-        C = self.C
+        paint = self._theme.paint
 
         # ── Compact header bar ────────────────────────────────────────────
-        hbar = tk.Frame(self.root, bg=C["header_bar"], height=46)
+        hbar = paint(tk.Frame(self.root, height=46), bg="header_bar")
         hbar.pack(fill=tk.X)
         hbar.pack_propagate(False)
 
         # left accent line
-        tk.Frame(hbar, bg=C["primary"], width=3).pack(side=tk.LEFT, fill=tk.Y)
+        paint(tk.Frame(hbar, width=3), bg="primary").pack(side=tk.LEFT, fill=tk.Y)
 
         # title
-        tk.Label(hbar, text="GAM Command Bank",
-                 font=("Segoe UI", 13, "bold"),
-                 fg=C["text"], bg=C["header_bar"],
-                 padx=14).pack(side=tk.LEFT, fill=tk.Y)
+        paint(tk.Label(hbar, text="GAM Command Bank",
+                       font=("Segoe UI", 13, "bold"), padx=14),
+              fg="text", bg="header_bar").pack(side=tk.LEFT, fill=tk.Y)
 
         # version badge
-        tk.Label(hbar, text="v3",
-                 font=("Segoe UI", 8),
-                 fg=C["muted"], bg=C["header_bar"]).pack(side=tk.LEFT)
+        paint(tk.Label(hbar, text="v3", font=("Segoe UI", 8)),
+              fg="muted", bg="header_bar").pack(side=tk.LEFT)
 
         # theme toggle button (packs right-to-left so add before search)
-        _theme_icon = "☽" if self._is_dark else "☀"
-        theme_btn = tk.Label(hbar, text=_theme_icon,
-                             font=("Segoe UI", 12),
-                             fg=C["muted"], bg=C["header_bar"],
-                             cursor="hand2", padx=8)
+        theme_btn = paint(tk.Label(hbar, font=("Segoe UI", 12),
+                                   cursor="hand2", padx=8),
+                          fg="muted", bg="header_bar")
+        self._theme.track(theme_btn, lambda C: theme_btn.config(
+            text="☽" if self._is_dark else "☀"))
         theme_btn.pack(side=tk.RIGHT, padx=(0, 4))
         theme_btn.bind("<Button-1>", lambda e: self._toggle_theme())
-        Tooltip(theme_btn, "Toggle light / dark mode",
-                C["surface"], C["muted"], C["border"])
+        self._tip(theme_btn, "Toggle light / dark mode")
 
         # right side: search
-        tk.Label(hbar, text="⌕",
-                 font=("Segoe UI", 12),
-                 fg=C["muted"], bg=C["header_bar"],
-                 padx=(6)).pack(side=tk.RIGHT, padx=(0, 4))
-
-        clr_btn = tk.Label(hbar, text="✕",
-                           font=("Segoe UI", 10),
-                           fg=C["muted"], bg=C["header_bar"],
-                           cursor="hand2", padx=6)
+        paint(tk.Label(hbar, text="⌕", font=("Segoe UI", 12), padx=(6)),
+              fg="muted", bg="header_bar").pack(side=tk.RIGHT, padx=(0, 4))
+
+        clr_btn = paint(tk.Label(hbar, text="✕", font=("Segoe UI", 10),
+                                 cursor="hand2", padx=6),
+                        fg="muted", bg="header_bar")
         clr_btn.pack(side=tk.RIGHT)
         clr_btn.bind("<Button-1>", lambda e: self._clear_search())
-        Tooltip(clr_btn, "Clear search", C["surface"], C["muted"], C["border"])
+        self._tip(clr_btn, "Clear search")
 
         self.search_var = tk.StringVar()
         self.search_var.trace_add("write", self._on_search)
-        se = tk.Entry(hbar, textvariable=self.search_var,
-                      width=32, insertbackground=C["primary"],
-                      bg=C["surface2"], fg=C["text"],
-                      relief="flat", font=("Segoe UI", 10),
-                      highlightthickness=1,
-                      highlightbackground=C["border"],
-                      highlightcolor=C["primary"])
+        se = paint(tk.Entry(hbar, textvariable=self.search_var,
+                            width=32, relief="flat", font=("Segoe UI", 10),
+                            highlightthickness=1),
+                   insertbackground="primary", bg="surface2", fg="text",
+                   highlightbackground="border", highlightcolor="primary")
         se.pack(side=tk.RIGHT, pady=8, padx=(0, 2))
         se.insert(0, "Search commands…")
         se.bind("<FocusIn>",  lambda e: se.delete(0, tk.END) if se.get() == "Search commands…" else None)
         se.bind("<FocusOut>", lambda e: se.insert(0, "Search commands…") if not se.get() else None)
 
         # ── Notebook ──────────────────────────────────────────────────────
-        nb_wrap = tk.Frame(self.root, bg=C["bg"])
+        nb_wrap = paint(tk.Frame(self.root), bg="bg")
         nb_wrap.pack(fill=tk.BOTH, expand=True, padx=12, pady=(10, 0))
 
         self.notebook = ttk.Notebook(nb_wrap, style="TNotebook")
         self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
         self.gam_frame        = ttk.Frame(self.notebook, style="TFrame")
         self.ad_frame         = ttk.Frame(self.notebook, style="TFrame")
@@ -318,120 +652,145 @@ class CommandManager:
         self.notebook.add(self.gam_frame,        text="  ◈ GAM  ")
         self.notebook.add(self.ad_frame,          text="  ⊞ AD  ")
         self.notebook.add(self.powershell_frame,  text="  ⌨ PowerShell  ")
-
-        self._build_tab(self.gam_frame,        "GAM")
-        self._build_tab(self.ad_frame,         "AD")
-        self._build_tab(self.powershell_frame, "PowerShell")
+        self._tabs = {"GAM":        self.gam_frame,
+                      "AD":         self.ad_frame,
+                      "PowerShell": self.powershell_frame}
+        self._ensure_tab("GAM")
 
         # ── Status bar ────────────────────────────────────────────────────
-        sb = tk.Frame(self.root, bg=C["surface"], height=28)
+        sb = paint(tk.Frame(self.root, height=28), bg="surface")
         sb.pack(side=tk.BOTTOM, fill=tk.X)
         sb.pack_propagate(False)
-        tk.Frame(sb, bg=C["primary"], height=1).pack(fill=tk.X, side=tk.TOP)
+        paint(tk.Frame(sb, height=1), bg="primary").pack(fill=tk.X, side=tk.TOP)
 
-        self.status_bar = tk.Label(sb, text="● Ready", anchor=tk.W,
-                                   font=("Segoe UI", 8),
-                                   fg=C["muted"], bg=C["surface"],
-                                   padx=12)
+        self.status_bar = paint(tk.Label(sb, text="● Ready", anchor=tk.W,
+                                         font=("Segoe UI", 8), padx=12),
+                                fg="muted", bg="surface")
         self.status_bar.pack(side=tk.LEFT, fill=tk.Y)
 
-        self._count_label = tk.Label(sb, text="", anchor=tk.E,
-                                     font=("Segoe UI", 8),
-                                     fg=C["dim"], bg=C["surface"],
-                                     padx=12)
+        self._count_label = paint(tk.Label(sb, text="", anchor=tk.E,
+                                           font=("Segoe UI", 8), padx=12),
+                                  fg="dim", bg="surface")
         self._count_label.pack(side=tk.RIGHT, fill=tk.Y)
 
+        # packed only while a load is in progress
+        self._progress = ttk.Progressbar(sb, style="Load.Horizontal.TProgressbar",
+                                         mode="determinate", maximum=1.0, length=140)
+
+    def _ensure_tab(self, category):
+        frame = self._tabs[category]
+        if category not in self._built:
+            self._built.add(category)
+            self._build_tab(frame, category)
+            if not self._loading:
+                self.update_description_options(category)
+                hits = self._search_hits()
+                if hits is not None:
+                    self._show_hits(category, frame, hits)
+        return frame
+
+    def _build_idle_tabs(self):
+        # one tab per idle callback so input is handled in between
+        for category in self._tabs:
+            if category not in self._built:
+                self._ensure_tab(category)
+                self.root.after_idle(self._build_idle_tabs)
+                return
+
+    def _tip(self, widget, text):
+        tip = Tooltip(widget, text)
+        self._theme.track(widget, lambda C: tip.set_colors(C["surface"], C["muted"], C["border"]))
+
     # =========================================================================
     # TAB BUILDER  (compact single-surface layout)
     # =========================================================================
     def _build_tab(self, frame, category):
-        C = self.C
+        paint = self._theme.paint
         self._add_visible[category] = False
 
         # ── Main surface card ─────────────────────────────────────────────
-        card = tk.Frame(frame, bg=C["surface"],
-                        highlightbackground=C["border"], highlightthickness=1)
+        card = paint(tk.Frame(frame, highlightthickness=1),
+                     bg="surface", highlightbackground="border")
         card.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         # top accent
-        tk.Frame(card, bg=C["primary"], height=2).pack(fill=tk.X)
+        paint(tk.Frame(card, height=2), bg="primary").pack(fill=tk.X)
 
-        inner = tk.Frame(card, bg=C["surface"])
+        inner = paint(tk.Frame(card), bg="surface")
         inner.pack(fill=tk.BOTH, expand=True, padx=14, pady=10)
 
         # ── Row 1: command selector ───────────────────────────────────────
-        row1 = tk.Frame(inner, bg=C["surface"])
+        row1 = paint(tk.Frame(inner), bg="surface")
         row1.pack(fill=tk.X, pady=(0, 6))
 
-        combo = ttk.Combobox(row1, state="readonly", style="TCombobox")
-        combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        combo.bind("<<ComboboxSelected>>",
-                   lambda e: self.update_command_display(e, category, frame))
+        picker = CommandPicker(row1, paint,
+                               lambda cmd: self.update_command_display(None, category, frame),
+                               lambda text: self._filter_rows(category, text))
+        picker.frame.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
         # star
-        fav_btn = tk.Label(row1, text="☆", font=("Segoe UI", 13),
-                           fg=C["star"], bg=C["surface"],
-                           cursor="hand2", padx=6)
+        fav_btn = paint(tk.Label(row1, text="☆", font=("Segoe UI", 13),
+                                 cursor="hand2", padx=6),
+                        fg="star", bg="surface")
         fav_btn.pack(side=tk.LEFT)
         fav_btn.bind("<Button-1>", lambda e: self._toggle_favorite(category, frame))
-        Tooltip(fav_btn, "Toggle favorite", C["surface"], C["muted"], C["border"])
+        self._tip(fav_btn, "Toggle favorite")
 
         # remove
         rem_btn = ttk.Button(row1, text="⌫",
                              command=lambda: self.remove_command(category, frame),
                              style="R.TButton", width=3)
         rem_btn.pack(side=tk.LEFT, padx=(4, 0))
-        Tooltip(rem_btn, "Remove selected command", C["surface"], C["muted"], C["border"])
+        self._tip(rem_btn, "Remove selected command")
 
         # add toggle
         add_toggle = ttk.Button(row1, text="＋",
                                 command=lambda: self._toggle_add_panel(category, add_panel),
                                 style="Gh.TButton", width=3)
         add_toggle.pack(side=tk.LEFT, padx=(4, 0))
-        Tooltip(add_toggle, "Add new command", C["surface"], C["muted"], C["border"])
+        self._tip(add_toggle, "Add new command")
 
         # reference link (GAM only)
         if category == "GAM":
-            lk = tk.Label(row1, text="↗ Docs",
-                          font=("Segoe UI", 9, "underline"),
-                          fg=C["accent"], bg=C["surface"],
-                          cursor="hand2", padx=6)
+            lk = paint(tk.Label(row1, text="↗ Docs",
+                                font=("Segoe UI", 9, "underline"),
+                                cursor="hand2", padx=6),
+                       fg="accent", bg="surface")
             lk.pack(side=tk.LEFT, padx=(6, 0))
-            lk.bind("<Button-1>", lambda e: webbrowser.open("https://sites.google.com/view/gam--commands/home"))
-            Tooltip(lk, "Open GAM reference site", C["surface"], C["muted"], C["border"])
+            lk.bind("<Button-1>", lambda e: _open_url("https://sites.google.com/view/gam--commands/home"))
+            self._tip(lk, "Open GAM reference site")
 
         # ── Add panel (hidden by default) ─────────────────────────────────
-        add_panel = tk.Frame(inner, bg=C["surface2"],
-                             highlightbackground=C["border"], highlightthickness=1)
+        add_panel = paint(tk.Frame(inner, highlightthickness=1),
+                          bg="surface2", highlightbackground="border")
         # NOT packed yet — toggled by button
 
-        ap_inner = tk.Frame(add_panel, bg=C["surface2"])
+        ap_inner = paint(tk.Frame(add_panel), bg="surface2")
         ap_inner.pack(fill=tk.X, padx=10, pady=8)
 
-        cmd_row = tk.Frame(ap_inner, bg=C["surface2"])
+        entry_colors = dict(bg="surface2", fg="text", insertbackground="primary",
+                            highlightbackground="border", highlightcolor="primary")
+
+        cmd_row = paint(tk.Frame(ap_inner), bg="surface2")
         cmd_row.pack(fill=tk.X, pady=(0, 4))
-        tk.Label(cmd_row, text="Command", font=("Segoe UI", 9),
-                 fg=C["muted"], bg=C["surface2"], width=10,
-                 anchor=tk.W).pack(side=tk.LEFT)
-        cmd_entry = tk.Entry(cmd_row, bg=C["surface2"], fg=C["text"],
-                             insertbackground=C["primary"], relief="flat",
-                             font=("Consolas", 10),
-                             highlightthickness=1,
-                             highlightbackground=C["border"],
-                             highlightcolor=C["primary"])
+        paint(tk.Label(cmd_row, text="Command", font=("Segoe UI", 9),
+                       width=10, anchor=tk.W),
+              fg="muted", bg="surface2").pack(side=tk.LEFT)
+        cmd_entry = paint(tk.Entry(cmd_row, relief="flat",
+                                   font=("Consolas", 10),
+                                   highlightthickness=1),
+                          **entry_colors)
         cmd_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-        desc_row = tk.Frame(ap_inner, bg=C["surface2"])
+        desc_row = paint(tk.Frame(ap_inner), bg="surface2")
         desc_row.pack(fill=tk.X, pady=(0, 6))
-        tk.Label(desc_row, text="Description", font=("Segoe UI", 9),
-                 fg=C["muted"], bg=C["surface2"], width=10,
-                 anchor=tk.W).pack(side=tk.LEFT)
-        desc_entry = tk.Entry(desc_row, bg=C["surface2"], fg=C["text"],
-                              insertbackground=C["primary"], relief="flat",
-                              font=("Segoe UI", 10),
-                              highlightthickness=1,
-                              highlightbackground=C["border"],
-                              highlightcolor=C["primary"])
+        paint(tk.Label(desc_row, text="Description", font=("Segoe UI", 9),
+                       width=10, anchor=tk.W),
+              fg="muted", bg="surface2").pack(side=tk.LEFT)
+        desc_entry = paint(tk.Entry(desc_row, relief="flat",
+                                    font=("Segoe UI", 10),
+                                    highlightthickness=1),
+                           **entry_colors)
         desc_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
         save_btn = ttk.Button(ap_inner, text="＋ Save",
@@ -439,55 +798,60 @@ class CommandManager:
                               style="G.TButton")
         save_btn.pack(side=tk.LEFT)
 
-        tk.Label(ap_inner,
-                 text="Use <placeholder> for variable fields",
-                 font=("Segoe UI", 8), fg=C["dim"],
-                 bg=C["surface2"]).pack(side=tk.LEFT, padx=(10, 0))
+        paint(tk.Label(ap_inner,
+                       text="Use <placeholder> for variable fields",
+                       font=("Segoe UI", 8)),
+              fg="dim", bg="surface2").pack(side=tk.LEFT, padx=(10, 0))
 
         # ── Row 2: dynamic placeholder inputs ────────────────────────────
-        input_frame = tk.Frame(inner, bg=C["surface"])
+        input_frame = paint(tk.Frame(inner), bg="surface")
         input_frame.pack(fill=tk.X, pady=(0, 4))
 
         # ── Row 3: output area ────────────────────────────────────────────
-        out_wrap = tk.Frame(inner, bg=C["surface2"],
-                            highlightbackground=C["border"], highlightthickness=1)
+        out_wrap = paint(tk.Frame(inner, highlightthickness=1),
+                         bg="surface2", highlightbackground="border")
         out_wrap.pack(fill=tk.BOTH, expand=True, pady=(0, 8))
 
-        text_area = tk.Text(out_wrap, height=6,
-                            font=("Consolas", 10),
-                            bg=C["surface2"], fg=C["text"],
-                            selectbackground=C["primary"],
-                            insertbackground=C["primary"],
-                            relief="flat", borderwidth=0,
-                            wrap=tk.WORD, state=tk.DISABLED,
-                            padx=10, pady=6)
+        text_area = paint(tk.Text(out_wrap, height=6,
+                                  font=("Consolas", 10),
+                                  relief="flat", borderwidth=0,
+                                  wrap=tk.WORD, state=tk.DISABLED,
+                                  padx=10, pady=6),
+                          bg="surface2", fg="text",
+                          selectbackground="primary", insertbackground="primary")
         vsb = ttk.Scrollbar(out_wrap, orient=tk.VERTICAL, command=text_area.yview)
         text_area.configure(yscrollcommand=vsb.set)
+        self._theme.track(text_area, lambda C: text_area.tag_configure(
+            "stderr", foreground=C["danger"]))
         text_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         vsb.pack(side=tk.RIGHT, fill=tk.Y)
 
         # ── Row 4: action buttons ─────────────────────────────────────────
-        act = tk.Frame(inner, bg=C["surface"])
+        act = paint(tk.Frame(inner), bg="surface")
         act.pack(fill=tk.X)
 
         btns = [
             ("⎘ Copy",    "P",   "Copy command to clipboard",lambda: self.copy_command(text_area.get("1.0", tk.END), category, frame)),
             ("▶ Execute", "G",   "Execute command",          lambda: self.execute_command(category, text_area.get("1.0", tk.END), frame)),
+            ("⊗ Cancel",  "R",   "Cancel running commands",  lambda: self._cancel_runs(frame)),
+            ("⧉ Batch",   "Gh",  "Run the command for a list of values", lambda: self._show_batch_window(category, frame)),
             ("⊘ Clear",   "W",   "Clear output",             lambda: self._clear_output(text_area)),
         ]
         for label, style, tip, cmd in btns:
             b = ttk.Button(act, text=label, command=cmd, style=f"{style}.TButton")
             b.pack(side=tk.LEFT, padx=(0, 6))
-            Tooltip(b, tip, C["surface"], C["muted"], C["border"])
+            self._tip(b, tip)
 
         # store refs on frame
         frame.command_entry        = cmd_entry
         frame.description_entry    = desc_entry
         frame.text_area            = text_area
-        frame.description_combobox = combo
-        frame.input_widgets        = {}
+        frame.picker               = picker
         frame.input_frame          = input_frame
+        frame.placeholders         = PlaceholderRows(
+            input_frame, paint, lambda: self.display_constructed_command(category, frame))
         frame.fav_btn              = fav_btn
+        frame.runs                 = set()
 
     def _toggle_add_panel(self, category, panel):
         if self._add_visible.get(category):
@@ -511,20 +875,35 @@ class CommandManager:
     # SEARCH
     # =========================================================================
     def _on_search(self, *_):
-        query = self.search_var.get().strip().lower()
-        if query in ("", "search commands…"):
+        # debounce: only search once typing pauses
+        if self._search_job:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(self.SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        hits = self._search_hits()
+        if hits is None:
             self._restore_all_combos()
             return
         for category, frame in self._category_frames():
-            if category not in self.commands:
-                continue
-            matches = [cmd["description"] for cmd in self.commands[category]
-                       if query in cmd["command"].lower()
-                       or query in cmd["description"].lower()]
-            frame.description_combobox["values"] = matches or ["— no results —"]
-            if matches:
-                frame.description_combobox.current(0)
-                self.update_command_display(None, category, frame)
+            self._show_hits(category, frame, hits)
+
+    def _search_hits(self):
+        query = self.search_var.get().strip().lower()
+        if query == "search commands…":
+            return None
+        return self._search.search_grouped(query, self.SEARCH_TOP_K)
+
+    def _show_hits(self, category, frame, hits):
+        if category not in self.commands:
+            return
+        matches = hits.get(category, [])
+        frame.picker.set_rows(matches, empty_text="— no results —")
+        if matches:
+            frame.picker.select(matches[0])
+            # previewing the best hit is not a use
+            self.update_command_display(None, category, frame, count_use=False)
 
     def _clear_search(self):
         self.search_var.set("")
@@ -534,52 +913,67 @@ class CommandManager:
         for cat, _ in self._category_frames():
             self.update_description_options(cat)
 
+    def _filter_rows(self, category, text):
+        hits = self._search.search(text.lower(), self.PICKER_FILTER_LIMIT, category)
+        return [cmd for _, cmd in hits or ()]
+
     def _category_frames(self):
-        return [("GAM",        self.gam_frame),
-                ("AD",         self.ad_frame),
-                ("PowerShell", self.powershell_frame)]
+        return [(cat, frame) for cat, frame in self._tabs.items() if cat in self._built]
 
     # =========================================================================
     # FAVORITES
     # =========================================================================
     def _toggle_favorite(self, category, frame):
-        sel = frame.description_combobox.get()
-        if not sel:
+        cmd = frame.picker.selected
+        if cmd is None:
             return
-        for cmd in self.commands.get(category, []):
-            if cmd["description"] == sel:
-                cmd["favorite"] = not cmd.get("favorite", False)
-                frame.fav_btn.config(text="★" if cmd["favorite"] else "☆")
-                self.save_commands()
-                verb = "added to" if cmd["favorite"] else "removed from"
-                self.set_status(f"★ '{sel}' {verb} favorites.")
-                return
+        sel = cmd.description
+        cmd.set_favorite(not cmd.favorite)
+        frame.fav_btn.config(text="★" if cmd.favorite else "☆")
+        self._views.favorite_changed(category, cmd)
+        self._search.touch(cmd)
+        self._persist("favorite", category, cmd)
+        verb = "added to" if cmd.favorite else "removed from"
+        self.set_status(f"★ '{sel}' {verb} favorites.")
 
     def _update_fav_icon(self, category, frame):
-        sel = frame.description_combobox.get()
-        for cmd in self.commands.get(category, []):
-            if cmd["description"] == sel:
-                frame.fav_btn.config(text="★" if cmd.get("favorite") else "☆")
-                return
-        frame.fav_btn.config(text="☆")
+        cmd = frame.picker.selected
+        frame.fav_btn.config(text="★" if cmd and cmd.favorite else "☆")
 
     def _show_favorites_window(self):
+        self._show_view_window(
+            "★ Favorites", "star", self._views.favorites,
+            lambda: self._views.favorite_count,
+            lambda cat, cmd: f"  [{cat}]  {cmd.description}",
+            "  — no favorites yet — add one with the ★ button")
+
+    def _show_recent_window(self):
+        self._show_view_window(
+            "⌚ Recently Copied", "primary", self._views.recent,
+            lambda: self._views.recent_count,
+            lambda cat, cmd: (f"  {us_to_iso(cmd.copied_at)[:16].replace('T', '  ')}"
+                              f"   [{cat}]  {cmd.description}"),
+            "  — nothing copied yet — use the ⎘ Copy button")
+
+    def _show_top_window(self):
+        self._show_view_window(
+            "▲ Top Commands", "success", self._ranker.top,
+            lambda: min(self._ranker.ranked_count, self.TOP_COMMANDS_LIMIT),
+            lambda cat, cmd: f"  [{cat}]  {cmd.description}   · used {cmd.use_count}×",
+            "  — nothing used yet — pick a command from any tab")
+
+    def _show_view_window(self, title, accent, fetch, count, render, empty_text):
+        """Paged list over one of the ``UsageViews``; only the shown page is read."""
         C = self.C
-        favs = [
-            (cat, cmd["description"], cmd["command"])
-            for cat in ["GAM", "AD", "PowerShell"]
-            for cmd in self.commands.get(cat, [])
-            if cmd.get("favorite")
-        ]
         win = tk.Toplevel(self.root)
-        win.title("★ Favorites")
+        win.title(title)
         win.geometry("820x400")
         win.configure(bg=C["bg"])
         win.grab_set()
-        tk.Frame(win, bg=C["star"], height=2).pack(fill=tk.X)
+        tk.Frame(win, bg=C[accent], height=2).pack(fill=tk.X)
         hdr = tk.Frame(win, bg=C["bg"])
         hdr.pack(fill=tk.X, padx=18, pady=(12, 4))
-        tk.Label(hdr, text="★ Favorites", font=("Segoe UI", 12, "bold"),
+        tk.Label(hdr, text=title, font=("Segoe UI", 12, "bold"),
                  fg=C["text"], bg=C["bg"]).pack(side=tk.LEFT)
         tk.Label(hdr, text="double-click or ↗ Go to navigate",
                  font=("Segoe UI", 9), fg=C["muted"],
@@ -596,96 +990,227 @@ class CommandManager:
         lb.configure(yscrollcommand=sb.set)
         lb.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         sb.pack(side=tk.RIGHT, fill=tk.Y)
-        if favs:
-            for cat, desc, cmd_text in favs:
-                lb.insert(tk.END, f"  [{cat}]  {desc}")
-        else:
-            lb.insert(tk.END, "  — no favorites yet — add one with the ★ button")
+
+        size = self.VIEW_PAGE_SIZE
+        page = {"start": 0, "rows": []}
+        btn_row = tk.Frame(win, bg=C["bg"])
+        btn_row.pack(pady=(0, 14))
+        prev_btn = ttk.Button(btn_row, text="◀", width=3, style="Gh.TButton",
+                              command=lambda: _show(page["start"] - size))
+        prev_btn.pack(side=tk.LEFT)
+        page_label = tk.Label(btn_row, font=("Segoe UI", 9), fg=C["muted"], bg=C["bg"])
+        page_label.pack(side=tk.LEFT, padx=6)
+        next_btn = ttk.Button(btn_row, text="▶", width=3, style="Gh.TButton",
+                              command=lambda: _show(page["start"] + size))
+        next_btn.pack(side=tk.LEFT, padx=(0, 16))
+
+        def _show(start):
+            total = count()
+            start = max(0, min(start, (total - 1) // size * size)) if total else 0
+            page["start"], page["rows"] = start, fetch(start, size)
+            lb.delete(0, tk.END)
+            for cat, cmd in page["rows"]:
+                lb.insert(tk.END, render(cat, cmd))
+            if not page["rows"]:
+                lb.insert(tk.END, empty_text)
+            page_label.config(text=f"{start // size + 1} / {max(1, -(-total // size))}")
+            prev_btn.state(["!disabled" if start > 0 else "disabled"])
+            next_btn.state(["!disabled" if start + size < total else "disabled"])
+
         def _navigate(event=None):
             sel = lb.curselection()
-            if not sel or not favs or sel[0] >= len(favs):
+            rows = page["rows"]
+            if not sel or not rows or sel[0] >= len(rows):
                 return
-            cat, desc, _ = favs[sel[0]]
+            cat, cmd = rows[sel[0]]
             win.destroy()
             tab_map = {"GAM": 0, "AD": 1, "PowerShell": 2}
             if cat in tab_map:
                 self.notebook.select(tab_map[cat])
-            frame = self._frame_for(cat)
+            frame = self._ensure_tab(cat) if cat in tab_map else None
             if frame:
-                frame.description_combobox.set(desc)
+                frame.picker.select(cmd)
                 self.update_command_display(None, cat, frame)
         lb.bind("<Double-Button-1>", _navigate)
         lb.bind("<Return>", _navigate)
-        btn_row = tk.Frame(win, bg=C["bg"])
-        btn_row.pack(pady=(0, 14))
+        win.bind("<Prior>", lambda e: _show(page["start"] - size))
+        win.bind("<Next>", lambda e: _show(page["start"] + size))
         ttk.Button(btn_row, text="↗ Go to Selected",
                    command=_navigate, style="P.TButton").pack(side=tk.LEFT, padx=(0, 8))
         ttk.Button(btn_row, text="Close",
                    command=win.destroy, style="Gh.TButton").pack(side=tk.LEFT)
+        _show(0)
 
-    def _show_recent_window(self):
-        C = self.C
-        recent = [
-            (cat, cmd)
-            for cat in ["GAM", "AD", "PowerShell"]
-            for cmd in self.commands.get(cat, [])
-            if cmd.get("copied_at")
-        ]
-        recent.sort(key=lambda x: x[1].get("copied_at", ""), reverse=True)
-        recent = recent[:20]
-        win = tk.Toplevel(self.root)
-        win.title("⌚ Recently Copied")
-        win.geometry("820x400")
-        win.configure(bg=C["bg"])
-        win.grab_set()
-        tk.Frame(win, bg=C["primary"], height=2).pack(fill=tk.X)
-        hdr = tk.Frame(win, bg=C["bg"])
-        hdr.pack(fill=tk.X, padx=18, pady=(12, 4))
-        tk.Label(hdr, text="⌚ Recently Copied", font=("Segoe UI", 12, "bold"),
-                 fg=C["text"], bg=C["bg"]).pack(side=tk.LEFT)
-        tk.Label(hdr, text="double-click or ↗ Go to navigate",
-                 font=("Segoe UI", 9), fg=C["muted"],
-                 bg=C["bg"]).pack(side=tk.LEFT, padx=(12, 0))
-        wrap = tk.Frame(win, bg=C["surface2"],
-                        highlightbackground=C["border"], highlightthickness=1)
-        wrap.pack(fill=tk.BOTH, expand=True, padx=18, pady=(0, 8))
-        lb = tk.Listbox(wrap, font=("Segoe UI", 10),
-                        bg=C["surface2"], fg=C["text"],
-                        selectbackground=C["primary"], selectforeground="#FFFFFF",
-                        relief="flat", borderwidth=0, activestyle="none",
-                        cursor="hand2")
-        sb = ttk.Scrollbar(wrap, orient=tk.VERTICAL, command=lb.yview)
+    def _show_batch_window(self, category, frame):
+        cmd = frame.picker.selected
+        if cmd is None or not cmd.command:
+            self.set_status("Select a command first.")
+            return
+        template = cmd.command
+        names = compile_template(template).names
+        if not names:
+            self.set_status("This command has no <placeholders> to batch over.")
+            return
+        defaults = frame.placeholders.values()
+        # non-modal, so it is painted through the registry like the main window
+        paint = self._theme.paint
+        win = paint(tk.Toplevel(self.root), bg="bg")
+        win.title("⧉ Batch")
+        win.geometry("860x560")
+        paint(tk.Frame(win, height=2), bg="primary").pack(fill=tk.X)
+        hdr = paint(tk.Frame(win), bg="bg")
+        hdr.pack(fill=tk.X, padx=18, pady=(12, 2))
+        paint(tk.Label(hdr, text=f"⧉ Batch — {cmd.description}", font=("Segoe UI", 12, "bold")),
+              fg="text", bg="bg").pack(side=tk.LEFT)
+        paint(tk.Label(win, text=template, font=("Consolas", 10), anchor=tk.W),
+              fg="accent", bg="bg").pack(fill=tk.X, padx=18)
+        paint(tk.Label(win,
+                       text=("Paste CSV with a header row naming the placeholders "
+                             f"({', '.join(names)}), or one value per line. "
+                             "Values typed in the tab fill any placeholder left out."),
+                       font=("Segoe UI", 9),
+                       anchor=tk.W, justify=tk.LEFT, wraplength=800),
+              fg="muted", bg="bg").pack(fill=tk.X, padx=18, pady=(6, 4))
+
+        in_wrap = paint(tk.Frame(win, highlightthickness=1),
+                        bg="surface2", highlightbackground="border")
+        in_wrap.pack(fill=tk.X, padx=18)
+        input_text = paint(tk.Text(in_wrap, height=7, font=("Consolas", 10),
+                                   relief="flat", borderwidth=0, padx=8, pady=4),
+                           bg="surface2", fg="text",
+                           insertbackground="primary", selectbackground="primary")
+        input_text.pack(fill=tk.X)
+
+        opts = paint(tk.Frame(win), bg="bg")
+        opts.pack(fill=tk.X, padx=18, pady=8)
+        retries_var = tk.IntVar(value=1)
+        workers_var = tk.IntVar(value=self.BATCH_WORKERS)
+        for label, var, hi in (("Retries", retries_var, 5), ("Parallel", workers_var, 16)):
+            paint(tk.Label(opts, text=label, font=("Segoe UI", 9)),
+                  fg="muted", bg="bg").pack(side=tk.LEFT, padx=(0, 4))
+            paint(tk.Spinbox(opts, from_=0 if var is retries_var else 1, to=hi, width=3,
+                             textvariable=var, relief="flat", highlightthickness=1),
+                  bg="surface2", fg="text", buttonbackground="surface2",
+                  highlightbackground="border").pack(side=tk.LEFT, padx=(0, 14))
+        summary = paint(tk.Label(opts, text="", font=("Segoe UI", 9)), fg="muted", bg="bg")
+        summary.pack(side=tk.RIGHT)
+
+        out_wrap = paint(tk.Frame(win, highlightthickness=1),
+                         bg="surface2", highlightbackground="border")
+        out_wrap.pack(fill=tk.BOTH, expand=True, padx=18)
+        lb = paint(tk.Listbox(out_wrap, font=("Consolas", 10),
+                              selectforeground="#FFFFFF",
+                              relief="flat", borderwidth=0, activestyle="none"),
+                   bg="surface2", fg="text", selectbackground="primary")
+        sb = ttk.Scrollbar(out_wrap, orient=tk.VERTICAL, command=lb.yview)
         lb.configure(yscrollcommand=sb.set)
         lb.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         sb.pack(side=tk.RIGHT, fill=tk.Y)
-        if recent:
-            for cat, cmd in recent:
-                ts = cmd.get("copied_at", "")[:16].replace("T", "  ")
-                lb.insert(tk.END, f"  {ts}   [{cat}]  {cmd['description']}")
-        else:
-            lb.insert(tk.END, "  — nothing copied yet — use the ⎘ Copy button")
-        def _navigate(event=None):
-            sel = lb.curselection()
-            if not sel or not recent or sel[0] >= len(recent):
+
+        icons = {"pending": "·", "running": "▶", "retrying": "↻",
+                 "ok": "✔", "failed": "✖", "cancelled": "⊘"}
+        state = {"rows": [], "batch": None, "runner": None}
+
+        def _row_text(row):
+            text = f"  {icons[row.status]} {row.number:>4}  {row.command}"
+            if row.status in ("failed", "cancelled") and row.error:
+                text += f"   — {row.error}"
+            if row.status == "failed" and row.output:
+                text += f" ({row.output[-1][:80]})"
+            return text
+
+        def _parse():
+            rows = parse_batch_rows(template, input_text.get("1.0", tk.END), defaults)
+            state["rows"] = rows
+            lb.delete(0, tk.END)
+            for row in rows:
+                lb.insert(tk.END, _row_text(row))
+            return rows
+
+        def _on_row(row):
+            if not win.winfo_exists():
+                return
+            i = state["rows"].index(row)
+            lb.delete(i)
+            lb.insert(i, _row_text(row))
+            done = sum(1 for r in state["rows"] if r.status in ("ok", "failed", "cancelled"))
+            summary.config(text=f"{done}/{len(state['rows'])} done")
+
+        def _on_finish(result):
+            state["runner"].shutdown()
+            state["runner"] = state["batch"] = None
+            text = (f"✔ {result['ok']} ok   ✖ {result['failed']} failed   "
+                    f"⊘ {result['cancelled']} cancelled   ↻ {result['retried']} retried")
+            if win.winfo_exists():
+                summary.config(text=text)
+            self.set_status(f"⧉ Batch finished — {text}")
+
+        def _target(command):
+            return command_target(category, command, pool)
+
+        def _run():
+            if state["batch"] is not None:
+                return
+            if category == "GAM" and not shutil.which("gam"):
+                summary.config(text="gam isn't on PATH — export a CSV and run it with gam csv.")
+                return
+            rows = _parse()
+            if not rows:
+                summary.config(text="Nothing to run.")
                 return
-            cat, cmd = recent[sel[0]]
-            desc = cmd["description"]
+            try:
+                workers, retries = max(1, workers_var.get()), max(0, retries_var.get())
+            except tk.TclError:
+                workers, retries = self.BATCH_WORKERS, 1
+            state["runner"] = CommandRunner(self.root, max_workers=workers)
+            state["batch"] = BatchRun(state["runner"], rows, _target, _on_row, _on_finish,
+                                      retries=retries, timeout=powershell_timeout(),
+                                      pool=pool if category != "GAM" else None)
+            state["batch"].start()
+
+        def _cancel():
+            if state["batch"] is not None:
+                state["batch"].cancel()
+
+        def _export():
+            from tkinter import filedialog
+            rows = [r for r in _parse() if not r.error]
+            if not rows:
+                summary.config(text="Nothing to export.")
+                return
+            path = filedialog.asksaveasfilename(
+                parent=win, title="Export batch CSV", defaultextension=".csv",
+                filetypes=[("CSV", "*.csv"), ("All files", "*.*")])
+            if not path:
+                return
+            try:
+                write_batch_csv(path, template, rows)
+            except OSError as exc:
+                messagebox.showerror("Export Error", str(exc), parent=win)
+                return
+            if category == "GAM":
+                line = gam_csv_command(template, path)
+                self.root.clipboard_clear()
+                self.root.clipboard_append(line)
+                summary.config(text="⇩ Exported — gam csv command copied to clipboard.")
+            else:
+                summary.config(text=f"⇩ Exported {len(rows)} rows.")
+
+        def _close():
+            _cancel()
+            if state["runner"] is not None:
+                state["runner"].shutdown()
             win.destroy()
-            tab_map = {"GAM": 0, "AD": 1, "PowerShell": 2}
-            if cat in tab_map:
-                self.notebook.select(tab_map[cat])
-            frame = self._frame_for(cat)
-            if frame:
-                frame.description_combobox.set(desc)
-                self.update_command_display(None, cat, frame)
-        lb.bind("<Double-Button-1>", _navigate)
-        lb.bind("<Return>", _navigate)
-        btn_row = tk.Frame(win, bg=C["bg"])
-        btn_row.pack(pady=(0, 14))
-        ttk.Button(btn_row, text="↗ Go to Selected",
-                   command=_navigate, style="P.TButton").pack(side=tk.LEFT, padx=(0, 8))
-        ttk.Button(btn_row, text="Close",
-                   command=win.destroy, style="Gh.TButton").pack(side=tk.LEFT)
+
+        pool = self._powershell_pool() if category != "GAM" else None
+        btn_row = paint(tk.Frame(win), bg="bg")
+        btn_row.pack(pady=10)
+        for label, style, cmd_fn in (("▶ Run", "G", _run), ("⊗ Cancel", "R", _cancel),
+                                     ("⇩ Export CSV…", "P", _export), ("Close", "Gh", _close)):
+            ttk.Button(btn_row, text=label, command=cmd_fn,
+                       style=f"{style}.TButton").pack(side=tk.LEFT, padx=(0, 8))
+        win.protocol("WM_DELETE_WINDOW", _close)
+        input_text.focus_set()
 
     def _show_list_window(self, title, items):
         C = self.C
@@ -724,95 +1249,68 @@ class CommandManager:
             return
         if category not in self.commands:
             self.commands[category] = []
-        for cmd in self.commands[category]:
-            if cmd["command"] == command and cmd["description"] == description:
-                messagebox.showerror("Error", "Duplicate command.")
-                return
-        self.commands[category].append({
-            "command":     command,
-            "description": description,
-            "category":    category,
-            "favorite":    False,
-            "last_used":   None,
-            "use_count":   0,
-        })
-        self.save_commands()
+        if self._index.find(category, command, description) is not None:
+            messagebox.showerror("Error", "Duplicate command.")
+            return
+        self._insert(category, Command(command, description, category))
         self.update_description_options(category)
         self._update_tab_titles()
         self.set_status(f"✔ Added to {category}.")
 
     def remove_command(self, category, frame):
-        sel = frame.description_combobox.get()
-        if not sel:
+        cmd = frame.picker.selected
+        if cmd is None:
             self.set_status("No command selected.")
             return
+        sel = cmd.description
         if not messagebox.askyesno("Confirm", f"Remove  '{sel}'  from {category}?"):
             return
-        for i, cmd in enumerate(self.commands.get(category, [])):
-            if cmd["description"] == sel:
-                del self.commands[category][i]
-                self.save_commands()
-                self.update_description_options(category)
-                self._update_tab_titles()
-                self._clear_output(frame.text_area)
-                self.set_status(f"⌫ Removed '{sel}'.")
-                return
-
-    def update_command_display(self, event, category, frame):
+        self._delete(category, cmd)
+        self.update_description_options(category)
+        self._update_tab_titles()
+        self._clear_output(frame.text_area)
+        self.set_status(f"⌫ Removed '{sel}'.")
+
+    def _insert(self, category, entry):
+        self.commands.setdefault(category, []).append(entry)
+        self._index.add(category, entry)
+        self._search.add(category, entry)
+        self._ranker.add(category, entry)
+        self._persist("add", category, entry)
+
+    def _delete(self, category, entry):
+        entries = self.commands[category]
+        del entries[next(i for i, c in enumerate(entries) if c is entry)]
+        self._index.remove(category, entry)
+        self._search.remove(category, entry)
+        self._views.remove(category, entry)
+        self._ranker.remove(category, entry)
+        self._persist("remove", category, entry)
+
+    def update_command_display(self, event, category, frame, count_use=True):
         if category not in self.commands:
             return
-        sel = frame.description_combobox.get()
-        template = next((c["command"] for c in self.commands[category]
-                         if c["description"] == sel), None)
-        if not template:
+        cmd = frame.picker.selected
+        if cmd is None or not cmd.command:
             return
+        template = cmd.command
 
-        for cmd in self.commands[category]:
-            if cmd["description"] == sel:
-                cmd["last_used"] = datetime.now().isoformat()
-                cmd["use_count"] = cmd.get("use_count", 0) + 1
-                cmd.setdefault("category", category)
-                break
-        self.save_commands()
-        self._update_fav_icon(category, frame)
-
-        for w in frame.input_frame.winfo_children():
-            w.destroy()
-        frame.input_widgets = {}
-
-        placeholders = re.findall(r"<([^>]+)>", template)
-        C = self.C
-        for ph in placeholders:
-            row = tk.Frame(frame.input_frame, bg=C["surface"])
-            row.pack(fill=tk.X, pady=2)
-            tk.Label(row, text=f"‹{ph}›",
-                     font=("Segoe UI", 9), fg=C["muted"],
-                     bg=C["surface"], width=18, anchor=tk.W).pack(side=tk.LEFT)
-            entry = tk.Entry(row, bg=C["surface2"], fg=C["text"],
-                             insertbackground=C["primary"], relief="flat",
-                             font=("Consolas", 10),
-                             highlightthickness=1,
-                             highlightbackground=C["border"],
-                             highlightcolor=C["primary"])
-            entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            entry.bind("<KeyRelease>",
-                       lambda e, cat=category, fr=frame: self.display_constructed_command(cat, fr))
-            frame.input_widgets[ph] = entry
+        if count_use:
+            cmd.mark_used(now_us())
+            self._ranker.used(category, cmd)
+            self._persist("used", category, cmd)
+        frame.fav_btn.config(text="★" if cmd.favorite else "☆")
 
+        frame.placeholders.show(compile_template(template).names)
         self.display_constructed_command(category, frame)
 
     def display_constructed_command(self, category, frame):
         if category not in self.commands:
             return
-        sel = frame.description_combobox.get()
-        template = next((c["command"] for c in self.commands[category]
-                         if c["description"] == sel), None)
-        if not template:
+        cmd = frame.picker.selected
+        if cmd is None or not cmd.command:
             return
-        result = template
-        for ph, widget in frame.input_widgets.items():
-            val = widget.get() or f"<{ph}>"
-            result = result.replace(f"<{ph}>", val)
+        result = compile_template(cmd.command).render(frame.placeholders.values())
         frame.text_area.config(state=tk.NORMAL)
         frame.text_area.delete("1.0", tk.END)
         frame.text_area.insert(tk.END, result)
@@ -822,10 +1320,7 @@ class CommandManager:
         frame = self._frame_for(category)
         if not frame:
             return
-        descs = [""] + [c["description"] for c in self.commands.get(category, [])
-                        if c["description"]]
-        frame.description_combobox["values"] = descs
-        frame.description_combobox.current(0)
+        frame.picker.set_rows(self._ranker.rows(category))
 
     # =========================================================================
     # COPY / EXECUTE / CLEAR
@@ -837,13 +1332,11 @@ class CommandManager:
         self.root.clipboard_clear()
         self.root.clipboard_append(text.strip())
         if category and frame:
-            sel = frame.description_combobox.get()
-            for cmd in self.commands.get(category, []):
-                if cmd["description"] == sel:
-                    cmd["copied_at"] = datetime.now().isoformat()
-                    cmd.setdefault("category", category)
-                    self.save_commands()
-                    break
+            cmd = frame.picker.selected
+            if cmd is not None:
+                cmd.mark_copied(now_us())
+                self._views.copied(category, cmd)
+                self._persist("copied", category, cmd)
         self.set_status("⎘ Copied to clipboard.")
 
     def execute_command(self, category, command, frame):
@@ -854,34 +1347,81 @@ class CommandManager:
         if category in ("PowerShell", "AD"):
             self._run_powershell(command, frame)
         elif category == "GAM":
-            webbrowser.open("https://shell.cloud.google.com/")
+            _open_url("https://shell.cloud.google.com/")
             self._append_output(frame.text_area,
                                 "↗ Google Cloud Shell opened — command is on your clipboard.")
             self.set_status("↗ Cloud Shell opened.")
 
     def _run_powershell(self, command, frame):
+        pool = self._powershell_pool()
+        run = self._runner.start(
+            command_target("PowerShell", command, pool), timeout=powershell_timeout(), pool=pool,
+            on_output=lambda r, lines: self._show_run_output(frame, r, lines),
+            on_done=lambda r: self._finish_run(frame, r))
+        frame.runs.add(run)
         self._append_output(frame.text_area,
-                            f"▶ Running…\n{command}\n{'─' * 56}\n")
+                            f"▶ Running #{run.id}…\n{command}\n{'─' * 56}\n")
+        self.set_status(f"▶ Running #{run.id}…")
+
+    def _powershell_pool(self):
+        """The shared pool of warm PowerShell hosts, or None when disabled."""
+        if self._ps_pool is None:
+            self._ps_pool = powershell_pool()
+        return self._ps_pool
+
+    def _on_tab_changed(self, event=None):
         try:
-            proc = subprocess.Popen(
-                ["powershell.exe", "-NoProfile", "-NonInteractive", "-Command", command],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = proc.communicate(timeout=60)
-            stdout = out.decode("utf-8", errors="replace").strip()
-            stderr = err.decode("utf-8", errors="replace").strip()
-            if proc.returncode == 0:
-                self._append_output(frame.text_area, stdout or "✔ Completed.")
-                self.set_status("✔ Executed successfully.")
-            else:
-                self._append_output(frame.text_area,
-                                    f"✖ Exit {proc.returncode}\n{stderr or stdout}")
-                self.set_status(f"✖ Error (exit {proc.returncode}).")
-        except subprocess.TimeoutExpired:
-            self._append_output(frame.text_area, "✖ Timed out after 60 s.")
-            self.set_status("✖ Command timed out.")
-        except Exception as exc:
-            self._append_output(frame.text_area, f"✖ {exc}")
-            self.set_status(f"✖ {exc}")
+            tab = self.notebook.index(self.notebook.select())
+        except tk.TclError:
+            return
+        self._ensure_tab(list(self._tabs)[tab])
+        # warm a PowerShell host (and its AD module) before it is needed
+        if tab in (1, 2):
+            pool = self._powershell_pool()
+            if pool is not None:
+                pool.prewarm()
+
+    def _run_prefix(self, frame, run):
+        # only tag lines with the run id while several runs share the tab
+        return f"[#{run.id}] " if len(frame.runs) > 1 else ""
+
+    def _show_run_output(self, frame, run, lines):
+        text_area = frame.text_area
+        if not text_area.winfo_exists():
+            return
+        prefix = self._run_prefix(frame, run)
+        text_area.config(state=tk.NORMAL)
+        for stream, line in lines:
+            text_area.insert(tk.END, prefix + line + "\n",
+                             ("stderr",) if stream == "stderr" else ())
+        text_area.see(tk.END)
+        text_area.config(state=tk.DISABLED)
+
+    def _finish_run(self, frame, run):
+        prefix = self._run_prefix(frame, run)
+        frame.runs.discard(run)
+        if run.error:
+            msg = status = f"✖ {run.error}"
+        elif run.timed_out:
+            msg, status = f"✖ Timed out after {run.timeout:g} s.", "✖ Command timed out."
+        elif run.cancelled:
+            msg, status = "⊘ Cancelled.", "⊘ Command cancelled."
+        elif run.returncode == 0:
+            msg, status = "✔ Completed.", "✔ Executed successfully."
+        else:
+            msg = f"✖ Exit {run.returncode}"
+            status = f"✖ Error (exit {run.returncode})."
+        if frame.text_area.winfo_exists():
+            self._append_output(frame.text_area, prefix + msg)
+        self.set_status(status)
+
+    def _cancel_runs(self, frame):
+        if not frame.runs:
+            self.set_status("Nothing running.")
+            return
+        for run in list(frame.runs):
+            self._runner.cancel(run)
+        self.set_status("⊘ Cancelling…")
 
     def _append_output(self, text_area, text):
         text_area.config(state=tk.NORMAL)
@@ -898,63 +1438,182 @@ class CommandManager:
     # PERSISTENCE
     # =========================================================================
     def _get_data_file_path(self, filename):
-        if getattr(sys, "frozen", False):
-            # EXE directory — writable, persists between runs
-            exe_dir = os.path.dirname(sys.executable)
-            dest = os.path.join(exe_dir, filename)
-            # First run: extract bundled file from the PyInstaller temp dir
-            if not os.path.exists(dest):
-                import shutil
-                src = os.path.join(sys._MEIPASS, filename)
-                if os.path.exists(src):
-                    shutil.copy2(src, dest)
-            return dest
-        return os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+        return data_file_path(filename)
 
     def load_all_commands(self):
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, "r", encoding="utf-8") as f:
-                    self.commands = json.load(f)
-                self._remove_duplicates()
-                self.set_status("✔ Commands loaded.")
-            else:
-                self.commands = {"GAM": [], "AD": [], "PowerShell": []}
-                self.set_status("No data file — starting fresh.")
-        except Exception as exc:
-            self.commands = {"GAM": [], "AD": [], "PowerShell": []}
-            self.set_status(f"✖ Load error: {exc}")
-
+        if self._loading:
+            return
+        self._loading = True
+        self._store.begin_load()
+        box = {"progress": (0.0, "Loading commands…")}
+        worker = threading.Thread(target=self._load_worker, args=(box,), daemon=True)
+        worker.start()
+        self._poll_load(worker, box)
+
+    def _load_worker(self, box):
+        """Read, dedupe and index the bank off the Tk thread.
+
+        The ``LoadedBank`` lands in ``box`` and is swapped in by
+        :meth:`_finish_load`; the live ``commands`` and indexes are not
+        touched here.
+        """
+        def progress(fraction, text):
+            box["progress"] = (fraction, text)
+
+        box["result"] = load_bank(self._store, progress)
+
+    def _poll_load(self, worker, box):
+        fraction, text = box["progress"]
+        self._progress["value"] = fraction
+        if not self._progress.winfo_ismapped():
+            self._progress.pack(side=tk.RIGHT, padx=(0, 4), before=self._count_label)
+        self.status_bar.config(text=f"◌ {text}")
+        if worker.is_alive():
+            self.root.after(self.LOAD_POLL_MS, self._poll_load, worker, box)
+        else:
+            self._finish_load(box["result"])
+
+    def _finish_load(self, bank):
+        self.commands, self._index, self._search = bank.commands, bank.index, bank.search
+        self._views, self._ranker = bank.views, bank.ranker
+        self._loading = False
+        self._progress.pack_forget()
+        self._store.loaded()
+        edits, self._edits_while_loading = self._edits_while_loading, []
+        if bank.error is None:
+            # a bank that failed to load is not saved over by replayed edits
+            self._replay_edits(edits)
+        self.set_status(bank.status)
         for cat, _ in self._category_frames():
             self.update_description_options(cat)
         self._update_tab_titles()
         self._update_count_label()
 
+    def _open_store(self):
+        return open_store(self.root, self.data_file, lambda: self.commands,
+                          on_error=lambda msg: messagebox.showerror("Save Error", msg),
+                          on_external_change=self._reload_from_disk)
+
     def save_commands(self):
+        """Write the whole bank now (normal edits are saved by the store as they happen)."""
+        self._store.save()
+
+    def _import_json(self):
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(
+            title="Import commands", filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path or not messagebox.askyesno(
+                "Confirm", "Replace every command in the bank with this file?"):
+            return
+        try:
+            self._store.import_json(path)
+        except (OSError, ValueError) as exc:
+            messagebox.showerror("Import Error", str(exc))
+            return
+        self.load_all_commands()
+
+    def _export_json(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(
+            title="Export commands", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("All files", "*.*")])
+        if not path:
+            return
         try:
-            with open(self.data_file, "w", encoding="utf-8") as f:
-                json.dump(self.commands, f, indent=4, ensure_ascii=False)
-        except Exception as exc:
-            messagebox.showerror("Save Error", str(exc))
-
-    def _remove_duplicates(self):
-        for cat in self.commands:
-            seen, unique = set(), []
-            for cmd in self.commands[cat]:
-                key = (cmd.get("command", ""), cmd.get("description", ""))
-                if key not in seen:
-                    seen.add(key)
-                    unique.append(cmd)
-            self.commands[cat] = unique
-        self.save_commands()
+            self._store.flush()
+            self._store.export_json(path)
+        except (OSError, ValueError) as exc:
+            messagebox.showerror("Export Error", str(exc))
+            return
+        self.set_status(f"⇩ Exported to {os.path.basename(path)}.")
+
+    def _on_close(self):
+        self._runner.shutdown()
+        if self._ps_pool is not None:
+            self._ps_pool.shutdown()
+        self._store.close()
+        self.root.destroy()
+
+    def _persist(self, kind, category, entry):
+        """Hand an edit to the store.
+
+        While a load is running the bank on screen is about to be replaced,
+        so the edit is also kept (by command and description) for
+        :meth:`_replay_edits` to apply to the loaded bank, and the store —
+        whose journal the loader is reading — is told about it then.  Edits
+        the store has yet to write are kept the same way, for a reload
+        forced by :meth:`_watch_disk`.
+        """
+        value = {"favorite": entry.favorite, "used": entry.last_used,
+                 "copied": entry.copied_at}.get(kind)
+        edit = (kind, category, entry.command, entry.description, value)
+        if self._loading:
+            self._edits_while_loading.append(edit)
+        elif kind == "add":
+            self._unsaved_edits.append(edit)
+            self._store.added(category, entry)
+        elif kind == "remove":
+            self._unsaved_edits.append(edit)
+            self._store.removed(category, entry)
+        elif kind == "favorite":
+            self._unsaved_edits.append(edit)
+            self._store.updated(category, entry)
+        else:
+            self._search.touch(entry)
+            self._store.used(category, entry)
+
+    def _watch_disk(self):
+        """Reload the bank when another process (the server) saved it.
+
+        The store also checks just before each debounced save, so an edit
+        made between two polls is not written over the other process's save.
+        """
+        if not self._loading:
+            if not self._store.pending:
+                self._unsaved_edits.clear()
+            if self._store.changed_on_disk():
+                self._reload_from_disk()
+        self.root.after(self.DISK_POLL_MS, self._watch_disk)
+
+    def _reload_from_disk(self):
+        """Drop the store's unwritten edits, reload, and replay them onto the new bank."""
+        if self._loading:
+            return
+        self._edits_while_loading, self._unsaved_edits = self._unsaved_edits, []
+        self._store.discard_pending()
+        self.load_all_commands()
+
+    def _replay_edits(self, edits):
+        """Apply edits made during a load to the bank it returned."""
+        for kind, category, command, description, value in edits:
+            entry = self._index.find(category, command, description)
+            if kind == "add":
+                if entry is None:
+                    self._insert(category, Command(command, description, category))
+            elif entry is None:
+                continue          # not in the loaded bank
+            elif kind == "remove":
+                self._delete(category, entry)
+            elif kind == "favorite":
+                entry.set_favorite(value)
+                self._views.favorite_changed(category, entry)
+                self._search.touch(entry)
+                self._persist(kind, category, entry)
+            elif kind == "used":
+                entry.mark_used(value)
+                self._ranker.used(category, entry)
+                self._persist(kind, category, entry)
+            else:
+                entry.mark_copied(value)
+                self._views.copied(category, entry)
+                self._persist(kind, category, entry)
 
     # =========================================================================
     # HELPERS
     # =========================================================================
     def _frame_for(self, category):
-        return {"GAM":        self.gam_frame,
-                "AD":         self.ad_frame,
-                "PowerShell": self.powershell_frame}.get(category)
+        # None until the tab has been built; _ensure_tab builds it on demand
+        return self._tabs.get(category) if category in self._built else None
 
     def _update_tab_titles(self):
         labels = [
@@ -983,34 +1642,12 @@ class CommandManager:
     def _toggle_theme(self):
         self._is_dark = not self._is_dark
         self.C = dict(self.DARK if self._is_dark else self.LIGHT)
-        self._rebuild_ui()
+        # recolor in place: ttk styles first, then every registered widget
+        self._configure_style()
+        self._theme.apply(self.C)
         mode = "Dark" if self._is_dark else "Light"
         self.set_status(f"{'☽' if self._is_dark else '☀'} Switched to {mode} mode.")
 
-    def _rebuild_ui(self):
-        if self._status_job:
-            self.root.after_cancel(self._status_job)
-            self._status_job = None
-        try:
-            saved_tab = self.notebook.index(self.notebook.select())
-        except Exception:
-            saved_tab = 0
-        for w in self.root.winfo_children():
-            w.destroy()
-        self._add_visible = {}
-        self.root.configure(bg=self.C["bg"])
-        self._configure_style()
-        self._create_menu()
-        self._create_widgets()
-        for cat, _ in self._category_frames():
-            self.update_description_options(cat)
-        self._update_tab_titles()
-        self._update_count_label()
-        try:
-            self.notebook.select(saved_tab)
-        except Exception:
-            pass
-
     def _show_about(self):
         C = self.C
         win = tk.Toplevel(self.root)
@@ -1,22 +1,45 @@
 'use strict';
 
+// `python -m command_bank serve` shares the desktop app's bank over HTTP.
+// Tab keys here are lower-case; the desktop bank names its categories.
+const SERVER_CATEGORY = { gam: 'GAM', ad: 'AD', powershell: 'PowerShell' };
+const WEB_CATEGORY = { GAM: 'gam', AD: 'ad', PowerShell: 'powershell' };
+const SYNC_INTERVAL_MS = 5000;
+
 class CommandBankApp {
     constructor() {
         this.commands = { gam: [], ad: [], powershell: [] };
         this.theme = localStorage.getItem('cbTheme') || 'dark';
         this.addPanelOpen = { gam: false, ad: false, powershell: false };
         this.searchQuery = '';
+        this.search = new CommandSearchIndex();
+        this._matches = { gam: null, ad: null, powershell: null };   // last { query, rows } per tab
+        this._options = { gam: new Map(), ad: new Map(), powershell: new Map() };
+        this._searchJob = 0;
+        this._searchQueue = [];
         this._statusTimer = null;
+        const param = new URLSearchParams(location.search).get('server');
+        if (param) localStorage.setItem('cbServer', param);
+        this.serverUrl = localStorage.getItem('cbServer') || 'http://127.0.0.1:8765/api/';
+        this.syncTag = localStorage.getItem('gamCommandBank_sync') || '';
+        this.pendingEdits = this.readPendingEdits();   // id -> edits made while offline
+        this.online = false;
+        this._syncing = false;
+        this.store = null;
         this.init();
     }
 
     init() {
-        this.loadCommands();
         this.applyTheme();
-        this.populateSelects();
-        this.updateCounts();
         this.bindEvents();
-        this.setStatus('● Ready');
+        this.setStatus('… Loading commands', 60000);
+        this.loadCommands()
+            .then(() => {
+                this.setStatus('● Ready');
+                this.indexWhenIdle();
+                this.startSync();
+            })
+            .catch(err => this.setStatus(`✖ Could not load commands: ${err && err.message || err}`, 10000));
     }
 
     // ── Theme ──────────────────────────────────────────────────────────────
@@ -43,7 +66,7 @@ class CommandBankApp {
         const searchInput = document.getElementById('searchInput');
         searchInput.addEventListener('input', () => {
             this.searchQuery = searchInput.value.trim().toLowerCase();
-            this.onSearch();
+            this.scheduleSearch();
         });
         document.getElementById('searchClear').addEventListener('click', () => {
             searchInput.value = '';
@@ -70,47 +93,86 @@ class CommandBankApp {
     }
 
     // ── Search ─────────────────────────────────────────────────────────────
+    // Typing only queues the work; it runs when the browser is idle, the
+    // open tab first, and each tab's options are diffed rather than rebuilt.
+    scheduleSearch() {
+        cancelIdle(this._searchJob);
+        const active = document.querySelector('.tab-btn.active').dataset.tab;
+        this._searchQueue = [active, ...Object.keys(this.commands).filter(cat => cat !== active)];
+        this._searchJob = whenIdle(deadline => {
+            this._searchJob = 0;
+            do {
+                this.showMatches(this._searchQueue.shift());
+            } while (this._searchQueue.length && deadline.timeRemaining() > 4);
+            if (this._searchQueue.length) this.scheduleSearch();
+        });
+    }
+
     onSearch() {
+        cancelIdle(this._searchJob);
+        this._searchQueue = [];
+        ['gam', 'ad', 'powershell'].forEach(cat => this.showMatches(cat));
+    }
+
+    matchesFor(cat) {
         const q = this.searchQuery;
-        ['gam', 'ad', 'powershell'].forEach(cat => {
-            const select = document.getElementById(`${cat}-select`);
-            const filtered = q
-                ? this.commands[cat].filter(c =>
-                    c.command.toLowerCase().includes(q) ||
-                    c.description.toLowerCase().includes(q))
-                : this.commands[cat];
-
-            select.innerHTML = '<option value="">Choose a command…</option>';
-            filtered.forEach(cmd => {
-                const realIdx = this.commands[cat].indexOf(cmd);
-                const opt = document.createElement('option');
-                opt.value = realIdx;
-                opt.textContent = cmd.description + (cmd.favorite ? ' ★' : '');
-                select.appendChild(opt);
-            });
+        const list = this.commands[cat];
+        if (!q) return list.map((cmd, i) => [i, cmd]);
+        const last = this._matches[cat];
+        if (last && last.query === q) return last.rows;
+        const rows = this.search.filter(list, q, last && q.includes(last.query) ? last.rows : null);
+        this._matches[cat] = { query: q, rows };
+        return rows;
+    }
 
+    showMatches(cat) {
+        const select = document.getElementById(`${cat}-select`);
+        const before = select.value;
+        syncOptions(select, this.matchesFor(cat), this._options[cat],
+            cmd => cmd.description + (cmd.favorite ? ' ★' : ''));
+        if (select.value !== before) {
             document.getElementById(`${cat}-output`).value = '';
             document.getElementById(`${cat}-params`).innerHTML = '';
             document.getElementById(`${cat}-fav`).textContent = '☆';
-        });
+        }
     }
 
     // ── Populate ───────────────────────────────────────────────────────────
     populateSelects() {
-        ['gam', 'ad', 'powershell'].forEach(cat => {
-            const select = document.getElementById(`${cat}-select`);
-            const current = select.value;
-            select.innerHTML = '<option value="">Choose a command…</option>';
-            this.commands[cat].forEach((cmd, i) => {
-                const opt = document.createElement('option');
-                opt.value = i;
-                opt.textContent = cmd.description + (cmd.favorite ? ' ★' : '');
-                select.appendChild(opt);
-            });
-            if (current !== '') select.value = current;
+        ['gam', 'ad', 'powershell'].forEach(cat => this.populateSelect(cat));
+    }
+
+    // after the tab's commands changed: matches are recomputed, options diffed
+    populateSelect(cat) {
+        this._matches[cat] = null;
+        const select = document.getElementById(`${cat}-select`);
+        syncOptions(select, this.matchesFor(cat), this._options[cat],
+            cmd => cmd.description + (cmd.favorite ? ' ★' : ''));
+    }
+
+    // the whole bank was replaced (defaults, a server reset)
+    reindex() {
+        this.search.clear();
+        Object.keys(this.commands).forEach(cat => {
+            this.search.addAll(this.commands[cat]);
+            this._options[cat] = new Map();
+        });
+    }
+
+    // build the search index in idle time, before the first keystroke needs it
+    indexWhenIdle() {
+        whenIdle(deadline => {
+            if (!this.search.build(deadline)) this.indexWhenIdle();
         });
     }
 
+    // a command left the bank
+    forget(cat, cmd) {
+        this.store.remove(cmd);
+        this.search.remove(cmd);
+        this._options[cat].delete(cmd);
+    }
+
     updateCounts() {
         document.getElementById('gam-count').textContent = `(${this.commands.gam.length})`;
         document.getElementById('ad-count').textContent = `(${this.commands.ad.length})`;
@@ -145,7 +207,8 @@ class CommandBankApp {
 
         cmd.last_used = new Date().toISOString();
         cmd.use_count = (cmd.use_count || 0) + 1;
-        this.saveCommands();
+        this.store.put(cat, cmd);
+        this.mirror(cat, cmd, '/use', 'POST', {});
 
         const placeholders = this.extractPlaceholders(cmd.command);
         placeholders.forEach(ph => {
@@ -205,11 +268,14 @@ class CommandBankApp {
             c.command === command && c.description === description);
         if (isDupe) { this.setStatus('✖ Duplicate command.'); return; }
 
-        this.commands[cat].push({
+        const entry = {
             command, description,
             favorite: false, last_used: null, use_count: 0
-        });
-        this.saveCommands();
+        };
+        this.commands[cat].push(entry);
+        this.search.add(entry);
+        this.store.put(cat, entry);
+        this.pushLocal([[cat, entry]]);
         this.populateSelects();
         this.updateCounts();
 
@@ -230,7 +296,8 @@ class CommandBankApp {
         if (!confirm(`Remove "${cmd.description}"?`)) return;
 
         this.commands[cat].splice(idx, 1);
-        this.saveCommands();
+        this.forget(cat, cmd);
+        this.mirror(cat, cmd, '', 'DELETE');
         this.populateSelects();
         this.updateCounts();
         document.getElementById(`${cat}-output`).value = '';
@@ -249,7 +316,8 @@ class CommandBankApp {
 
         cmd.favorite = !cmd.favorite;
         document.getElementById(`${cat}-fav`).textContent = cmd.favorite ? '★' : '☆';
-        this.saveCommands();
+        this.store.put(cat, cmd);
+        this.mirror(cat, cmd, '', 'PATCH', { favorite: cmd.favorite });
         this.populateSelects();
         select.value = idx;
         this.setStatus(`${cmd.favorite ? '★ Added to' : 'Removed from'} favorites: "${cmd.description}"`);
@@ -262,9 +330,11 @@ class CommandBankApp {
 
         const select = document.getElementById(`${cat}-select`);
         const idx = select.value;
-        if (idx !== '' && this.commands[cat][idx]) {
-            this.commands[cat][idx].copied_at = new Date().toISOString();
-            this.saveCommands();
+        const cmd = idx !== '' ? this.commands[cat][idx] : null;
+        if (cmd) {
+            cmd.copied_at = new Date().toISOString();
+            this.store.put(cat, cmd);
+            this.mirror(cat, cmd, '/copy', 'POST', {});
         }
 
         navigator.clipboard.writeText(text).then(() => {
@@ -301,12 +371,43 @@ class CommandBankApp {
     }
 
     // ── Persistence ────────────────────────────────────────────────────────
-    loadCommands() {
-        const saved = localStorage.getItem('gamCommandBank_v3');
-        if (saved) {
-            try { this.commands = JSON.parse(saved); return; } catch {}
+    // IndexedDB (see store.js), moving an existing LocalStorage bank over on
+    // first run.  The open tab is read and shown first, the others follow.
+    // If the move fails the page keeps saving to LocalStorage and tries
+    // again next time.
+    async loadCommands() {
+        try {
+            this.store = await IdbCommandStore.open();
+        } catch {
+            this.useLocalStore();
+        }
+        this.store.onError = err => this.setStatus(`✖ Could not save: ${err && err.message || err}`, 10000);
+        const active = document.querySelector('.tab-btn.active').dataset.tab;
+        const order = [active, ...Object.keys(this.commands).filter(cat => cat !== active)];
+        let found;
+        try {
+            found = await this.store.load(order, (cat, list) => {
+                this.commands[cat] = list;
+                this.search.addAll(list);
+                this.populateSelect(cat);
+                this.updateCounts();
+            });
+        } catch (err) {
+            if (!(err instanceof MigrationError)) throw err;
+            this.useLocalStore();
+            this.setStatus(`✖ ${err.message} — still saving to LocalStorage.`, 10000);
+            return;
+        }
+        if (!found) {
+            this.syncTag = '';     // nothing here for a delta to apply to
+            localStorage.removeItem('gamCommandBank_sync');
+            this.loadDefaults();
         }
-        this.loadDefaults();
+    }
+
+    useLocalStore() {
+        this.store = new LocalCommandStore(() => this.commands);
+        this.store.onError = err => this.setStatus(`✖ Could not save: ${err && err.message || err}`, 10000);
     }
 
     loadDefaults() {
@@ -352,11 +453,224 @@ class CommandBankApp {
                 { command: "$PSVersionTable.PSVersion", description: "Show PowerShell version", favorite: false, use_count: 0, last_used: null },
             ]
         };
-        this.saveCommands();
+        // demo data for an empty browser: never uploaded, the server's bank replaces it
+        Object.values(this.commands).forEach(list => list.forEach(c => { c.seed = true; }));
+        this.store.replaceAll(this.commands);
+        this.reindex();
+        this.populateSelects();
+        this.updateCounts();
+    }
+
+    // ── Local server sync ──────────────────────────────────────────────────
+    // When the server answers, its bank replaces the local copy once; after
+    // that only `/api/changes` since the last version seen is fetched.  The
+    // server sends ETags with `Cache-Control: no-cache`, so the browser
+    // revalidates and an unchanged answer is a bodiless 304.  Edits to synced
+    // commands that could not reach the server are queued and sent before
+    // the next sync reads the server's bank, so adopting it keeps them.
+    // Without a server the bank lives only in this browser, as before.
+    startSync() {
+        if (this.serverUrl === 'off') return;
+        this.syncWithServer();
+        setInterval(() => {
+            if (document.visibilityState === 'visible') this.syncWithServer();
+        }, SYNC_INTERVAL_MS);
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'visible') this.syncWithServer();
+        });
+    }
+
+    async api(path, method = 'GET', body) {
+        const ctl = new AbortController();
+        const timer = setTimeout(() => ctl.abort(), 3000);
+        try {
+            return await fetch(this.serverUrl + path, {
+                method,
+                signal: ctl.signal,
+                headers: body === undefined ? {} : { 'Content-Type': 'application/json' },
+                body: body === undefined ? undefined : JSON.stringify(body)
+            });
+        } catch {
+            this.online = false;
+            return null;
+        } finally {
+            clearTimeout(timer);
+        }
     }
 
-    saveCommands() {
-        localStorage.setItem('gamCommandBank_v3', JSON.stringify(this.commands));
+    async syncWithServer() {
+        if (this._syncing) return;
+        this._syncing = true;
+        try {
+            if (!await this.pushEdits()) return;
+            const res = await this.api(`changes?since=${encodeURIComponent(this.syncTag)}`);
+            if (!res || !res.ok) return;
+            const delta = await res.json();
+            const wasOnline = this.online;
+            this.online = true;
+            const localOnly = this.localOnlyEntries();
+            if (delta.reset) {
+                this.adoptServerBank(delta.changed);
+            } else if (delta.changed.length || delta.removed.length) {
+                this.applyDelta(delta);
+            }
+            this.syncTag = delta.since;
+            localStorage.setItem('gamCommandBank_sync', this.syncTag);
+            if (delta.reset || delta.changed.length || delta.removed.length) this.refreshFromSync();
+            await this.pushLocal(localOnly);
+            if (!wasOnline) this.setStatus('⇄ Synced with the local command bank server.');
+        } catch {
+            this.online = false;
+        } finally {
+            this._syncing = false;
+        }
+    }
+
+    adoptServerBank(items) {
+        this.commands = { gam: [], ad: [], powershell: [] };
+        items.forEach(item => {
+            const cat = WEB_CATEGORY[item.category];
+            if (cat) this.commands[cat].push(item);
+        });
+        this.store.replaceAll(this.commands);
+        this.reindex();
+    }
+
+    applyDelta(delta) {
+        const removed = new Set(delta.removed);
+        const byId = new Map();
+        Object.keys(this.commands).forEach(cat => {
+            if (removed.size) {
+                this.commands[cat] = this.commands[cat].filter(c => {
+                    if (!removed.has(c.id)) return true;
+                    this.forget(cat, c);
+                    return false;
+                });
+            }
+            this.commands[cat].forEach(c => { if (c.id) byId.set(c.id, c); });
+        });
+        delta.changed.forEach(item => {
+            const cmd = byId.get(item.id);
+            const cat = WEB_CATEGORY[item.category];
+            if (!cat) return;
+            if (cmd) Object.assign(cmd, item);
+            else {
+                this.commands[cat].push(item);
+                this.search.add(item);
+            }
+            this.store.put(cat, cmd || item);
+        });
+    }
+
+    refreshFromSync() {
+        this.populateSelects();
+        this.updateCounts();
+    }
+
+    // commands added here while the server was unreachable (not the seeded defaults)
+    localOnlyEntries() {
+        const entries = [];
+        Object.keys(this.commands).forEach(cat => {
+            this.commands[cat].forEach(c => { if (!c.id && !c.seed) entries.push([cat, c]); });
+        });
+        return entries;
+    }
+
+    async pushLocal(entries) {
+        if (!this.online) return;
+        for (const [cat, cmd] of entries) {
+            const list = this.commands[cat];
+            const twin = list.find(c => c !== cmd && c.id &&
+                c.command === cmd.command && c.description === cmd.description);
+            if (twin) {
+                if (list.includes(cmd)) list.splice(list.indexOf(cmd), 1);
+                this.forget(cat, cmd);
+                continue;
+            }
+            if (!list.includes(cmd)) list.push(cmd);
+            this.search.add(cmd);
+            const res = await this.api('commands', 'POST', {
+                category: SERVER_CATEGORY[cat], command: cmd.command, description: cmd.description
+            });
+            if (res && res.status === 201) {
+                // the server starts it unused; send what happened to it here
+                const { favorite, use_count: uses } = cmd;
+                Object.assign(cmd, await res.json());
+                if (favorite) this.queueEdit(cmd.id, '', { favorite });
+                for (let i = 0; i < (uses || 0); i++) this.queueEdit(cmd.id, '/use');
+            }
+            this.store.put(cat, cmd);
+        }
+        if (entries.length) {
+            this.refreshFromSync();
+            await this.pushEdits();
+        }
+    }
+
+    // mirror an edit of a synced command to the server, or queue it
+    async mirror(cat, cmd, action, method, body) {
+        if (!cmd.id) return;
+        const res = this.online ? await this.api(`commands/${cmd.id}${action}`, method, body) : null;
+        if (!res) {
+            this.queueEdit(cmd.id, action, body);
+        } else if (res.status === 200) {
+            Object.assign(cmd, await res.json());
+            if (this.commands[cat].includes(cmd)) this.store.put(cat, cmd);
+        }
+    }
+
+    readPendingEdits() {
+        try {
+            return JSON.parse(localStorage.getItem('gamCommandBank_pending')) || {};
+        } catch {
+            return {};
+        }
+    }
+
+    savePendingEdits() {
+        if (Object.keys(this.pendingEdits).length) {
+            localStorage.setItem('gamCommandBank_pending', JSON.stringify(this.pendingEdits));
+        } else {
+            localStorage.removeItem('gamCommandBank_pending');
+        }
+    }
+
+    // folded per command: the last favorite flag, a count of uses, whether
+    // it was copied, or that it was removed
+    queueEdit(id, action, body) {
+        const edit = this.pendingEdits[id] || (this.pendingEdits[id] = {});
+        if (action === '/use') edit.uses = (edit.uses || 0) + 1;
+        else if (action === '/copy') edit.copied = true;
+        else if (body) edit.favorite = body.favorite;
+        else edit.removed = true;
+        this.savePendingEdits();
+    }
+
+    // send queued edits; false if the server stopped answering part way
+    async pushEdits() {
+        for (const id of Object.keys(this.pendingEdits)) {
+            const edit = this.pendingEdits[id];
+            const send = (action, method, body) => this.api(`commands/${id}${action}`, method, body);
+            // a command the server no longer has answers 404: nothing left to send
+            if (edit.removed) {
+                if (!await send('', 'DELETE')) return false;
+            } else {
+                if (edit.favorite !== undefined) {
+                    if (!await send('', 'PATCH', { favorite: edit.favorite })) return false;
+                    delete edit.favorite;
+                    this.savePendingEdits();
+                }
+                while (edit.uses > 0) {
+                    if (!await send('/use', 'POST', {})) return false;
+                    edit.uses--;
+                    this.savePendingEdits();
+                }
+                if (edit.copied && !await send('/copy', 'POST', {})) return false;
+            }
+            delete this.pendingEdits[id];
+            this.savePendingEdits();
+        }
+        return true;
     }
 
     // ── Status ─────────────────────────────────────────────────────────────
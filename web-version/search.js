@@ -0,0 +1,141 @@
+'use strict';
+
+// ═══════════════════════════════════════════════════════════════════════════
+//  Search for the web version
+//  A command matches when its command or description contains the query,
+//  as before.  The lowercase text of every command is built once, and a
+//  token index narrows a query to the commands holding one of its words
+//  before any text is compared.  A query that extends the previous one
+//  only re-checks the previous matches.
+// ═══════════════════════════════════════════════════════════════════════════
+
+class CommandSearchIndex {
+    constructor() {
+        this.clear();
+    }
+
+    clear() {
+        this.text = new Map();       // command object -> "command\ndescription", lowercase
+        this.tokens = new Map();     // whitespace-separated token -> [command objects]
+        this.pending = new Set();    // added but not indexed yet
+    }
+
+    // Adding only queues the command: the index is built by build(), which
+    // filter() calls and the app also runs when the browser is idle.
+    add(cmd) {
+        if (!this.text.has(cmd)) this.pending.add(cmd);
+    }
+
+    addAll(list) {
+        list.forEach(cmd => this.add(cmd));
+    }
+
+    remove(cmd) {
+        if (this.pending.delete(cmd)) return;
+        const text = this.text.get(cmd);
+        if (text === undefined) return;
+        this.text.delete(cmd);
+        for (const token of tokensOf(text)) {
+            const posting = this.tokens.get(token);
+            const i = posting ? posting.indexOf(cmd) : -1;
+            if (i < 0) continue;
+            posting.splice(i, 1);
+            if (!posting.length) this.tokens.delete(token);
+        }
+    }
+
+    // Index what was added.  With an idle callback's `deadline`, stops
+    // (returning false) once the idle time is used up.
+    build(deadline = null) {
+        let n = 0;
+        for (const cmd of this.pending) {
+            if (deadline && ++n % 256 === 0 && deadline.timeRemaining() < 1) return false;
+            this.pending.delete(cmd);
+            const text = `${cmd.command}\n${cmd.description}`.toLowerCase();
+            this.text.set(cmd, text);
+            for (const token of tokensOf(text)) {
+                const posting = this.tokens.get(token);
+                if (!posting) this.tokens.set(token, [cmd]);
+                else if (posting[posting.length - 1] !== cmd) posting.push(cmd);
+            }
+        }
+        return true;
+    }
+
+    // [[index, cmd], ...] for the entries of `list` containing `query`
+    // (lowercase), in list order.  `previous` may hold the rows of a query
+    // that `query` contains, from the same list.
+    filter(list, query, previous = null) {
+        this.build();
+        const hit = cmd => this.text.get(cmd).includes(query);
+        if (previous) return previous.filter(([, cmd]) => hit(cmd));
+        const candidates = this.candidates(query);
+        const rows = [];
+        list.forEach((cmd, i) => {
+            if ((!candidates || candidates.has(cmd)) && hit(cmd)) rows.push([i, cmd]);
+        });
+        return rows;
+    }
+
+    // Commands with a token containing the query's longest word.  Any text
+    // containing the query has such a token.  Null when scanning every text
+    // would be as quick.
+    candidates(query) {
+        const word = tokensOf(query).reduce((a, b) => (b.length > a.length ? b : a), '');
+        if (word.length < 3) return null;
+        const postings = [];
+        let total = 0;
+        this.tokens.forEach((posting, token) => {
+            if (token.includes(word)) {
+                postings.push(posting);
+                total += posting.length;
+            }
+        });
+        if (total > this.text.size / 4) return null;
+        const found = new Set();
+        postings.forEach(posting => posting.forEach(cmd => found.add(cmd)));
+        return found;
+    }
+}
+
+function tokensOf(text) {
+    return text.split(/\s+/).filter(Boolean);
+}
+
+// Brings the <option>s after the placeholder in line with `rows` (from
+// CommandSearchIndex.filter) without rebuilding the list: options are kept
+// per command in `cache`, the ones that stay are left in place, and only
+// those that appear or disappear touch the DOM.
+function syncOptions(select, rows, cache, label) {
+    const wanted = rows.map(([i, cmd]) => {
+        let opt = cache.get(cmd);
+        if (!opt) cache.set(cmd, opt = document.createElement('option'));
+        const value = String(i);
+        if (opt.value !== value) opt.value = value;
+        const text = label(cmd);
+        if (opt.textContent !== text) opt.textContent = text;
+        return opt;
+    });
+    const keep = new Set(wanted);
+    let node = select.firstElementChild.nextElementSibling;
+    for (const opt of wanted) {
+        while (node && node !== opt && !keep.has(node)) {
+            const next = node.nextElementSibling;
+            node.remove();
+            node = next;
+        }
+        if (node === opt) node = node.nextElementSibling;
+        else select.insertBefore(opt, node);
+    }
+    while (node) {
+        const next = node.nextElementSibling;
+        node.remove();
+        node = next;
+    }
+}
+
+// requestIdleCallback where there is one (not Safari), else a short timeout.
+const whenIdle = window.requestIdleCallback
+    ? fn => requestIdleCallback(fn, { timeout: 150 })
+    : fn => setTimeout(() => fn({ timeRemaining: () => 0 }), 50);
+const cancelIdle = window.cancelIdleCallback ? id => cancelIdleCallback(id) : id => clearTimeout(id);
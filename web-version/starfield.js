@@ -1,8 +1,501 @@
 /**
  * Calming Interactive Starfield Component
  * Creates a soothing starfield with mouse-responsive drift effects
+ *
+ * The page stays open all day, so the animation only runs when it shows
+ * something: it stops while the tab is hidden, drops to a few frames a
+ * second once the pointer is still and the stars have settled, draws a
+ * single still frame under prefers-reduced-motion, and thins the stars out
+ * when the machine cannot keep up.  Where OffscreenCanvas is available the
+ * whole loop runs in a worker, off the thread that serves the command UI.
  */
 
+const STARFIELD_TUNING = {
+    idleAfterMs: 3000,      // no pointer input for this long...
+    idleFps: 8,             // ...and settled stars: redraw this often
+    minFps: 40,             // below this for two seconds at full speed: fewer stars
+    minStarFraction: 0.3,   // never thin out below this share of starCount
+    sizeBuckets: 12,        // sprite sizes per color
+    alphaLevels: 32         // pre-faded copies of each sprite, for the twinkle
+};
+
+/**
+ * Star simulation, drawing and frame scheduling.  Self-contained (no DOM
+ * access) so the same class runs on the page or inside the worker.
+ */
+class StarfieldEngine {
+    constructor(config, ctx, onStats = () => {}) {
+        this.config = config;
+        this.ctx = ctx;
+        this.onStats = onStats;
+        this.count = 0;          // live stars; state in the typed arrays below
+        this.sprites = [];       // atlas rows, by color and size bucket
+        this.atlas = null;       // every sprite, at every twinkle opacity
+        this.order = null;       // star indices, back layer first, grouped by sprite
+        this.dpr = 1;
+        this.width = 0;
+        this.height = 0;
+        this.mouse = { x: 0, y: 0, isMoving: false };
+        this.lastInput = 0;
+        this.settled = false;
+        this.visible = true;
+
+        // Scheduling
+        this.running = false;
+        this.frameId = null;
+        this.timerId = null;
+        this.lastTime = 0;
+        this.throttled = false;
+
+        // Performance tracking
+        this.frameCount = 0;
+        this.lastFpsTime = 0;
+        this.fps = 60;
+        this.slowSeconds = 0;
+    }
+
+    /**
+     * Size the drawing surface; the first call also creates the stars
+     */
+    resize(width, height, dpr) {
+        const canvas = this.ctx.canvas;
+        canvas.width = width * dpr;
+        canvas.height = height * dpr;
+        this.ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+        this.width = width;
+        this.height = height;
+
+        if (dpr !== this.dpr) {
+            this.dpr = dpr;
+            this.sprites = [];
+        }
+        if (!this.count) {
+            this.createStars();
+        } else {
+            // Reposition stars that are now outside bounds
+            for (let i = 0; i < this.count; i++) {
+                if (this.x[i] > this.width) this.x[i] = this.width;
+                if (this.y[i] > this.height) this.y[i] = this.height;
+            }
+        }
+        this.wake();
+    }
+
+    /**
+     * Create star particles with multiple layers
+     *
+     * Each property is a typed array indexed by star; stars are created
+     * back layer first, which is also the order they are drawn in.
+     */
+    createStars() {
+        const n = this.config.starCount;
+        this.count = n;
+        this.x = new Float32Array(n);
+        this.y = new Float32Array(n);
+        this.originX = new Float32Array(n);
+        this.originY = new Float32Array(n);
+        this.vx = new Float32Array(n);
+        this.vy = new Float32Array(n);
+        this.size = new Float32Array(n);
+        this.opacity = new Float32Array(n);
+        this.baseOpacity = new Float32Array(n);
+        this.layer = new Float32Array(n);            // depth, (layer + 1) / layers
+        this.twinklePhase = new Float32Array(n);
+        this.twinkleSpeed = new Float32Array(n);
+        this.color = new Uint8Array(n);
+        this.sprite = new Uint16Array(n);
+
+        const starsPerLayer = Math.floor(n / this.config.layers);
+        let i = 0;
+        for (let layer = 0; layer < this.config.layers; layer++) {
+            const layerDepth = (layer + 1) / this.config.layers;
+            const layerStars = layer === this.config.layers - 1
+                ? n - (starsPerLayer * layer)
+                : starsPerLayer;
+
+            for (let k = 0; k < layerStars; k++, i++) {
+                this.createStar(i, layerDepth);
+            }
+        }
+        this.assignSprites();
+        this.postStats();
+    }
+
+    /**
+     * Initialise star `i`
+     */
+    createStar(i, depth) {
+        const sizeMultiplier = depth * 0.8 + 0.2; // Closer stars are bigger
+        const baseSize = this.config.minStarSize +
+            (this.config.maxStarSize - this.config.minStarSize) * Math.random();
+
+        this.x[i] = this.originX[i] = Math.random() * this.width;
+        this.y[i] = this.originY[i] = Math.random() * this.height;
+        this.size[i] = baseSize * sizeMultiplier;
+        this.opacity[i] = 0.3 + Math.random() * 0.7;
+        this.baseOpacity[i] = 0.3 + Math.random() * 0.7;
+        this.color[i] = Math.floor(Math.random() * this.config.colors.length);
+        this.layer[i] = depth;
+        this.twinklePhase[i] = Math.random() * Math.PI * 2;
+        this.twinkleSpeed[i] = 0.02 + Math.random() * 0.03;
+    }
+
+    /**
+     * Pointer position in canvas coordinates, or null when it left the page
+     */
+    pointer(x, y) {
+        if (x === null) {
+            this.mouse.isMoving = false;
+            this.mouse.x = this.width / 2;
+            this.mouse.y = this.height / 2;
+        } else {
+            this.mouse.x = x;
+            this.mouse.y = y;
+            this.mouse.isMoving = true;
+            this.lastInput = performance.now();
+        }
+        this.wake();
+    }
+
+    setVisible(visible) {
+        this.visible = visible;
+        if (visible) this.wake();
+        else this.stop();
+    }
+
+    setReducedMotion(reduced) {
+        this.config.reducedMotion = reduced;
+        if (reduced) this.stop();
+        this.wake();
+    }
+
+    /**
+     * Update configuration
+     */
+    setConfig(newConfig) {
+        const oldStarCount = this.config.starCount;
+        this.config = { ...this.config, ...newConfig };
+
+        // Recreate stars if count changed
+        if (newConfig.starCount && newConfig.starCount !== oldStarCount) {
+            this.createStars();
+        }
+
+        // Update colors if changed
+        if (newConfig.colors) {
+            for (let i = 0; i < this.count; i++) {
+                this.color[i] = Math.floor(Math.random() * this.config.colors.length);
+            }
+        }
+        // Sprite buckets depend on the colors and the size range
+        if (newConfig.colors || newConfig.minStarSize || newConfig.maxStarSize) {
+            this.sprites = [];
+            this.assignSprites();
+        }
+        this.wake();
+    }
+
+    // ── Scheduling ─────────────────────────────────────────────────────────
+
+    /**
+     * Something changed: animate again, or redraw the still frame
+     */
+    wake() {
+        if (!this.visible || !this.width) return;
+        if (this.config.reducedMotion) {
+            this.render();
+            return;
+        }
+        if (!this.running) {
+            this.running = true;
+            this.lastTime = 0;
+            this.schedule(0);
+        } else if (this.throttled) {
+            this.cancel();
+            this.schedule(0);
+        }
+    }
+
+    stop() {
+        this.running = false;
+        this.cancel();
+    }
+
+    schedule(delay) {
+        const raf = typeof requestAnimationFrame === 'function'
+            ? requestAnimationFrame
+            : fn => setTimeout(() => fn(performance.now()), 16);
+        this.throttled = delay > 0;
+        if (delay > 0) {
+            this.timerId = setTimeout(() => {
+                this.timerId = null;
+                this.frameId = raf(t => this.frame(t));
+            }, delay);
+        } else {
+            this.frameId = raf(t => this.frame(t));
+        }
+    }
+
+    cancel() {
+        if (this.timerId !== null) clearTimeout(this.timerId);
+        if (this.frameId !== null) {
+            if (typeof cancelAnimationFrame === 'function') cancelAnimationFrame(this.frameId);
+            else clearTimeout(this.frameId);
+        }
+        this.timerId = this.frameId = null;
+    }
+
+    frame(currentTime) {
+        this.frameId = null;
+        if (!this.running) return;
+        const deltaTime = this.lastTime ? currentTime - this.lastTime : 16;
+        const wasThrottled = this.throttled;
+        this.lastTime = currentTime;
+
+        this.updateStars(deltaTime);
+        this.render();
+
+        const idle = this.settled && currentTime - this.lastInput > STARFIELD_TUNING.idleAfterMs;
+        if (wasThrottled || idle) {
+            this.frameCount = 0;            // throttled frames say nothing about speed
+            this.lastFpsTime = currentTime;
+        } else {
+            this.updateFPS(currentTime);
+        }
+        this.schedule(idle ? 1000 / STARFIELD_TUNING.idleFps : 0);
+    }
+
+    /**
+     * Update FPS tracking; thin the stars out if full speed stays too slow
+     */
+    updateFPS(currentTime) {
+        this.frameCount++;
+        if (currentTime - this.lastFpsTime >= 1000) {
+            this.fps = this.frameCount;
+            this.frameCount = 0;
+            this.lastFpsTime = currentTime;
+            this.slowSeconds = this.fps < STARFIELD_TUNING.minFps ? this.slowSeconds + 1 : 0;
+            if (this.slowSeconds >= 2) {
+                this.slowSeconds = 0;
+                this.thinStars();
+            }
+            this.postStats();
+        }
+    }
+
+    /**
+     * Drop every fourth star, down to minStarFraction of the configured count
+     */
+    thinStars() {
+        const floor = Math.ceil(this.config.starCount * STARFIELD_TUNING.minStarFraction);
+        if (this.count <= floor) return;
+        const arrays = [this.x, this.y, this.originX, this.originY, this.vx, this.vy, this.size,
+            this.opacity, this.baseOpacity, this.layer, this.twinklePhase, this.twinkleSpeed,
+            this.color, this.sprite];
+        let kept = 0;
+        for (let i = 0; i < this.count; i++) {
+            if (i % 4 === 3) continue;
+            arrays.forEach(a => { a[kept] = a[i]; });
+            kept++;
+        }
+        this.count = kept;
+        this.assignSprites();
+    }
+
+    postStats() {
+        this.onStats({ fps: this.fps, starCount: this.count, throttled: this.throttled });
+    }
+
+    // ── Simulation and drawing ─────────────────────────────────────────────
+
+    /**
+     * Update star positions and properties
+     */
+    updateStars(deltaTime) {
+        const motionMultiplier = this.config.reducedMotion ? 0.1 : 1;
+        const returnForce = 0.02 * motionMultiplier;
+        const reach = Math.sqrt(this.width * this.width + this.height * this.height) * 0.3;
+        const push = this.config.driftSensitivity * motionMultiplier;
+        const { x, y, vx, vy } = this;
+        const mx = this.mouse.x;
+        const my = this.mouse.y;
+        const repel = this.mouse.isMoving;
+        let settled = true;
+
+        for (let i = 0; i < this.count; i++) {
+            // Calculate drift away from mouse
+            if (repel) {
+                const dx = x[i] - mx;
+                const dy = y[i] - my;
+                const distance = Math.sqrt(dx * dx + dy * dy);
+                if (distance < reach && distance > 0) {
+                    const force = (1 - distance / reach) * push * this.layer[i] / distance;
+                    vx[i] += dx * force;
+                    vy[i] += dy * force;
+                }
+            }
+
+            // Apply gentle return force to original position, then friction
+            vx[i] = (vx[i] + (this.originX[i] - x[i]) * returnForce) * 0.95;
+            vy[i] = (vy[i] + (this.originY[i] - y[i]) * returnForce) * 0.95;
+
+            // Update position
+            x[i] += vx[i];
+            y[i] += vy[i];
+            if (Math.abs(vx[i]) + Math.abs(vy[i]) > 0.05) settled = false;
+
+            // Wrap around screen edges
+            const size = this.size[i];
+            if (x[i] < -size) x[i] = this.width + size;
+            else if (x[i] > this.width + size) x[i] = -size;
+            if (y[i] < -size) y[i] = this.height + size;
+            else if (y[i] > this.height + size) y[i] = -size;
+
+            // Update twinkle effect
+            this.twinklePhase[i] += this.twinkleSpeed[i] * motionMultiplier;
+            this.opacity[i] = this.baseOpacity[i] * (Math.sin(this.twinklePhase[i]) * 0.3 + 0.7);
+        }
+        this.settled = settled;
+    }
+
+    /**
+     * Render the starfield: one drawImage per star, every one from the
+     * sprite atlas.  The twinkle picks one of the atlas's pre-faded copies
+     * of the star, so no canvas state changes between stars.
+     */
+    render() {
+        const ctx = this.ctx;
+        ctx.clearRect(0, 0, this.width, this.height);
+        if (!this.sprites.length) this.buildSprites();
+
+        const { x, y, opacity, order, atlas } = this;
+        const levels = STARFIELD_TUNING.alphaLevels;
+        for (let k = 0; k < this.count; k++) {
+            const i = order[k];
+            const sprite = this.sprites[this.sprite[i]];
+            const level = Math.min(levels, Math.max(1, Math.round(opacity[i] * levels)));
+            ctx.drawImage(atlas, (level - 1) * sprite.px, sprite.top, sprite.px, sprite.px,
+                x[i] - sprite.radius, y[i] - sprite.radius, sprite.radius * 2, sprite.radius * 2);
+        }
+    }
+
+    /**
+     * Put each star in a color × size bucket and sort the draw order
+     */
+    assignSprites() {
+        const { minStarSize, maxStarSize, colors } = this.config;
+        const buckets = STARFIELD_TUNING.sizeBuckets;
+        const step = (maxStarSize - minStarSize * 0.2) / buckets;
+        for (let i = 0; i < this.count; i++) {
+            const bucket = Math.min(buckets - 1, Math.floor((this.size[i] - minStarSize * 0.2) / step));
+            this.sprite[i] = (this.color[i] % colors.length) * buckets + Math.max(0, bucket);
+        }
+        const order = Array.from({ length: this.count }, (_, i) => i);
+        order.sort((a, b) => this.layer[a] - this.layer[b] || this.sprite[a] - this.sprite[b]);
+        this.order = Uint32Array.from(order);
+    }
+
+    /**
+     * Pre-render every color × size bucket the way renderStar drew a star:
+     * a radial glow out to three radii, the core, and a white center on
+     * large stars.  The atlas holds one row per bucket and, along the row,
+     * the sprite at each of the alphaLevels opacities.
+     */
+    buildSprites() {
+        const { minStarSize, maxStarSize, colors } = this.config;
+        const buckets = STARFIELD_TUNING.sizeBuckets;
+        const levels = STARFIELD_TUNING.alphaLevels;
+        const step = (maxStarSize - minStarSize * 0.2) / buckets;
+        const bases = [];
+        colors.forEach(color => {
+            for (let b = 0; b < buckets; b++) {
+                const size = minStarSize * 0.2 + step * (b + 0.5);
+                bases.push(this.renderSprite(color, size));
+            }
+        });
+
+        const width = Math.max(...bases.map(base => base.image.width)) * levels;
+        const height = bases.reduce((sum, base) => sum + base.image.height, 0);
+        this.atlas = this.createCanvas(width, height);
+        const ctx = this.atlas.getContext('2d');
+        let top = 0;
+        this.sprites = bases.map(({ image, radius }) => {
+            for (let level = 1; level <= levels; level++) {
+                ctx.globalAlpha = level / levels;
+                ctx.drawImage(image, (level - 1) * image.width, top);
+            }
+            const sprite = { top, px: image.width, radius };
+            top += image.height;
+            return sprite;
+        });
+    }
+
+    createCanvas(width, height) {
+        return typeof OffscreenCanvas !== 'undefined'
+            ? new OffscreenCanvas(width, height)
+            : Object.assign(document.createElement('canvas'), { width, height });
+    }
+
+    renderSprite(color, size) {
+        const radius = size * 3;
+        const px = Math.ceil(radius * 2 * this.dpr) + 2;
+        const image = this.createCanvas(px, px);
+        const ctx = image.getContext('2d');
+        const c = px / 2;
+        const scale = (px - 2) / 2 / radius;    // sprite pixels per CSS pixel
+        ctx.setTransform(scale, 0, 0, scale, c, c);
+
+        const gradient = ctx.createRadialGradient(0, 0, 0, 0, 0, radius);
+        gradient.addColorStop(0, this.hexToRgba(color, 1));
+        gradient.addColorStop(0.4, this.hexToRgba(color, 0.6));
+        gradient.addColorStop(1, this.hexToRgba(color, 0));
+        ctx.fillStyle = gradient;
+        ctx.beginPath();
+        ctx.arc(0, 0, radius, 0, Math.PI * 2);
+        ctx.fill();
+
+        ctx.fillStyle = this.hexToRgba(color, 1);
+        ctx.beginPath();
+        ctx.arc(0, 0, size, 0, Math.PI * 2);
+        ctx.fill();
+
+        if (size > 2) {
+            ctx.fillStyle = this.hexToRgba('#ffffff', 0.8);
+            ctx.beginPath();
+            ctx.arc(0, 0, size * 0.3, 0, Math.PI * 2);
+            ctx.fill();
+        }
+        // the image is 2 px wider than the glow: drawn at radius * px / (px - 2)
+        return { image, radius: radius * px / (px - 2) };
+    }
+
+    /**
+     * Convert hex color to rgba
+     */
+    hexToRgba(hex, alpha) {
+        const r = parseInt(hex.slice(1, 3), 16);
+        const g = parseInt(hex.slice(3, 5), 16);
+        const b = parseInt(hex.slice(5, 7), 16);
+        return `rgba(${r}, ${g}, ${b}, ${alpha})`;
+    }
+}
+
+/**
+ * Worker entry point: runs a StarfieldEngine on the transferred canvas and
+ * applies the page's { method, args } messages to it.
+ */
+function starfieldWorkerMain() {
+    let engine = null;
+    self.onmessage = ({ data }) => {
+        if (data.method === 'init') {
+            engine = new StarfieldEngine(data.config, data.canvas.getContext('2d'),
+                stats => self.postMessage(stats));
+            return;
+        }
+        if (engine) engine[data.method](...data.args);
+    };
+}
+
 class CalmingStarfield {
     constructor(options = {}) {
         // Default configuration
@@ -15,24 +508,19 @@ class CalmingStarfield {
             minStarSize: 0.5,
             layers: 3,
             reducedMotion: false,
+            useWorker: true,
             ...options
         };
 
         // Initialize component
         this.container = null;
         this.canvas = null;
-        this.ctx = null;
-        this.stars = [];
-        this.mouse = { x: 0, y: 0, isMoving: false };
-        this.animationId = null;
-        this.lastTime = 0;
+        this.engine = null;      // StarfieldEngine on this thread...
+        this.worker = null;      // ...or the worker running one
+        this.stats = { fps: 0, starCount: 0, throttled: false };
+        this.listeners = [];
         this.isInitialized = false;
 
-        // Performance tracking
-        this.frameCount = 0;
-        this.lastFpsTime = 0;
-        this.fps = 60;
-
         this.init();
     }
 
@@ -43,9 +531,7 @@ class CalmingStarfield {
         try {
             this.setupContainer();
             this.setupCanvas();
-            this.createStars();
             this.bindEvents();
-            this.startAnimation();
             this.isInitialized = true;
         } catch (error) {
             console.error('Failed to initialize Calming Starfield:', error);
@@ -56,7 +542,7 @@ class CalmingStarfield {
      * Set up the container element
      */
     setupContainer() {
-        const containerElement = typeof this.config.container === 'string' 
+        const containerElement = typeof this.config.container === 'string'
             ? document.querySelector(this.config.container)
             : this.config.container;
 
@@ -66,125 +552,139 @@ class CalmingStarfield {
 
         this.container = containerElement;
         this.container.style.position = 'relative';
-        
+
         // Add loading indicator
         this.showLoading();
     }
 
     /**
-     * Set up the canvas element
+     * Set up the canvas element and the engine that draws on it
      */
     setupCanvas() {
         this.canvas = document.createElement('canvas');
         this.canvas.className = 'starfield-canvas';
-        this.ctx = this.canvas.getContext('2d');
+        this.container.appendChild(this.canvas);
 
-        // Set canvas size
+        if (!(this.config.useWorker && this.startWorker())) {
+            this.engine = new StarfieldEngine(this.engineConfig(), this.canvas.getContext('2d'),
+                stats => { this.stats = stats; });
+        }
         this.resizeCanvas();
 
-        // Add canvas to container
-        this.container.appendChild(this.canvas);
-        
         // Remove loading indicator
         this.hideLoading();
     }
 
     /**
-     * Resize canvas to match container
+     * Move drawing to a worker; false where OffscreenCanvas is unsupported
      */
-    resizeCanvas() {
-        const rect = this.container.getBoundingClientRect();
-        const dpr = window.devicePixelRatio || 1;
-
-        this.canvas.width = rect.width * dpr;
-        this.canvas.height = rect.height * dpr;
-        this.canvas.style.width = rect.width + 'px';
-        this.canvas.style.height = rect.height + 'px';
-
-        this.ctx.scale(dpr, dpr);
-        
-        // Store dimensions for easy access
-        this.width = rect.width;
-        this.height = rect.height;
+    startWorker() {
+        if (typeof OffscreenCanvas === 'undefined' || !this.canvas.transferControlToOffscreen) {
+            return false;
+        }
+        let url = null;
+        try {
+            // built from the engine's own source: works from file:// with no extra request
+            const source = `const STARFIELD_TUNING = ${JSON.stringify(STARFIELD_TUNING)};\n` +
+                `${StarfieldEngine}\n(${starfieldWorkerMain})();`;
+            url = URL.createObjectURL(new Blob([source], { type: 'text/javascript' }));
+            this.worker = new Worker(url);
+        } catch {
+            if (url) URL.revokeObjectURL(url);
+            this.worker = null;
+            return false;
+        }
+        URL.revokeObjectURL(url);
+        const offscreen = this.canvas.transferControlToOffscreen();
+        this.worker.onmessage = ({ data }) => { this.stats = data; };
+        this.worker.onerror = () => this.stopWorker();
+        this.worker.postMessage({ method: 'init', config: this.engineConfig(), canvas: offscreen },
+            [offscreen]);
+        return true;
     }
 
     /**
-     * Create star particles with multiple layers
+     * The worker failed: draw on this thread, on a fresh canvas (the old
+     * one belongs to the worker now)
      */
-    createStars() {
-        this.stars = [];
-        const starsPerLayer = Math.floor(this.config.starCount / this.config.layers);
+    stopWorker() {
+        this.worker.terminate();
+        this.worker = null;
+        const canvas = document.createElement('canvas');
+        canvas.className = 'starfield-canvas';
+        this.canvas.replaceWith(canvas);
+        this.canvas = canvas;
+        this.engine = new StarfieldEngine(this.engineConfig(), canvas.getContext('2d'),
+            stats => { this.stats = stats; });
+        this.resizeCanvas();
+        this.send('setVisible', document.visibilityState !== 'hidden');
+    }
 
-        for (let layer = 0; layer < this.config.layers; layer++) {
-            const layerDepth = (layer + 1) / this.config.layers;
-            const layerStars = layer === this.config.layers - 1 
-                ? this.config.starCount - (starsPerLayer * layer)
-                : starsPerLayer;
+    engineConfig() {
+        const { container, useWorker, ...config } = this.config;
+        return config;
+    }
 
-            for (let i = 0; i < layerStars; i++) {
-                this.stars.push(this.createStar(layerDepth));
-            }
-        }
+    /**
+     * Forward a call to the engine, wherever it runs
+     */
+    send(method, ...args) {
+        if (this.worker) this.worker.postMessage({ method, args });
+        else if (this.engine) this.engine[method](...args);
     }
 
     /**
-     * Create a single star particle
+     * Resize canvas to match container
      */
-    createStar(depth) {
-        const sizeMultiplier = depth * 0.8 + 0.2; // Closer stars are bigger
-        const baseSize = this.config.minStarSize + 
-            (this.config.maxStarSize - this.config.minStarSize) * Math.random();
+    resizeCanvas() {
+        const rect = this.container.getBoundingClientRect();
+        const dpr = window.devicePixelRatio || 1;
 
-        return {
-            x: Math.random() * this.width,
-            y: Math.random() * this.height,
-            originalX: 0,
-            originalY: 0,
-            vx: 0,
-            vy: 0,
-            size: baseSize * sizeMultiplier,
-            opacity: 0.3 + Math.random() * 0.7,
-            baseOpacity: 0.3 + Math.random() * 0.7,
-            color: this.config.colors[Math.floor(Math.random() * this.config.colors.length)],
-            depth: depth,
-            twinklePhase: Math.random() * Math.PI * 2,
-            twinkleSpeed: 0.02 + Math.random() * 0.03,
-            glowIntensity: 0.5 + Math.random() * 0.5
-        };
+        this.canvas.style.width = rect.width + 'px';
+        this.canvas.style.height = rect.height + 'px';
+
+        // Store dimensions for easy access
+        this.width = rect.width;
+        this.height = rect.height;
+        this.send('resize', rect.width, rect.height, dpr);
     }
 
     /**
      * Bind event listeners
      */
     bindEvents() {
-        // Mouse movement tracking
-        this.canvas.addEventListener('mousemove', (e) => this.handleMouseMove(e));
-        this.canvas.addEventListener('mouseenter', () => this.mouse.isMoving = true);
-        this.canvas.addEventListener('mouseleave', () => {
-            this.mouse.isMoving = false;
-            this.mouse.x = this.width / 2;
-            this.mouse.y = this.height / 2;
-        });
+        // The canvas sits behind the app, so pointer movement is read from the window
+        this.listen(window, 'pointermove', e => this.handleMouseMove(e), { passive: true });
+        this.listen(document.documentElement, 'mouseleave', () => this.send('pointer', null, null));
 
         // Resize handling
-        window.addEventListener('resize', () => this.handleResize());
+        this.listen(window, 'resize', () => this.handleResize());
+
+        // Nothing to draw while the tab is hidden
+        this.listen(document, 'visibilitychange', () =>
+            this.send('setVisible', document.visibilityState !== 'hidden'));
 
         // Reduced motion preference
         if (window.matchMedia) {
             const mediaQuery = window.matchMedia('(prefers-reduced-motion: reduce)');
-            mediaQuery.addListener(() => this.updateReducedMotion(mediaQuery.matches));
-            this.updateReducedMotion(mediaQuery.matches);
+            const onChange = () => this.updateReducedMotion(mediaQuery.matches);
+            if (mediaQuery.addEventListener) this.listen(mediaQuery, 'change', onChange);
+            else mediaQuery.addListener(onChange);
+            this.updateReducedMotion(mediaQuery.matches || this.config.reducedMotion);
         }
     }
 
+    listen(target, type, handler, options) {
+        target.addEventListener(type, handler, options);
+        this.listeners.push([target, type, handler, options]);
+    }
+
     /**
      * Handle mouse movement
      */
     handleMouseMove(e) {
         const rect = this.canvas.getBoundingClientRect();
-        this.mouse.x = e.clientX - rect.left;
-        this.mouse.y = e.clientY - rect.top;
-        this.mouse.isMoving = true;
+        this.send('pointer', e.clientX - rect.left, e.clientY - rect.top);
     }
 
     /**
@@ -192,11 +692,6 @@ class CalmingStarfield {
      */
     handleResize() {
         this.resizeCanvas();
-        // Reposition stars that are now outside bounds
-        this.stars.forEach(star => {
-            if (star.x > this.width) star.x = this.width;
-            if (star.y > this.height) star.y = this.height;
-        });
     }
 
     /**
@@ -204,152 +699,7 @@ class CalmingStarfield {
      */
     updateReducedMotion(reduced) {
         this.config.reducedMotion = reduced;
-    }
-
-    /**
-     * Start the animation loop
-     */
-    startAnimation() {
-        const animate = (currentTime) => {
-            const deltaTime = currentTime - this.lastTime;
-            this.lastTime = currentTime;
-
-            this.updateFPS(currentTime);
-            this.updateStars(deltaTime);
-            this.render();
-
-            this.animationId = requestAnimationFrame(animate);
-        };
-
-        this.animationId = requestAnimationFrame(animate);
-    }
-
-    /**
-     * Update FPS tracking
-     */
-    updateFPS(currentTime) {
-        this.frameCount++;
-        if (currentTime - this.lastFpsTime >= 1000) {
-            this.fps = this.frameCount;
-            this.frameCount = 0;
-            this.lastFpsTime = currentTime;
-        }
-    }
-
-    /**
-     * Update star positions and properties
-     */
-    updateStars(deltaTime) {
-        const motionMultiplier = this.config.reducedMotion ? 0.1 : 1;
-        const time = Date.now() * 0.001;
-
-        this.stars.forEach(star => {
-            // Store original position for drift calculations
-            if (star.originalX === 0 && star.originalY === 0) {
-                star.originalX = star.x;
-                star.originalY = star.y;
-            }
-
-            // Calculate drift away from mouse
-            if (this.mouse.isMoving) {
-                const dx = star.x - this.mouse.x;
-                const dy = star.y - this.mouse.y;
-                const distance = Math.sqrt(dx * dx + dy * dy);
-                const maxDistance = Math.sqrt(this.width * this.width + this.height * this.height);
-                
-                if (distance < maxDistance * 0.3) {
-                    const force = (1 - distance / (maxDistance * 0.3)) * this.config.driftSensitivity;
-                    const angle = Math.atan2(dy, dx);
-                    
-                    star.vx += Math.cos(angle) * force * star.depth * motionMultiplier;
-                    star.vy += Math.sin(angle) * force * star.depth * motionMultiplier;
-                }
-            }
-
-            // Apply gentle return force to original position
-            const returnForce = 0.02 * motionMultiplier;
-            star.vx += (star.originalX - star.x) * returnForce;
-            star.vy += (star.originalY - star.y) * returnForce;
-
-            // Apply friction
-            star.vx *= 0.95;
-            star.vy *= 0.95;
-
-            // Update position
-            star.x += star.vx;
-            star.y += star.vy;
-
-            // Wrap around screen edges
-            if (star.x < -star.size) star.x = this.width + star.size;
-            if (star.x > this.width + star.size) star.x = -star.size;
-            if (star.y < -star.size) star.y = this.height + star.size;
-            if (star.y > this.height + star.size) star.y = -star.size;
-
-            // Update twinkle effect
-            star.twinklePhase += star.twinkleSpeed * motionMultiplier;
-            const twinkle = Math.sin(star.twinklePhase) * 0.3 + 0.7;
-            star.opacity = star.baseOpacity * twinkle;
-        });
-    }
-
-    /**
-     * Render the starfield
-     */
-    render() {
-        // Clear canvas
-        this.ctx.clearRect(0, 0, this.width, this.height);
-
-        // Sort stars by depth for proper layering
-        const sortedStars = [...this.stars].sort((a, b) => a.depth - b.depth);
-
-        // Render each star
-        sortedStars.forEach(star => this.renderStar(star));
-    }
-
-    /**
-     * Render a single star with glow effect
-     */
-    renderStar(star) {
-        const x = star.x;
-        const y = star.y;
-        const size = star.size;
-        const opacity = Math.max(0, Math.min(1, star.opacity));
-
-        // Create radial gradient for glow effect
-        const gradient = this.ctx.createRadialGradient(x, y, 0, x, y, size * 3);
-        gradient.addColorStop(0, this.hexToRgba(star.color, opacity));
-        gradient.addColorStop(0.4, this.hexToRgba(star.color, opacity * 0.6));
-        gradient.addColorStop(1, this.hexToRgba(star.color, 0));
-
-        // Draw glow
-        this.ctx.fillStyle = gradient;
-        this.ctx.beginPath();
-        this.ctx.arc(x, y, size * 3, 0, Math.PI * 2);
-        this.ctx.fill();
-
-        // Draw core star
-        this.ctx.fillStyle = this.hexToRgba(star.color, opacity);
-        this.ctx.beginPath();
-        this.ctx.arc(x, y, size, 0, Math.PI * 2);
-        this.ctx.fill();
-
-        // Add bright center point for larger stars
-        if (size > 2) {
-            this.ctx.fillStyle = this.hexToRgba('#ffffff', opacity * 0.8);
-            this.ctx.beginPath();
-            this.ctx.arc(x, y, size * 0.3, 0, Math.PI * 2);
-            this.ctx.fill();
-        }
-    }
-
-    /**
-     * Convert hex color to rgba
-     */
-    hexToRgba(hex, alpha) {
-        const r = parseInt(hex.slice(1, 3), 16);
-        const g = parseInt(hex.slice(3, 5), 16);
-        const b = parseInt(hex.slice(5, 7), 16);
-        return `rgba(${r}, ${g}, ${b}, ${alpha})`;
+        this.send('setReducedMotion', reduced);
     }
 
     /**
@@ -376,28 +726,22 @@ class CalmingStarfield {
      * Update configuration
      */
     updateConfig(newConfig) {
-        const oldStarCount = this.config.starCount;
         this.config = { ...this.config, ...newConfig };
-
-        // Recreate stars if count changed
-        if (newConfig.starCount && newConfig.starCount !== oldStarCount) {
-            this.createStars();
-        }
-
-        // Update colors if changed
-        if (newConfig.colors) {
-            this.stars.forEach(star => {
-                star.color = this.config.colors[Math.floor(Math.random() * this.config.colors.length)];
-            });
-        }
+        const { container, useWorker, ...engineConfig } = newConfig;
+        this.send('setConfig', engineConfig);
     }
 
     /**
      * Destroy the starfield and clean up
      */
     destroy() {
-        if (this.animationId) {
-            cancelAnimationFrame(this.animationId);
+        if (this.worker) {
+            this.worker.terminate();
+            this.worker = null;
+        }
+        if (this.engine) {
+            this.engine.stop();
+            this.engine = null;
         }
 
         if (this.canvas && this.canvas.parentNode) {
@@ -405,7 +749,9 @@ class CalmingStarfield {
         }
 
         // Remove event listeners
-        window.removeEventListener('resize', this.handleResize);
+        this.listeners.forEach(([target, type, handler, options]) =>
+            target.removeEventListener(type, handler, options));
+        this.listeners = [];
 
         this.isInitialized = false;
     }
@@ -415,8 +761,10 @@ class CalmingStarfield {
      */
     getStats() {
         return {
-            fps: this.fps,
-            starCount: this.stars.length,
+            fps: this.stats.fps,
+            starCount: this.stats.starCount,
+            throttled: this.stats.throttled,
+            inWorker: !!this.worker,
             isInitialized: this.isInitialized
         };
     }
@@ -428,4 +776,4 @@ if (typeof module !== 'undefined' && module.exports) {
 }
 
 // Make available globally
-window.CalmingStarfield = CalmingStarfield;
\ No newline at end of file
+window.CalmingStarfield = CalmingStarfield;
@@ -0,0 +1,215 @@
+'use strict';
+
+// ═══════════════════════════════════════════════════════════════════════════
+//  Command storage for the web version
+//  One IndexedDB record per command, so an edit writes one record instead of
+//  re-serialising the whole bank.  Edits made during a frame are written
+//  together in one transaction when the frame ends, and loading walks a
+//  cursor tab by tab so the visible tab can render before the rest arrive.
+//  Browsers without IndexedDB fall back to the old single LocalStorage key,
+//  written at most once per frame.  An old LocalStorage bank is only
+//  deleted once its copy in IndexedDB has committed.
+// ═══════════════════════════════════════════════════════════════════════════
+
+const LEGACY_KEY = 'gamCommandBank_v3';
+
+class IdbCommandStore {
+    static open(name = 'gamCommandBank') {
+        return new Promise((resolve, reject) => {
+            if (!window.indexedDB) { reject(new Error('IndexedDB unavailable')); return; }
+            const req = indexedDB.open(name, 1);
+            req.onupgradeneeded = () => {
+                // { key, category, favorite: 0|1, used: ISO string, cmd }
+                const os = req.result.createObjectStore('commands', { keyPath: 'key', autoIncrement: true });
+                os.createIndex('category', 'category');
+                os.createIndex('favorite', 'favorite');
+                os.createIndex('usage', 'used');
+            };
+            req.onsuccess = () => resolve(new IdbCommandStore(req.result));
+            req.onerror = () => reject(req.error);
+            req.onblocked = () => reject(new Error('IndexedDB blocked by another tab'));
+        });
+    }
+
+    constructor(db) {
+        this.db = db;
+        this.keys = new WeakMap();   // command object -> record key
+        this.pending = new Map();    // command object -> category, or null to delete
+        this.cleared = false;
+        this.frame = 0;
+        this.writing = Promise.resolve(true);   // the last flush's transaction
+        this.lastError = null;
+        this.onError = () => {};
+        bindFlushOnHide(this);
+    }
+
+    // Calls onTab(cat, commands) for each category in `order`; false if empty.
+    // A LocalStorage bank is the copy that counts until its migration has
+    // committed, so it is read (and migrated again) for as long as it is
+    // there.  Throws MigrationError, after onTab, if the migration fails.
+    async load(order, onTab) {
+        const legacy = readLegacy();
+        if (legacy) {
+            order.forEach(cat => onTab(cat, legacy[cat] || []));
+            this.replaceAll(legacy);
+            if (!await this.flush()) throw new MigrationError(this.lastError);
+            localStorage.removeItem(LEGACY_KEY);   // migrated
+            return true;
+        }
+        let found = false;
+        for (const cat of order) {
+            const list = await this.readCategory(cat);
+            found = found || list.length > 0;
+            onTab(cat, list);
+        }
+        return found;
+    }
+
+    readCategory(cat) {
+        return new Promise((resolve, reject) => {
+            const list = [];
+            const index = this.db.transaction('commands').objectStore('commands').index('category');
+            const req = index.openCursor(IDBKeyRange.only(cat));
+            req.onsuccess = () => {
+                const cursor = req.result;
+                if (!cursor) { resolve(list); return; }
+                this.keys.set(cursor.value.cmd, cursor.primaryKey);
+                list.push(cursor.value.cmd);
+                cursor.continue();
+            };
+            req.onerror = () => reject(req.error);
+        });
+    }
+
+    put(cat, cmd) {
+        this.pending.set(cmd, cat);
+        this.schedule();
+    }
+
+    remove(cmd) {
+        this.pending.set(cmd, null);
+        this.schedule();
+    }
+
+    replaceAll(commands) {
+        this.pending = new Map();
+        this.cleared = true;
+        Object.keys(commands).forEach(cat => commands[cat].forEach(cmd => this.pending.set(cmd, cat)));
+        this.schedule();
+    }
+
+    schedule() {
+        scheduleFlush(this);
+    }
+
+    // Write everything pending in one transaction.  Resolves true once it
+    // commits, false if it was aborted (the batch is then lost).  Flushes
+    // run one after another: a new command's key is only known once its put
+    // has succeeded, and a batch built before that would add it twice (or
+    // fail to delete it).
+    flush() {
+        cancelAnimationFrame(this.frame);
+        this.frame = 0;
+        this.writing = this.writing.then(() => this.write());
+        return this.writing;
+    }
+
+    write() {
+        if (!this.pending.size && !this.cleared) return Promise.resolve(true);
+        const batch = this.pending;
+        const tx = this.db.transaction('commands', 'readwrite');
+        const os = tx.objectStore('commands');
+        if (this.cleared) os.clear();
+        this.pending = new Map();
+        this.cleared = false;
+        batch.forEach((cat, cmd) => {
+            const key = this.keys.get(cmd);
+            if (cat === null) {
+                if (key !== undefined) os.delete(key);
+                this.keys.delete(cmd);
+                return;
+            }
+            const record = {
+                category: cat,
+                favorite: cmd.favorite ? 1 : 0,
+                used: cmd.last_used || '',
+                cmd
+            };
+            if (key !== undefined) record.key = key;
+            const req = os.put(record);
+            req.onsuccess = () => this.keys.set(cmd, req.result);
+        });
+        return new Promise(resolve => {
+            tx.oncomplete = () => resolve(true);
+            tx.onabort = () => {
+                this.lastError = tx.error;
+                this.onError(tx.error);
+                resolve(false);
+            };
+        });
+    }
+}
+
+class LocalCommandStore {
+    constructor(source) {
+        this.source = source;        // () => the whole bank
+        this.frame = 0;
+        this.onError = () => {};
+        bindFlushOnHide(this);
+    }
+
+    async load(order, onTab) {
+        const saved = readLegacy();
+        if (!saved) return false;
+        order.forEach(cat => onTab(cat, saved[cat] || []));
+        return true;
+    }
+
+    put() { this.schedule(); }
+    remove() { this.schedule(); }
+    replaceAll() { this.schedule(); }
+
+    schedule() {
+        scheduleFlush(this);
+    }
+
+    flush() {
+        cancelAnimationFrame(this.frame);
+        this.frame = 0;
+        try {
+            localStorage.setItem(LEGACY_KEY, JSON.stringify(this.source()));
+        } catch (err) {
+            this.onError(err);
+            return Promise.resolve(false);
+        }
+        return Promise.resolve(true);
+    }
+}
+
+class MigrationError extends Error {
+    constructor(cause) {
+        super(`Could not move the bank to IndexedDB: ${cause && cause.message || cause || 'aborted'}`);
+        this.name = 'MigrationError';
+    }
+}
+
+function readLegacy() {
+    const saved = localStorage.getItem(LEGACY_KEY);
+    if (!saved) return null;
+    try { return JSON.parse(saved); } catch { return null; }
+}
+
+// One flush per frame; hidden tabs get no frames, so they write on a timer.
+function scheduleFlush(store) {
+    if (document.visibilityState === 'hidden') setTimeout(() => store.flush(), 0);
+    else if (!store.frame) store.frame = requestAnimationFrame(() => store.flush());
+}
+
+// Anything still waiting for a frame is written when the tab is hidden or closed.
+function bindFlushOnHide(store) {
+    const flush = () => { if (store.frame) store.flush(); };
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') flush();
+    });
+    window.addEventListener('pagehide', flush);
+}